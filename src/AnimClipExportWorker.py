@@ -0,0 +1,59 @@
+# run with mayapy: mayapy AnimClipExportWorker.py <job.json>
+# the job file is written by MayaToUE, it names the scene copy to open, the nodes to export and the clips
+import json
+import os
+import sys
+import time
+
+def ExportClip(mc, nodes, clip):
+    outputDir = os.path.dirname(clip["output"])
+    if outputDir:
+        os.makedirs(outputDir, exist_ok=True)
+
+    mc.select(nodes, r=True)
+    settings = clip["settings"]
+    mc.FBXResetExport()
+    mc.FBXExportSmoothingGroups('-v', settings["smoothingGroups"])
+    mc.FBXExportInputConnections('-v', settings["inputConnections"])
+    if "take" in settings:
+        # the scene copy has the baked skeleton, its keys are written over the clip's range without baking again
+        mc.FBXExportBakeComplexAnimation('-v', False)
+        mc.FBXExportSplitAnimationIntoTakes('-c')
+        mc.FBXExportSplitAnimationIntoTakes('-v', *settings["take"])
+        mc.FBXExportDeleteOriginalTakeOnSplitAnimation('-v', True)
+    else:
+        mc.FBXExportBakeComplexAnimation('-v', True)
+        mc.FBXExportBakeComplexStart('-v', settings["bakeComplexStart"])
+        mc.FBXExportBakeComplexEnd('-v', settings["bakeComplexEnd"])
+        mc.FBXExportBakeComplexStep('-v', settings["bakeComplexStep"])
+    mc.FBXExport('-f', clip["output"], '-s', True, '-ea', True)
+
+def RunJob(jobPath):
+    with open(jobPath) as jobFile:
+        job = json.load(jobFile)
+
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+    import maya.cmds as mc
+    mc.loadPlugin("fbxmaya", quiet=True)
+    mc.file(job["scene"], open=True, force=True)
+
+    results = []
+    for clip in job["clips"]:
+        startTime = time.perf_counter()
+        error = ""
+        try:
+            ExportClip(mc, job["nodes"], clip)
+        except Exception as e:
+            error = str(e)
+
+        results.append({"output": clip["output"], "seconds": time.perf_counter() - startTime, "error": error})
+
+    with open(job["result"], "w") as resultFile:
+        json.dump({"clips": results}, resultFile, indent=4)
+
+    maya.standalone.uninitialize()
+    return 0 if not any(result["error"] for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(RunJob(sys.argv[1]))
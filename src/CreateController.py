@@ -1,9 +1,15 @@
+import re
+import json
+import time
+import random
 import maya.cmds as mc
+import numpy as np
 
 ####################################
 #            Facilities            #
 ####################################
 class Vector:
+    __slots__ = ("x", "y", "z")
     def __init__(self, *args):
         self.x = args[0]
         self.y = args[1]
@@ -32,6 +38,68 @@ class Vector:
     def __str__(self):
         return f"<{self.x},{self.y},{self.z}>"
 
+def GetChainPlacements(rootPositions, endPositions, poleVectors, exact = True):
+    # pole vector and ikfk blend positions for N chains (or N frames of one chain) at once,
+    # same formula and operation order as RigThreeJntChain always used, so the results match the Vector math exactly
+    rootPositions = np.asarray(rootPositions, dtype=np.float64).reshape(-1, 3)
+    endPositions = np.asarray(endPositions, dtype=np.float64).reshape(-1, 3)
+    poleVectors = np.asarray(poleVectors, dtype=np.float64).reshape(-1, 3)
+
+    armVecs = endPositions - rootPositions
+    # numpy squares with x*x and roots with sqrt, python's ** goes through pow, and the two round differently
+    # in the last bit now and then. exact keeps the lengths on python floats to match Vector.GetLength bit for bit
+    if exact:
+        armLengths = np.array([(x ** 2 + y ** 2 + z ** 2) ** 0.5 for x, y, z in armVecs.tolist()], dtype=np.float64)
+    else:
+        armLengths = np.sqrt(np.einsum("ij,ij->i", armVecs, armVecs))
+    halfArmLengths = (armLengths / 2).reshape(-1, 1)
+    poleVecPositions = rootPositions + poleVectors * halfArmLengths + armVecs / 2
+
+    dirs = np.where(rootPositions[:, :1] < 0, -1.0, 1.0)
+    ikfkBlendOffsets = np.hstack([dirs * halfArmLengths / 4, halfArmLengths / 4, np.zeros_like(halfArmLengths)])
+    ikfkBlendPositions = rootPositions + ikfkBlendOffsets
+    return poleVecPositions, ikfkBlendPositions
+
+def GetChainPlacementWithVector(rootJntPos: Vector, endJntPos: Vector, poleVec: Vector):
+    armVec = endJntPos - rootJntPos
+    halfArmLengh = armVec.GetLength()/2
+    poleVecPos = rootJntPos + poleVec * halfArmLengh + armVec/2
+
+    dir = 1
+    if rootJntPos.x < 0:
+        dir = -1
+
+    ikfkBlendPos = rootJntPos + Vector(dir * halfArmLengh/4, halfArmLengh/4, 0)
+    return poleVecPos, ikfkBlendPos
+
+def BenchmarkChainPlacement(count = 10000):
+    # random chains through the Vector formula and through GetChainPlacements, checks they agree and prints both times
+    def RandomPoint():
+        return [random.uniform(-100, 100) for i in range(3)]
+
+    rootPositions = np.array([RandomPoint() for i in range(count)])
+    endPositions = np.array([RandomPoint() for i in range(count)])
+    poleVectors = np.array([RandomPoint() for i in range(count)])
+
+    startTime = time.perf_counter()
+    vectorResults = [GetChainPlacementWithVector(Vector(*root), Vector(*end), Vector(*pole)) for root, end, pole in zip(rootPositions.tolist(), endPositions.tolist(), poleVectors.tolist())]
+    vectorSeconds = time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    poleVecPositions, ikfkBlendPositions = GetChainPlacements(rootPositions, endPositions, poleVectors)
+    numpySeconds = time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    approxPoleVecPositions, approxIkfkBlendPositions = GetChainPlacements(rootPositions, endPositions, poleVectors, exact = False)
+    approxSeconds = time.perf_counter() - startTime
+
+    vectorPoleVecPositions = np.array([[pos.x, pos.y, pos.z] for pos, blendPos in vectorResults])
+    vectorIkfkBlendPositions = np.array([[blendPos.x, blendPos.y, blendPos.z] for pos, blendPos in vectorResults])
+    identical = np.array_equal(vectorPoleVecPositions, poleVecPositions) and np.array_equal(vectorIkfkBlendPositions, ikfkBlendPositions)
+    maxError = max(np.abs(approxPoleVecPositions - poleVecPositions).max(initial=0), np.abs(approxIkfkBlendPositions - ikfkBlendPositions).max(initial=0))
+    print(f"{count} chains: Vector {vectorSeconds:.4f}s, numpy {numpySeconds:.4f}s (identical: {identical}), numpy sqrt {approxSeconds:.4f}s (max difference {maxError:.1e})")
+    return {"vector": vectorSeconds, "numpy": numpySeconds, "numpySqrt": approxSeconds, "identical": identical, "sqrtMaxError": maxError}
+
 def GetObjPos(obj):
     pos = mc.xform(obj, t=True, q=True, ws=True)
     return Vector(pos[0], pos[1], pos[2])
@@ -39,32 +107,168 @@ def GetObjPos(obj):
 def SetObjPos(obj, pos: Vector):
     mc.setAttr(obj + ".translate", pos.x, pos.y, pos.z, type = "float3")
 
-def CreateControllerForJnt(jnt, size = 10):
-    ctrlName = "ac_" + jnt
-    ctrlGrpName = ctrlName + "_grp"
-
-    mc.circle(n=ctrlName, nr=(1,0,0), r = size)
-    mc.group(ctrlName, n = ctrlGrpName)
-    mc.matchTransform(ctrlGrpName, jnt)
+class ControllerShapes:
+    # the cvs of every controller shape at size 1, the scaled curve arguments are cached per shape and size,
+    # so a controller is one curve call with no scale or freeze afterwards
+    def __init__(self):
+        self.shapes = {}
+        self.curveArgs = {}
+
+        #curve -d 1 -p -0.5 0.5 0.5 -p 0.5 0.5 0.5 -p 0.5 0.5 -0.5 -p -0.5 0.5 -0.5 -p -0.5 0.5 0.5 -p -0.5 -0.5 0.5 -p 0.5 -0.5 0.5 -p 0.5 0.5 0.5 -p 0.5 -0.5 0.5 -p 0.5 -0.5 -0.5 -p 0.5 0.5 -0.5 -p 0.5 -0.5 -0.5 -p -0.5 -0.5 -0.5 -p -0.5 0.5 -0.5 -p -0.5 -0.5 -0.5 -p -0.5 -0.5 0.5 -k 0 -k 1 -k 2 -k 3 -k 4 -k 5 -k 6 -k 7 -k 8 -k 9 -k 10 -k 11 -k 12 -k 13 -k 14 -k 15 ;
+        self.AddShape("box", ((-0.5,0.5,0.5), (0.5,0.5,0.5), (0.5,0.5,-0.5), (-0.5, 0.5, -0.5), (-0.5, 0.5, 0.5), (-0.5, -0.5, 0.5), (0.5, -0.5, 0.5), (0.5, 0.5, 0.5), (0.5, -0.5, 0.5), (0.5, -0.5, -0.5), (0.5, 0.5, -0.5), (0.5, -0.5, -0.5), (-0.5, -0.5, -0.5), (-0.5, 0.5, -0.5), (-0.5, -0.5, -0.5), (-0.5, -0.5, 0.5)))
+        # the plus used to be drawn flat on xz and rotated 90 on x, that rotation is baked in: (x, 0, z) -> (x, -z, 0)
+        self.AddShape("plus", ((0.5,-1,0),(0.5,-0.5,0),(1,-0.5,0),(1,0.5,0),(0.5,0.5,0),(0.5,1,0),(-0.5,1,0),(-0.5,0.5,0),(-1,0.5,0),(-1,-0.5,0),(-0.5,-0.5,0),(-0.5,-1,0),(0.5,-1,0)))
+        # the cvs of circle -nr 1 0 0 -r 1 -s 8, a periodic degree 3 curve through radius 1
+        self.AddShape("circle", ((0,0.783612,-0.783612),(0,0,-1.108194),(0,-0.783612,-0.783612),(0,-1.108194,0),(0,-0.783612,0.783612),(0,0,1.108194),(0,0.783612,0.783612),(0,1.108194,0)), 3, True)
+
+    def AddShape(self, shapeName, points, degree = 1, periodic = False):
+        # periodic shapes list each cv once, the overlapping cvs are added when the curve is made
+        self.shapes[shapeName] = {"points": np.asarray(points, dtype=np.float64).reshape(-1, 3), "degree": degree, "periodic": periodic}
+        self.curveArgs = {key: args for key, args in self.curveArgs.items() if key[0] != shapeName}
+
+    def AddShapeFromCurve(self, shapeName, curve, size = 1):
+        # stores the cvs of an existing curve, divided by size so the shape is saved at size 1
+        curveShape = mc.listRelatives(curve, s=True, type="nurbsCurve")[0]
+        degree = mc.getAttr(curveShape + ".degree")
+        periodic = mc.getAttr(curveShape + ".form") == 2
+        points = mc.getAttr(curveShape + ".cv[*]")
+        if periodic:
+            points = points[:mc.getAttr(curveShape + ".spans")]
+
+        self.AddShape(shapeName, np.asarray(points, dtype=np.float64) / size, degree, periodic)
+
+    def GetShapeNames(self):
+        return list(self.shapes.keys())
+
+    def GetCurveArgs(self, shapeName, size):
+        key = (shapeName, float(size))
+        if key in self.curveArgs:
+            return self.curveArgs[key]
+
+        shape = self.shapes[shapeName]
+        degree = shape["degree"]
+        points = [tuple(point) for point in (shape["points"] * size).tolist()]
+        if shape["periodic"]:
+            points += points[:degree]
+            knots = list(range(1 - degree, len(points)))
+        else:
+            spans = len(points) - degree
+            knots = [0] * (degree - 1) + list(range(spans + 1)) + [spans] * (degree - 1)
+
+        self.curveArgs[key] = {"d": degree, "p": points, "k": knots, "per": shape["periodic"]}
+        return self.curveArgs[key]
+
+    def CreateCurve(self, name, shapeName, size = 10):
+        return mc.curve(n=name, **self.GetCurveArgs(shapeName, size))
+
+    def CreateController(self, name, shapeName, size = 10, matchTo = ""):
+        # the controller, its offset group and the group's world transform in three calls
+        ctrlName = self.CreateCurve(name, shapeName, size)
+        ctrlGrpName = mc.group(ctrlName, n = name + "_grp")
+        if matchTo:
+            mc.matchTransform(ctrlGrpName, matchTo)
+
+        return ctrlName, ctrlGrpName
+
+    def LoadShapes(self, path):
+        # {"shapeName": [degree, periodic, [x, y, z, x, y, z, ...]], ...}
+        with open(path) as shapesFile:
+            shapes = json.load(shapesFile)
+
+        for shapeName, (degree, periodic, points) in shapes.items():
+            self.AddShape(shapeName, points, degree, periodic)
+
+        return list(shapes.keys())
+
+    def SaveShapes(self, path, shapeNames = None):
+        shapes = {}
+        for shapeName in shapeNames or self.shapes.keys():
+            shape = self.shapes[shapeName]
+            shapes[shapeName] = [shape["degree"], shape["periodic"], [round(value, 6) for value in shape["points"].ravel().tolist()]]
+
+        with open(path, "w") as shapesFile:
+            json.dump(shapes, shapesFile, separators=(",", ":"))
+
+controllerShapes = ControllerShapes()
+
+def CreateControllerForJnt(jnt, size = 10, shapeName = "circle"):
+    ctrlName, ctrlGrpName = controllerShapes.CreateController("ac_" + jnt, shapeName, size, jnt)
     mc.orientConstraint(ctrlName, jnt)
 
     return ctrlName, ctrlGrpName
 
 
 def CreateBox(name, size = 10):
-    #curve -d 1 -p -0.5 0.5 0.5 -p 0.5 0.5 0.5 -p 0.5 0.5 -0.5 -p -0.5 0.5 -0.5 -p -0.5 0.5 0.5 -p -0.5 -0.5 0.5 -p 0.5 -0.5 0.5 -p 0.5 0.5 0.5 -p 0.5 -0.5 0.5 -p 0.5 -0.5 -0.5 -p 0.5 0.5 -0.5 -p 0.5 -0.5 -0.5 -p -0.5 -0.5 -0.5 -p -0.5 0.5 -0.5 -p -0.5 -0.5 -0.5 -p -0.5 -0.5 0.5 -k 0 -k 1 -k 2 -k 3 -k 4 -k 5 -k 6 -k 7 -k 8 -k 9 -k 10 -k 11 -k 12 -k 13 -k 14 -k 15 ;
-    p = ((-0.5,0.5,0.5), (0.5,0.5,0.5), (0.5,0.5,-0.5), (-0.5, 0.5, -0.5), (-0.5, 0.5, 0.5), (-0.5, -0.5, 0.5), (0.5, -0.5, 0.5), (0.5, 0.5, 0.5), (0.5, -0.5, 0.5), (0.5, -0.5, -0.5), (0.5, 0.5, -0.5), (0.5, -0.5, -0.5), (-0.5, -0.5, -0.5), (-0.5, 0.5, -0.5), (-0.5, -0.5, -0.5), (-0.5, -0.5, 0.5))
-    mc.curve(n=name, d=1, p = p)
-
-    mc.setAttr(name + ".scale", size,size,size, type = "float3")
-    mc.makeIdentity(name, apply = True)
+    return controllerShapes.CreateCurve(name, "box", size)
 
 def CreatePlus(name, size = 10):
-    p = ((0.5,0,1),(0.5,0,0.5),(1,0,0.5),(1,0,-0.5),(0.5, 0,-0.5), (0.5, 0, -1),(-0.5, 0, -1),(-0.5,0,-0.5),(-1, 0, -0.5),(-1,0,0.5),(-0.5,0,0.5),(-0.5,0,1),(0.5,0,1))
-    mc.curve(n=name, d=1, p = p)
-    mc.setAttr(name + ".rx", 90)
-    mc.setAttr(name + ".scale", size,size,size, type = "float3")
-    mc.makeIdentity(name, apply = True)
+    return controllerShapes.CreateCurve(name, "plus", size)
+
+def FindThreeJntChains(topJnts):
+    # one listRelatives per hierarchy, a chain starts at a joint whose parent branches (or at the top)
+    # and runs through two joints that each have a single joint child
+    chains = []
+    for topJnt in topJnts:
+        topPath = mc.ls(topJnt, l=True)[0]
+        jntPaths = [topPath] + sorted(mc.listRelatives(topJnt, ad=True, type="joint", f=True) or [])
+        jntChildren = {path: [] for path in jntPaths}
+        for path in jntPaths[1:]:
+            parentPath = path.rsplit("|", 1)[0]
+            if parentPath in jntChildren:
+                jntChildren[parentPath].append(path)
+
+        for path in jntPaths:
+            parentPath = path.rsplit("|", 1)[0]
+            if path != topPath and len(jntChildren.get(parentPath, [])) < 2:
+                continue
+
+            if len(jntChildren[path]) != 1 or len(jntChildren[jntChildren[path][0]]) != 1:
+                continue
+
+            middle = jntChildren[path][0]
+            end = jntChildren[middle][0]
+            chains.append(tuple(jntPath.rsplit("|", 1)[-1] for jntPath in (path, middle, end)))
+
+    return chains
+
+def RigThreeJntChains(chains, controllerSize = 5, fkCtrlShape = "circle", ikCtrlShape = "box"):
+    # all chains in one undo chunk with the viewport suspended, returns the seconds each chain took
+    timings = []
+    mc.undoInfo(openChunk=True, chunkName="RigThreeJntChains")
+    mc.refresh(suspend=True)
+    try:
+        # the ik of every chain is built first, so the placement math runs once for all chains
+        threeJntChains = []
+        rootPositions, endPositions, poleVectors = [], [], []
+        for root, middle, end in chains:
+            startTime = time.perf_counter()
+            threeJntChain = ThreeJntChain()
+            threeJntChain.SetJnts(root, middle, end)
+            threeJntChain.controllerSize = controllerSize
+            threeJntChain.fkCtrlShape = fkCtrlShape
+            threeJntChain.ikCtrlShape = ikCtrlShape
+            threeJntChain.BuildFkIk()
+            rootPos, endPos, poleVec = threeJntChain.GetPlacementInputs()
+            rootPositions += rootPos
+            endPositions += endPos
+            poleVectors += poleVec
+            threeJntChains.append(threeJntChain)
+            timings.append([root, time.perf_counter() - startTime])
+
+        poleVecPositions, ikfkBlendPositions = GetChainPlacements(rootPositions, endPositions, poleVectors)
+        for i, threeJntChain in enumerate(threeJntChains):
+            startTime = time.perf_counter()
+            threeJntChain.FinishRig(poleVecPositions[i], ikfkBlendPositions[i])
+            timings[i][1] += time.perf_counter() - startTime
+    finally:
+        mc.refresh(suspend=False)
+        mc.undoInfo(closeChunk=True)
+
+    print(f"rigged {len(timings)} chains in {sum(seconds for root, seconds in timings):.3f}s")
+    for root, seconds in timings:
+        print(f"    {root}: {seconds:.3f}s")
+
+    return timings
 
 class ThreeJntChain:
     def __init__(self):
@@ -72,82 +276,270 @@ class ThreeJntChain:
         self.middle = ""
         self.end = ""
         self.controllerSize = 5
+        self.fkCtrlShape = "circle"
+        self.ikCtrlShape = "box"
+        self.rootCtrl = ""
+        self.rootCtrlGrp = ""
+        self.ikEndCtrl = ""
+        self.ikEndCtrlGrp = ""
+        self.endOrientConstraint = ""
+        self.ikHandleName = ""
 
     def AutoFindJntsBasedOnSel(self):
         self.root = mc.ls(sl=True, type = "joint")[0]
         self.middle = mc.listRelatives(self.root, c=True, type = "joint")[0]
         self.end = mc.listRelatives(self.middle, c=True, type ="joint")[0]
 
+    def SetJnts(self, root, middle, end):
+        self.root = root
+        self.middle = middle
+        self.end = end
+
     def RigThreeJntChain(self):
-        rootCtrl, rootCtrlGrp = CreateControllerForJnt(self.root, self.controllerSize)
-        middleCtrl, middleCtrlGrp = CreateControllerForJnt(self.middle, self.controllerSize)
-        endCtrl, endCtrlGrp = CreateControllerForJnt(self.end, self.controllerSize)
+        self.BuildFkIk()
+        poleVecPos, ikfkBlendPos = GetChainPlacements(*self.GetPlacementInputs())
+        self.FinishRig(poleVecPos[0], ikfkBlendPos[0])
+
+    def BuildFkIk(self):
+        self.rootCtrl, self.rootCtrlGrp = CreateControllerForJnt(self.root, self.controllerSize, self.fkCtrlShape)
+        middleCtrl, middleCtrlGrp = CreateControllerForJnt(self.middle, self.controllerSize, self.fkCtrlShape)
+        endCtrl, endCtrlGrp = CreateControllerForJnt(self.end, self.controllerSize, self.fkCtrlShape)
 
-        mc.parent(middleCtrlGrp, rootCtrl)
+        mc.parent(middleCtrlGrp, self.rootCtrl)
         mc.parent(endCtrlGrp, middleCtrl)
 
-        ikEndCtrl = "ac_ik_" + self.end
-        CreateBox(ikEndCtrl, self.controllerSize)
-        ikEndCtrlGrp = ikEndCtrl + "_grp"
-        mc.group(ikEndCtrl, n = ikEndCtrlGrp)
-        mc.matchTransform(ikEndCtrlGrp, self.end)
-        endOrientConstraint = mc.orientConstraint(ikEndCtrl, self.end)[0]
+        self.ikEndCtrl, self.ikEndCtrlGrp = controllerShapes.CreateController("ac_ik_" + self.end, self.ikCtrlShape, self.controllerSize, self.end)
+        self.endOrientConstraint = mc.orientConstraint(self.ikEndCtrl, self.end)[0]
         
-        ikHandleName = "ikHanle_" + self.end
-        mc.ikHandle(n=ikHandleName, sj = self.root, ee=self.end, sol = "ikRPsolver") 
+        self.ikHandleName = "ikHanle_" + self.end
+        mc.ikHandle(n=self.ikHandleName, sj = self.root, ee=self.end, sol = "ikRPsolver") 
 
+    def GetPlacementInputs(self):
+        rootJntPos = mc.xform(self.root, t=True, q=True, ws=True)
+        endJntPos = mc.xform(self.end, t=True, q=True, ws=True)
+        poleVec = mc.getAttr(self.ikHandleName + ".poleVector")[0]
+        return [rootJntPos], [endJntPos], [poleVec]
+
+    def FinishRig(self, poleVecPos, ikfkBlendPos):
         ikMidCtrl = "ac_ik_" + self.middle
         mc.spaceLocator(n=ikMidCtrl)
-    
-        rootJntPos = GetObjPos(self.root)
-        endJntPos = GetObjPos(self.end)
-        poleVec = mc.getAttr(ikHandleName + ".poleVector")[0]
-        poleVec = Vector(poleVec[0], poleVec[1], poleVec[2])
-
-        armVec = endJntPos - rootJntPos
-        halfArmLengh = armVec.GetLength()/2
-
-        poleVecPos = rootJntPos + poleVec * halfArmLengh + armVec/2
         ikMidCtrlGrp = ikMidCtrl + "_grp"
         mc.group(ikMidCtrl, n = ikMidCtrlGrp)
         mc.setAttr(ikMidCtrl+".scale", self.controllerSize, self.controllerSize, self.controllerSize, type = "float3")
-        SetObjPos(ikMidCtrlGrp, poleVecPos)     
+        SetObjPos(ikMidCtrlGrp, Vector(*poleVecPos))
 
-        mc.poleVectorConstraint(ikMidCtrl, ikHandleName)
-        mc.parent(ikHandleName, ikEndCtrl)
+        mc.poleVectorConstraint(ikMidCtrl, self.ikHandleName)
+        mc.parent(self.ikHandleName, self.ikEndCtrl)
         
-        ikfkBlendCtrl = "ac_" + self.root + "_ikfk_blend"
-        CreatePlus(ikfkBlendCtrl, 2)
-        ikfkBlendCtrlGrp = ikfkBlendCtrl + "_grp"
-        mc.group(ikfkBlendCtrl, n = ikfkBlendCtrlGrp)
-
-        dir = 1
-        if rootJntPos.x < 0:
-            dir = -1
-            
-        ikfkBlendPos = rootJntPos + Vector(dir * halfArmLengh/4, halfArmLengh/4, 0)
-        SetObjPos(ikfkBlendCtrlGrp, ikfkBlendPos)
+        ikfkBlendCtrl, ikfkBlendCtrlGrp = controllerShapes.CreateController("ac_" + self.root + "_ikfk_blend", "plus", 2)
+        SetObjPos(ikfkBlendCtrlGrp, Vector(*ikfkBlendPos))
 
         ikfkBlendAttr = "ikfkBlend"
         mc.addAttr(ikfkBlendCtrl, ln = ikfkBlendAttr, k=True, at = "float", min = 0, max = 1)
-        mc.connectAttr(ikfkBlendCtrl + "." + ikfkBlendAttr, ikHandleName + ".ikBlend")
+        mc.connectAttr(ikfkBlendCtrl + "." + ikfkBlendAttr, self.ikHandleName + ".ikBlend")
 
         ikfkReverse = "reverse_" + self.root + "_ikfkblend"
         mc.createNode("reverse", n = ikfkReverse)
 
         mc.connectAttr(ikfkBlendCtrl+"."+ikfkBlendAttr, ikfkReverse+".inputX")
-        mc.connectAttr(ikfkBlendCtrl+"."+ikfkBlendAttr, ikEndCtrlGrp + ".v")
+        mc.connectAttr(ikfkBlendCtrl+"."+ikfkBlendAttr, self.ikEndCtrlGrp + ".v")
         mc.connectAttr(ikfkBlendCtrl+"."+ikfkBlendAttr, ikMidCtrlGrp + ".v")
-        mc.connectAttr(ikfkReverse+ ".outputX", rootCtrlGrp +".v")
+        mc.connectAttr(ikfkReverse+ ".outputX", self.rootCtrlGrp +".v")
 
-        mc.connectAttr(ikfkReverse + ".outputX", endOrientConstraint + ".w0")
-        mc.connectAttr(ikfkBlendCtrl + "." +ikfkBlendAttr, endOrientConstraint + ".w1")
+        mc.connectAttr(ikfkReverse + ".outputX", self.endOrientConstraint + ".w0")
+        mc.connectAttr(ikfkBlendCtrl + "." +ikfkBlendAttr, self.endOrientConstraint + ".w1")
 
         #group everything together and name it properly
         topGrpName = self.root + "_rig_grp"
-        mc.group(rootCtrlGrp, ikEndCtrlGrp, ikMidCtrlGrp, ikfkBlendCtrlGrp, n = topGrpName)
+        mc.group(self.rootCtrlGrp, self.ikEndCtrlGrp, ikMidCtrlGrp, ikfkBlendCtrlGrp, n = topGrpName)
         #hide useless stuff - ikHandle.
-        mc.hide(ikHandleName)
+        mc.hide(self.ikHandleName)
+
+class ThreeJntChainTemplate:
+    # the nodes, parents, curves, user attrs, world matrices and connections one RigThreeJntChain run made,
+    # with the joint names swapped for {root}, {middle} and {end} so the rig can be stamped onto other chains
+    MATRIX_TYPES = ("transform", "ikHandle")
+    SHARED_TYPES = ("ikRPsolver", "ikSCsolver", "ikSystem")
+    # mirrors across the yz plane: nodes matched to a joint take the target joint's matrix like matchTransform,
+    # the rest keep their orientation and only move
+    REFLECT_X = np.diag([-1.0, 1.0, 1.0, 1.0])
+
+    def __init__(self, name = "threeJntChain"):
+        self.name = name
+        self.nodes = []
+        self.connections = []
+        self.rootMatrix = np.identity(4)
+        self.mirroredMatrices = None
+        # the recorded curves stay with the template, the shape pickers only list the global shapes
+        self.curveShapes = ControllerShapes()
+
+    def Record(self, threeJntChain: ThreeJntChain):
+        nodesBefore = set(mc.ls())
+        threeJntChain.RigThreeJntChain()
+        newNodes = [node for node in mc.ls() if node not in nodesBefore]
+
+        jnts = {threeJntChain.root: "{root}", threeJntChain.middle: "{middle}", threeJntChain.end: "{end}"}
+        # whole names only, a joint name has to sit between underscores, other separators or the ends of the name,
+        # or in front of the Shape maya gives a shape or the W0 of a constraint weight attr
+        jntPattern = re.compile(r"(?<![^\W_])(" + "|".join(re.escape(jnt) for jnt in sorted(jnts, key=len, reverse=True)) + r")(?=[\W_]|Shape\d*$|W\d+$|$)")
+        def Tokenize(name):
+            return jntPattern.sub(lambda match: jnts[match.group(1)], name)
+
+        # in a plug only the node and the user attrs recorded on it are tokenized, never maya's own attrs
+        userAttrs = {}
+        def TokenizePlug(plug):
+            node, attr = plug.split(".", 1)
+            return Tokenize(node) + "." + userAttrs.get(node, {}).get(attr, attr)
+
+        jntMatrices = [np.array(mc.xform(jnt, q=True, ws=True, m=True)).reshape(4, 4) for jnt in jnts]
+        self.rootMatrix = np.array(mc.xform(threeJntChain.root, q=True, ws=True, m=True)).reshape(4, 4)
+
+        self.nodes = []
+        recorded = []
+        for node, longName in zip(newNodes, mc.ls(newNodes, l=True)):
+            nodeType = mc.nodeType(node)
+            if nodeType in self.SHARED_TYPES or nodeType == "nurbsCurve":
+                continue
+
+            parent = (mc.listRelatives(node, p=True) or [""])[0]
+            nodeRecord = {"name": Tokenize(node), "type": nodeType, "parent": Tokenize(parent), "depth": longName.count("|"), "curve": "", "matrix": None, "jnt": ""}
+            if mc.listRelatives(node, s=True, type="nurbsCurve"):
+                nodeRecord["curve"] = nodeRecord["name"]
+                self.curveShapes.AddShapeFromCurve(nodeRecord["curve"], node)
+
+            if nodeType in self.MATRIX_TYPES:
+                matrix = np.array(mc.xform(node, q=True, ws=True, m=True)).reshape(4, 4)
+                rotation = matrix[:3, :3] / np.linalg.norm(matrix[:3, :3], axis=1, keepdims=True)
+                nodeRecord["matrix"] = matrix
+                for jntToken, jntMatrix in zip(jnts.values(), jntMatrices):
+                    if np.allclose(rotation, jntMatrix[:3, :3], atol=1e-6) and np.allclose(matrix[3], jntMatrix[3], atol=1e-6):
+                        nodeRecord["jnt"] = jntToken
+                        break
+
+            nodeRecord["userAttrs"] = []
+            userAttrs[node] = {}
+            for attr in mc.listAttr(node, ud=True) or []:
+                userAttrs[node][attr] = Tokenize(attr)
+                plug = node + "." + attr
+                attrRange = [mc.attributeQuery(attr, n=node, min=True)[0] if mc.attributeQuery(attr, n=node, minExists=True) else None,
+                             mc.attributeQuery(attr, n=node, max=True)[0] if mc.attributeQuery(attr, n=node, maxExists=True) else None]
+                nodeRecord["userAttrs"].append([userAttrs[node][attr], mc.attributeQuery(attr, n=node, shortName=True), mc.getAttr(plug, type=True), mc.getAttr(plug, k=True), attrRange, mc.getAttr(plug)])
+
+            nodeRecord["visibility"] = mc.getAttr(node + ".visibility") if longName.startswith("|") else None
+            self.nodes.append(nodeRecord)
+            recorded.append(node)
+
+        # every input of a recorded node, plus the outputs that drive something outside the rig (the joints)
+        self.connections = []
+        inputs = mc.listConnections(recorded, s=True, d=False, c=True, p=True) or []
+        for dst, src in zip(inputs[::2], inputs[1::2]):
+            self.connections.append((TokenizePlug(src), TokenizePlug(dst)))
+
+        outputs = mc.listConnections(recorded, s=False, d=True, c=True, p=True) or []
+        for src, dst in zip(outputs[::2], outputs[1::2]):
+            if dst.split(".")[0] not in recorded:
+                self.connections.append((TokenizePlug(src), TokenizePlug(dst)))
+
+        # parents before children, so every node can be created straight under its parent
+        self.nodes.sort(key=lambda nodeRecord: nodeRecord["depth"])
+        self.mirroredMatrices = None
+
+    def GetMirroredMatrices(self):
+        # symmetric, so worked out once per template and reused for every mirrored chain
+        if self.mirroredMatrices is None:
+            matrices = np.array([nodeRecord["matrix"] for nodeRecord in self.nodes if nodeRecord["matrix"] is not None]).reshape(-1, 4, 4)
+            self.mirroredMatrices = self.REFLECT_X @ matrices @ self.REFLECT_X
+
+        return self.mirroredMatrices
+
+    def GetMatchedMatrices(self, root):
+        # a matching limb somewhere else: the whole rig moves with the root joint
+        matrices = np.array([nodeRecord["matrix"] for nodeRecord in self.nodes if nodeRecord["matrix"] is not None]).reshape(-1, 4, 4)
+        rootMatrix = np.array(mc.xform(root, q=True, ws=True, m=True)).reshape(4, 4)
+        return matrices @ np.linalg.inv(self.rootMatrix) @ rootMatrix
+
+    def Apply(self, root, middle, end, mirror = True):
+        # creates the recorded graph for another chain, no ik solve, constraint setup or pole vector math
+        jnts = {"{root}": root, "{middle}": middle, "{end}": end}
+        createdNames = {}
+        def ReplaceTokens(name):
+            for token, jnt in jnts.items():
+                name = name.replace(token, jnt)
+            return name
+
+        def GetName(name):
+            return createdNames[name] if name in createdNames else ReplaceTokens(name)
+
+        def GetPlug(plug):
+            node, attr = plug.split(".", 1)
+            return GetName(node) + "." + ReplaceTokens(attr)
+
+        curveParents = {}
+        for nodeRecord in self.nodes:
+            name, parent = GetName(nodeRecord["name"]), GetName(nodeRecord["parent"])
+            if nodeRecord["curve"]:
+                createdNames[nodeRecord["name"]] = self.curveShapes.CreateCurve(name, nodeRecord["curve"], 1)
+                if parent:
+                    curveParents.setdefault(parent, []).append(createdNames[nodeRecord["name"]])
+            elif parent:
+                createdNames[nodeRecord["name"]] = mc.createNode(nodeRecord["type"], n=name, p=parent)
+            else:
+                createdNames[nodeRecord["name"]] = mc.createNode(nodeRecord["type"], n=name)
+
+        for parent, children in curveParents.items():
+            mc.parent(children, parent, r=True)
+
+        for nodeRecord in self.nodes:
+            name = createdNames[nodeRecord["name"]]
+            for attr, shortName, attrType, keyable, (minValue, maxValue), value in nodeRecord["userAttrs"]:
+                attr = ReplaceTokens(attr)
+                attrFlags = {"ln": attr, "sn": shortName, "at": attrType, "k": keyable, "dv": value}
+                if minValue is not None:
+                    attrFlags["min"] = minValue
+                if maxValue is not None:
+                    attrFlags["max"] = maxValue
+                mc.addAttr(name, **attrFlags)
+
+            if nodeRecord["visibility"] is False:
+                mc.setAttr(name + ".visibility", False)
+
+        matrices = self.GetMirroredMatrices() if mirror else self.GetMatchedMatrices(root)
+        matrixNodes = [nodeRecord for nodeRecord in self.nodes if nodeRecord["matrix"] is not None]
+        # the target joints may not be oriented like the mirrored or moved recorded ones, so they are read, one xform each
+        jntMatrices = {token: mc.xform(jnt, q=True, ws=True, m=True) for token, jnt in jnts.items() if any(nodeRecord["jnt"] == token for nodeRecord in matrixNodes)}
+        for nodeRecord, matrix in zip(matrixNodes, matrices.tolist()):
+            if nodeRecord["jnt"]:
+                mc.xform(createdNames[nodeRecord["name"]], ws=True, m=jntMatrices[nodeRecord["jnt"]])
+            else:
+                mc.xform(createdNames[nodeRecord["name"]], ws=True, m=[value for row in matrix for value in row])
+
+        for src, dst in self.connections:
+            mc.connectAttr(GetPlug(src), GetPlug(dst))
+
+        return createdNames
+
+def GetMirroredChain(chain, search = "_l_", replace = "_r_"):
+    return tuple(jnt.replace(search, replace) for jnt in chain)
+
+def ReplicateThreeJntChains(template: ThreeJntChainTemplate, chains, mirror = True):
+    # like RigThreeJntChains, but every chain is stamped from the template
+    timings = []
+    mc.undoInfo(openChunk=True, chunkName="ReplicateThreeJntChains")
+    mc.refresh(suspend=True)
+    try:
+        for root, middle, end in chains:
+            startTime = time.perf_counter()
+            template.Apply(root, middle, end, mirror)
+            timings.append([root, time.perf_counter() - startTime])
+    finally:
+        mc.refresh(suspend=False)
+        mc.undoInfo(closeChunk=True)
+
+    print(f"replicated {len(timings)} chains in {sum(seconds for root, seconds in timings):.3f}s")
+    for root, seconds in timings:
+        print(f"    {root}: {seconds:.3f}s")
+
+    return timings
 
 
 
@@ -155,7 +547,7 @@ class ThreeJntChain:
 #                UI                #
 ####################################
 
-from PySide2.QtWidgets import QWidget, QLabel, QVBoxLayout, QPushButton, QLineEdit, QHBoxLayout, QColorDialog
+from PySide2.QtWidgets import QWidget, QLabel, QVBoxLayout, QPushButton, QLineEdit, QHBoxLayout, QColorDialog, QComboBox, QFileDialog
 from PySide2.QtGui import QDoubleValidator, QColor, QPainter, QPalette
 
 class ColorPickerWidget(QWidget):
@@ -203,6 +595,22 @@ class ThreeJntChainWiget(QWidget):
 
         self.masterLayout.addLayout(ctrlSettingLayout)
 
+        shapeLayout = QHBoxLayout()
+        shapeLayout.addWidget(QLabel("FK Shape: "))
+        self.fkShapeBox = QComboBox()
+        self.fkShapeBox.currentTextChanged.connect(self.FkShapeSet)
+        shapeLayout.addWidget(self.fkShapeBox)
+
+        shapeLayout.addWidget(QLabel("IK Shape: "))
+        self.ikShapeBox = QComboBox()
+        self.ikShapeBox.currentTextChanged.connect(self.IkShapeSet)
+        shapeLayout.addWidget(self.ikShapeBox)
+
+        loadShapesBtn = QPushButton("Load Shapes")
+        loadShapesBtn.clicked.connect(self.LoadShapesBtnClicked)
+        shapeLayout.addWidget(loadShapesBtn)
+        self.masterLayout.addLayout(shapeLayout)
+
         self.colorPicker = ColorPickerWidget()
         self.masterLayout.addWidget(self.colorPicker)
 
@@ -210,9 +618,50 @@ class ThreeJntChainWiget(QWidget):
         self.masterLayout.addWidget(rigThreeJntChainBtn)
         rigThreeJntChainBtn.clicked.connect(self.RigThreeJntChainBtnClicked)
 
+        rigAllChainsBtn = QPushButton("Rig All Chains Under Selection")
+        self.masterLayout.addWidget(rigAllChainsBtn)
+        rigAllChainsBtn.clicked.connect(self.RigAllChainsBtnClicked)
+
+        mirrorLayout = QHBoxLayout()
+        mirrorLayout.addWidget(QLabel("Search: "))
+        self.mirrorSearch = QLineEdit("_l_")
+        mirrorLayout.addWidget(self.mirrorSearch)
+        mirrorLayout.addWidget(QLabel("Replace: "))
+        self.mirrorReplace = QLineEdit("_r_")
+        mirrorLayout.addWidget(self.mirrorReplace)
+        self.masterLayout.addLayout(mirrorLayout)
+
+        rigAndMirrorBtn = QPushButton("Rig And Mirror Three Jnt Chain")
+        self.masterLayout.addWidget(rigAndMirrorBtn)
+        rigAndMirrorBtn.clicked.connect(self.RigAndMirrorBtnClicked)
+
 
         self.adjustSize()
         self.threeJntChain = ThreeJntChain()
+        self.RefreshShapeBoxes()
+
+    def RefreshShapeBoxes(self):
+        fkShape, ikShape = self.threeJntChain.fkCtrlShape, self.threeJntChain.ikCtrlShape
+        for shapeBox, shapeName in ((self.fkShapeBox, fkShape), (self.ikShapeBox, ikShape)):
+            shapeBox.blockSignals(True)
+            shapeBox.clear()
+            shapeBox.addItems(controllerShapes.GetShapeNames())
+            shapeBox.setCurrentText(shapeName)
+            shapeBox.blockSignals(False)
+
+    def FkShapeSet(self, shapeName):
+        self.threeJntChain.fkCtrlShape = shapeName
+
+    def IkShapeSet(self, shapeName):
+        self.threeJntChain.ikCtrlShape = shapeName
+
+    def LoadShapesBtnClicked(self):
+        path = QFileDialog().getOpenFileName(self, "Load Controller Shapes", "", "Shapes (*.json)")[0]
+        if not path:
+            return
+
+        controllerShapes.LoadShapes(path)
+        self.RefreshShapeBoxes()
 
     def CtrlSizeValueSet(self, valStr:str):
         size = float(valStr)
@@ -221,10 +670,27 @@ class ThreeJntChainWiget(QWidget):
     def RigThreeJntChainBtnClicked(self):
         self.threeJntChain.RigThreeJntChain()
 
+    def RigAllChainsBtnClicked(self):
+        chains = FindThreeJntChains(mc.ls(sl=True, type = "joint"))
+        self.selectionDisplay.setText("\n".join(", ".join(chain) for chain in chains))
+        RigThreeJntChains(chains, self.threeJntChain.controllerSize, self.threeJntChain.fkCtrlShape, self.threeJntChain.ikCtrlShape)
+
+    def RigAndMirrorBtnClicked(self):
+        chain = (self.threeJntChain.root, self.threeJntChain.middle, self.threeJntChain.end)
+        mirroredChain = GetMirroredChain(chain, self.mirrorSearch.text(), self.mirrorReplace.text())
+        if mirroredChain == chain or not all(mc.objExists(jnt) for jnt in mirroredChain):
+            self.selectionDisplay.setText(f"no mirrored chain found for {', '.join(chain)}")
+            return
+
+        template = ThreeJntChainTemplate(self.threeJntChain.root)
+        template.Record(self.threeJntChain)
+        ReplicateThreeJntChains(template, [mirroredChain])
+
     def AutoFindBtnClicked(self):
         print("button pressed")
         self.threeJntChain.AutoFindJntsBasedOnSel()
         self.selectionDisplay.setText(f"{self.threeJntChain.root}, {self.threeJntChain.middle}, {self.threeJntChain.end}") 
 
-treeJntChainWidget = ThreeJntChainWiget()
-treeJntChainWidget.show()
+if __name__ == "__main__":
+    treeJntChainWidget = ThreeJntChainWiget()
+    treeJntChainWidget.show()
@@ -0,0 +1,1535 @@
+# an in memory stand in for maya.cmds and the parts of the maya api the tools use, so they run on plain python:
+#     import FakeMayaScene
+#     FakeMayaScene.InstallFakeMaya()
+#     FakeMayaScene.InstallHeadlessQt()
+#     import ProxyBuilder
+# every command is counted and timed, GetCallCounts and GetCommandSeconds read them back
+import re
+import sys
+import types
+import struct
+import zlib
+import time
+from collections import Counter
+
+import numpy as np
+
+####################################
+#              Scene               #
+####################################
+
+DAG_TYPES = {"transform", "joint", "mesh", "nurbsCurve", "locator", "ikHandle", "ikEffector", "orientConstraint", "poleVectorConstraint", "parentConstraint"}
+SHAPE_TYPES = {"mesh", "nurbsCurve", "locator"}
+ATTR_ALIASES = {
+    "t": "translate", "r": "rotate", "s": "scale", "v": "visibility",
+    "it": "inheritsTransform"
+}
+COMPOUND_CHILDREN = {
+    "translate": ["tx", "ty", "tz", "translateX", "translateY", "translateZ"],
+    "rotate": ["rx", "ry", "rz", "rotateX", "rotateY", "rotateZ"],
+    "scale": ["sx", "sy", "sz", "scaleX", "scaleY", "scaleZ"],
+}
+
+def GetCompoundChild(attr):
+    for compound, children in COMPOUND_CHILDREN.items():
+        if attr in children:
+            return compound, children.index(attr) % 3
+    return None, None
+
+def ComposeMatrix(translate, rotate, scale):
+    cx, cy, cz = np.cos(np.radians(rotate))
+    sx, sy, sz = np.sin(np.radians(rotate))
+    rotX = np.array([[1, 0, 0], [0, cx, sx], [0, -sx, cx]])
+    rotY = np.array([[cy, 0, -sy], [0, 1, 0], [sy, 0, cy]])
+    rotZ = np.array([[cz, sz, 0], [-sz, cz, 0], [0, 0, 1]])
+    matrix = np.identity(4)
+    matrix[:3, :3] = np.diag(scale) @ rotX @ rotY @ rotZ
+    matrix[3, :3] = translate
+    return matrix
+
+def DecomposeMatrix(matrix):
+    scale = np.linalg.norm(matrix[:3, :3], axis=1)
+    rot = matrix[:3, :3] / np.where(scale == 0, 1, scale)[:, None]
+    rotY = np.arcsin(np.clip(-rot[0, 2], -1, 1))
+    rotX = np.arctan2(rot[1, 2], rot[2, 2])
+    rotZ = np.arctan2(rot[0, 1], rot[0, 0])
+    return list(matrix[3, :3]), list(np.degrees([rotX, rotY, rotZ])), list(scale)
+
+class FakeMesh:
+    def __init__(self, points, faceVertCounts, faceVerts):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.faceVertCounts = np.asarray(faceVertCounts, dtype=np.int64)
+        self.faceVerts = np.asarray(faceVerts, dtype=np.int64)
+        self.uvCount = 0
+
+    def Copy(self):
+        copy = FakeMesh(self.points.copy(), self.faceVertCounts.copy(), self.faceVerts.copy())
+        copy.uvCount = self.uvCount
+        return copy
+
+    def DeleteFaces(self, faces):
+        keepFaces = np.ones(len(self.faceVertCounts), dtype=bool)
+        keepFaces[faces] = False
+        keepFaceVerts = np.repeat(keepFaces, self.faceVertCounts)
+        faceVerts = self.faceVerts[keepFaceVerts]
+        usedVerts, faceVerts = np.unique(faceVerts, return_inverse=True)
+        self.points = self.points[usedVerts]
+        self.faceVertCounts = self.faceVertCounts[keepFaces]
+        self.faceVerts = faceVerts.astype(np.int64)
+        self.uvCount = len(self.faceVerts) if self.uvCount else 0
+
+    def GetByteSize(self):
+        return self.points.nbytes + self.faceVertCounts.nbytes + self.faceVerts.nbytes + self.uvCount * 8
+
+class FakeSkin:
+    def __init__(self, influences, geometry, weights):
+        self.influences = influences
+        self.geometry = geometry
+        self.weights = weights
+
+class FakeNode:
+    def __init__(self, name, nodeType):
+        self.name = name
+        self.type = nodeType
+        self.parent = None
+        self.children = []
+        self.attrs = {}
+        self.userAttrs = {}
+        self.userAttrInfo = {}
+        self.mesh = None
+        self.cvs = None
+        self.skin = None
+        self.setMembers = None
+        self.deleted = False
+        if nodeType in DAG_TYPES and nodeType not in SHAPE_TYPES:
+            self.attrs["translate"] = [0.0, 0.0, 0.0]
+            self.attrs["rotate"] = [0.0, 0.0, 0.0]
+            self.attrs["scale"] = [1.0, 1.0, 1.0]
+            self.attrs["inheritsTransform"] = True
+        if nodeType in DAG_TYPES:
+            self.attrs["visibility"] = True
+
+    def IsDag(self):
+        return self.type in DAG_TYPES
+
+    def IsShape(self):
+        return self.type in SHAPE_TYPES
+
+    def GetFullPath(self):
+        path = ""
+        node = self
+        while node:
+            path = "|" + node.name + path
+            node = node.parent
+        return path
+
+    def GetLocalMatrix(self):
+        if "translate" not in self.attrs:
+            return np.identity(4)
+        return ComposeMatrix(self.attrs["translate"], self.attrs["rotate"], self.attrs["scale"])
+
+    def GetWorldMatrix(self):
+        matrix = self.GetLocalMatrix()
+        if self.parent and self.attrs.get("inheritsTransform", True):
+            matrix = matrix @ self.parent.GetWorldMatrix()
+        return matrix
+
+    def SetWorldMatrix(self, matrix):
+        if self.parent and self.attrs.get("inheritsTransform", True):
+            matrix = matrix @ np.linalg.inv(self.parent.GetWorldMatrix())
+        self.attrs["translate"], self.attrs["rotate"], self.attrs["scale"] = DecomposeMatrix(matrix)
+
+class FakeScene:
+    def __init__(self):
+        self.nodes = {}
+        self.selection = []
+        self.connections = {}
+        self.currentTime = 1.0
+        self.playbackMin = 1.0
+        self.playbackMax = 120.0
+        self.scriptJobs = {}
+        self.nextJobId = 1
+        self.deferred = []
+        self.connectionCallbacks = {}
+        self.dagCallbacks = {}
+        self.nextCallbackId = 1
+        self.refreshSuspended = False
+        self.undoChunks = 0
+        self.undos = 0
+        self.bakes = []
+        self.exports = []
+        self.fbxSettings = {}
+        self.fbxVersion = 7400
+        self.calls = Counter()
+        self.commandSeconds = Counter()
+        for name, nodeType in [("time1", "time"), ("initialShadingGroup", "shadingEngine"), ("lambert1", "lambert")]:
+            self.CreateNode(nodeType, name)
+
+    ####################################
+    #            Bookkeeping           #
+    ####################################
+    def GetUniqueName(self, name):
+        if name not in self.nodes:
+            return name
+        base = name.rstrip("0123456789") or name
+        index = 1
+        while f"{base}{index}" in self.nodes:
+            index += 1
+        return f"{base}{index}"
+
+    def CreateNode(self, nodeType, name = None, parent = None):
+        name = self.GetUniqueName(name or nodeType + "1")
+        node = FakeNode(name, nodeType)
+        if nodeType in ("shadingEngine", "objectSet"):
+            node.setMembers = set()
+        self.nodes[name] = node
+        if parent:
+            self.Reparent(node, parent)
+        return node
+
+    def GetNode(self, name):
+        name = str(name)
+        if "|" in name:
+            name = name.rstrip("|").split("|")[-1]
+        node = self.nodes.get(name)
+        if node is None:
+            raise ValueError(f"No object matches name: {name}")
+        return node
+
+    def HasNode(self, name):
+        name = str(name)
+        if "|" in name:
+            name = name.rstrip("|").split("|")[-1]
+        return name in self.nodes
+
+    def Reparent(self, node, parent, keepWorld = False):
+        worldMatrix = node.GetWorldMatrix() if keepWorld and node.IsDag() else None
+        oldParent = node.parent
+        if node.parent:
+            node.parent.children.remove(node)
+        node.parent = parent
+        if parent:
+            parent.children.append(node)
+        if worldMatrix is not None and not node.IsShape():
+            node.SetWorldMatrix(worldMatrix)
+        for callback in list(self.dagCallbacks.values()):
+            for changedParent in [oldParent, parent]:
+                if changedParent:
+                    callback(0, MDagPath(node), MDagPath(changedParent), None)
+
+    def GetShapes(self, node):
+        return [child for child in node.children if child.IsShape()]
+
+    def GetMeshShape(self, name):
+        node = self.GetNode(name)
+        if node.mesh is not None:
+            return node
+        for shape in self.GetShapes(node):
+            if shape.mesh is not None:
+                return shape
+        raise ValueError(f"{name} is not a mesh")
+
+    def Connect(self, src, dst):
+        self.connections[dst] = src
+        for callback in list(self.connectionCallbacks.values()):
+            callback(src, dst, True, None)
+
+    def Disconnect(self, dst):
+        src = self.connections.pop(dst, None)
+        if src is not None:
+            for callback in list(self.connectionCallbacks.values()):
+                callback(src, dst, False, None)
+
+    def DeleteNode(self, node):
+        if node.deleted:
+            return
+        for child in list(node.children):
+            self.DeleteNode(child)
+        node.deleted = True
+        if node.parent:
+            node.parent.children.remove(node)
+            node.parent = None
+        self.nodes.pop(node.name, None)
+        for dst, src in list(self.connections.items()):
+            if dst.split(".")[0] == node.name or src.split(".")[0] == node.name:
+                self.Disconnect(dst)
+        for other in self.nodes.values():
+            if other.setMembers is not None:
+                other.setMembers.discard(node.name)
+        if node.type == "skinCluster":
+            return
+        for other in list(self.nodes.values()):
+            if other.type == "skinCluster" and other.skin and other.skin.geometry == node.name:
+                self.DeleteNode(other)
+
+    def RenameNode(self, node, newName):
+        newName = self.GetUniqueName(newName)
+        oldName = node.name
+        self.nodes.pop(oldName)
+        node.name = newName
+        self.nodes[newName] = node
+
+        def RenamePlug(plug):
+            nodeName, _, attr = plug.partition(".")
+            return newName + "." + attr if nodeName == oldName else plug
+
+        self.connections = {RenamePlug(dst): RenamePlug(src) for dst, src in self.connections.items()}
+        for other in self.nodes.values():
+            if other.setMembers is not None and oldName in other.setMembers:
+                other.setMembers.discard(oldName)
+                other.setMembers.add(newName)
+            if other.skin:
+                other.skin.influences = [newName if jnt == oldName else jnt for jnt in other.skin.influences]
+                if other.skin.geometry == oldName:
+                    other.skin.geometry = newName
+        return newName
+
+    def FireEvent(self, event):
+        for jobEvent, callback in list(self.scriptJobs.values()):
+            if jobEvent == event:
+                callback()
+
+    def RunDeferred(self):
+        ran = 0
+        while self.deferred:
+            callback = self.deferred.pop(0)
+            callback()
+            ran += 1
+        return ran
+
+    ####################################
+    #              Builders            #
+    ####################################
+    def CreateMesh(self, name, points, faceVertCounts, faceVerts, parent = None):
+        transform = self.CreateNode("transform", name, parent)
+        shape = self.CreateNode("mesh", transform.name + "Shape", transform)
+        shape.mesh = FakeMesh(points, faceVertCounts, faceVerts)
+        shape.mesh.uvCount = len(shape.mesh.faceVerts)
+        shape.setMembersOf = None
+        self.nodes["initialShadingGroup"].setMembers.add(transform.name)
+        return transform.name
+
+    def CreateGrid(self, name, rows, columns, size = 10.0):
+        xs, zs = np.meshgrid(np.linspace(-size, size, columns + 1), np.linspace(-size, size, rows + 1))
+        points = np.stack([xs.ravel(), np.zeros(xs.size), zs.ravel()], axis=1)
+        rowIds, columnIds = np.meshgrid(np.arange(rows), np.arange(columns), indexing="ij")
+        corners = (rowIds * (columns + 1) + columnIds).ravel()
+        faceVerts = np.stack([corners, corners + 1, corners + columns + 2, corners + columns + 1], axis=1).ravel()
+        return self.CreateMesh(name, points, np.full(rows * columns, 4), faceVerts)
+
+    def CreateAnimCurve(self, name, times, values, nodeType = "animCurveTL"):
+        curve = self.CreateNode(nodeType, name)
+        curve.attrs["keyTimes"] = list(times)
+        curve.attrs["keyValues"] = list(values)
+        return curve.name
+
+    def CreateJoint(self, name, position, parent = None):
+        jnt = self.CreateNode("joint", name, self.GetNode(parent) if parent else None)
+        jnt.SetWorldMatrix(ComposeMatrix(position, [0, 0, 0], [1, 1, 1]))
+        return jnt.name
+
+    def CreateSkin(self, jnts, geometry, weights = None, name = None):
+        shape = self.GetMeshShape(geometry)
+        transform = shape.parent or shape
+        if weights is None:
+            jntPositions = np.array([self.GetNode(jnt).GetWorldMatrix()[3, :3] for jnt in jnts])
+            points = self.GetWorldPoints(shape)
+            nearest = np.argmin(((points[:, None, :] - jntPositions[None, :, :]) ** 2).sum(axis=2), axis=1)
+            weights = np.zeros((len(points), len(jnts)))
+            weights[np.arange(len(points)), nearest] = 1.0
+        skin = self.CreateNode("skinCluster", name or "skinCluster1")
+        skin.skin = FakeSkin(list(jnts), transform.name, np.asarray(weights, dtype=np.float64))
+        for i, jnt in enumerate(jnts):
+            self.Connect(jnt + ".worldMatrix[0]", f"{skin.name}.matrix[{i}]")
+        self.Connect(skin.name + ".outputGeometry[0]", shape.name + ".inMesh")
+        return skin.name
+
+    def GetWorldPoints(self, shape):
+        matrix = shape.parent.GetWorldMatrix() if shape.parent else np.identity(4)
+        points = np.hstack([shape.mesh.points, np.ones((len(shape.mesh.points), 1))])
+        return (points @ matrix)[:, :3]
+
+    def GetSkinForShape(self, shape):
+        transform = shape.parent or shape
+        for node in self.nodes.values():
+            if node.skin and node.skin.geometry in (transform.name, shape.name):
+                return node
+        return None
+
+scene = FakeScene()
+commands = {}
+
+def Command(func):
+    name = func.__name__
+
+    def Wrapper(*args, **kwargs):
+        scene.calls[name] += 1
+        startTime = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            scene.commandSeconds[name] += time.perf_counter() - startTime
+
+    Wrapper.__name__ = name
+    commands[name] = Wrapper
+    return Wrapper
+
+def Flatten(args):
+    flat = []
+    for arg in args:
+        if isinstance(arg, (list, tuple, set)):
+            flat.extend(Flatten(arg))
+        elif arg is not None:
+            flat.append(str(arg))
+    return flat
+
+def Flag(kwargs, *names, default = None):
+    for name in names:
+        if name in kwargs:
+            return kwargs[name]
+    return default
+
+COMPONENT_PATTERN = re.compile(r"^(?P<node>[^.]+)\.(?P<comp>vtx|f|e|cv)\[(?P<index>[^\]]+)\]$")
+
+def ParseComponent(component):
+    match = COMPONENT_PATTERN.match(component)
+    if not match:
+        return None
+    node = scene.GetNode(match.group("node"))
+    compType = match.group("comp")
+    index = match.group("index")
+    if compType in ("vtx", "f"):
+        shape = scene.GetMeshShape(node.name)
+        count = len(shape.mesh.points) if compType == "vtx" else len(shape.mesh.faceVertCounts)
+    else:
+        count = 0
+    if index == "*":
+        return node, compType, np.arange(count)
+    if ":" in index:
+        start, end = index.split(":")
+        return node, compType, np.arange(int(start), int(end) + 1)
+    return node, compType, np.array([int(index)])
+
+def SplitPlug(plug):
+    nodeName, _, attr = plug.partition(".")
+    node = scene.GetNode(nodeName)
+    attr = ATTR_ALIASES.get(attr, attr)
+    for longName, info in node.userAttrInfo.items():
+        if info["shortName"] == attr:
+            return node, longName
+    return node, attr
+
+def AddUserAttr(node, longName, shortName = None, attrType = "double", keyable = False, minValue = None, maxValue = None, value = 0.0):
+    if longName in node.userAttrs:
+        raise RuntimeError(f"Found more than one attribute named {longName} on {node.name}")
+    node.userAttrs[longName] = value
+    node.userAttrInfo[longName] = {"shortName": shortName or longName, "type": attrType, "keyable": keyable, "min": minValue, "max": maxValue}
+
+####################################
+#             Commands             #
+####################################
+@Command
+def ls(*args, **kwargs):
+    names = Flatten(args)
+    if Flag(kwargs, "sl", "selection"):
+        nodes = [scene.GetNode(name) for name in scene.selection if scene.HasNode(name)]
+    elif names:
+        nodes = []
+        result = []
+        for name in names:
+            component = ParseComponent(name) if "[" in name else None
+            if component:
+                node, compType, indices = component
+                if Flag(kwargs, "fl", "flatten"):
+                    result.extend(f"{node.name}.{compType}[{i}]" for i in indices)
+                else:
+                    result.append(name)
+            elif scene.HasNode(name):
+                nodes.append(scene.GetNode(name))
+        if result:
+            return result
+    else:
+        nodes = list(scene.nodes.values())
+
+    nodeType = Flag(kwargs, "type", "typ")
+    if nodeType:
+        nodeTypes = nodeType if isinstance(nodeType, (list, tuple)) else [nodeType]
+        nodes = [node for node in nodes if node.type in nodeTypes or ("animCurve" in nodeTypes and node.type.startswith("animCurve"))]
+    if Flag(kwargs, "showType", "st"):
+        result = []
+        for node in nodes:
+            result.extend([node.GetFullPath() if Flag(kwargs, "l", "long") and node.IsDag() else node.name, node.type])
+        return result
+    if Flag(kwargs, "l", "long"):
+        return [node.GetFullPath() if node.IsDag() else node.name for node in nodes]
+    return [node.name for node in nodes]
+
+@Command
+def objExists(name):
+    if "." in name:
+        node, attr = name.split(".", 1)
+        return scene.HasNode(node) and attributeQuery(attr, n=node, ex=True)
+    return scene.HasNode(name)
+
+@Command
+def objectType(name, **kwargs):
+    return scene.GetNode(name).type
+
+@Command
+def nodeType(name, **kwargs):
+    return scene.GetNode(name).type
+
+@Command
+def listAttr(*args, **kwargs):
+    node = scene.GetNode(Flatten(args)[0])
+    if Flag(kwargs, "ud", "userDefined"):
+        return list(node.userAttrs.keys()) or None
+    return list(node.attrs.keys()) + list(node.userAttrs.keys())
+
+@Command
+def select(*args, **kwargs):
+    names = Flatten(args)
+    if Flag(kwargs, "cl", "clear"):
+        scene.selection = []
+        return
+    if Flag(kwargs, "add"):
+        scene.selection.extend(name for name in names if name not in scene.selection)
+        return
+    scene.selection = [scene.GetNode(name).name for name in names]
+
+@Command
+def listRelatives(*args, **kwargs):
+    result = []
+    fullPath = Flag(kwargs, "f", "fullPath")
+    nodeType = Flag(kwargs, "type", "typ")
+    for name in Flatten(args):
+        node = scene.GetNode(name)
+        if Flag(kwargs, "p", "parent"):
+            found = [node.parent] if node.parent else []
+        elif Flag(kwargs, "s", "shapes"):
+            found = scene.GetShapes(node)
+        elif Flag(kwargs, "ad", "allDescendents"):
+            found = []
+            stack = list(node.children)
+            while stack:
+                child = stack.pop(0)
+                found.append(child)
+                stack = list(child.children) + stack
+            found.reverse()
+        else:
+            found = list(node.children)
+        if nodeType:
+            found = [child for child in found if child.type == nodeType]
+        result.extend(child.GetFullPath() if fullPath else child.name for child in found)
+    return result or None
+
+@Command
+def listConnections(*args, **kwargs):
+    source = Flag(kwargs, "s", "source", default=True)
+    destination = Flag(kwargs, "d", "destination", default=True)
+    names = set()
+    for name in Flatten(args):
+        names.add(scene.GetNode(name).name)
+    plugs = Flag(kwargs, "p", "plugs", default=False)
+    connections = Flag(kwargs, "c", "connections", default=False)
+    result = []
+    for dst, src in scene.connections.items():
+        dstNode = dst.split(".")[0]
+        srcNode = src.split(".")[0]
+        if source and dstNode in names:
+            result.extend(([dst] if connections else []) + [src if plugs else srcNode])
+        if destination and srcNode in names:
+            result.extend(([src] if connections else []) + [dst if plugs else dstNode])
+    return result or None
+
+@Command
+def listHistory(*args, **kwargs):
+    result = []
+    visited = set()
+    frontier = Flatten(args)
+    while frontier:
+        nexts = []
+        for name in frontier:
+            if name in visited:
+                continue
+            visited.add(name)
+            result.append(name)
+            node = scene.GetNode(name)
+            for shape in scene.GetShapes(node):
+                nexts.append(shape.name)
+            nexts.extend(listConnections(name, s=True, d=False) or [])
+        frontier = nexts
+    return result
+
+@Command
+def createNode(nodeType, n = None, name = None, p = None, parent = None, **kwargs):
+    parentName = p or parent
+    node = scene.CreateNode(nodeType, n or name, scene.GetNode(parentName) if parentName else None)
+    if nodeType == "mesh" and not node.parent:
+        transform = scene.CreateNode("transform", "polySurface1")
+        scene.Reparent(node, transform)
+    if nodeType == "mesh":
+        node.mesh = FakeMesh(np.zeros((0, 3)), [], [])
+    return node.name
+
+@Command
+def shadingNode(nodeType, asShader = False, asUtility = False, name = None, n = None, **kwargs):
+    return scene.CreateNode(nodeType, name or n).name
+
+@Command
+def rename(*args, **kwargs):
+    node = scene.GetNode(args[0])
+    return scene.RenameNode(node, args[1])
+
+@Command
+def delete(*args, **kwargs):
+    faceDeletes = {}
+    for name in Flatten(args):
+        component = ParseComponent(name) if "[" in name else None
+        if component:
+            node, compType, indices = component
+            if compType == "f":
+                faceDeletes.setdefault(node.name, []).append(indices)
+            continue
+        if scene.HasNode(name):
+            scene.DeleteNode(scene.GetNode(name))
+    for nodeName, indices in faceDeletes.items():
+        scene.GetMeshShape(nodeName).mesh.DeleteFaces(np.concatenate(indices))
+
+@Command
+def duplicate(*args, **kwargs):
+    newName = Flag(kwargs, "n", "name")
+    result = []
+    for name in Flatten(args):
+        src = scene.GetNode(name)
+        dup = scene.CreateNode(src.type, newName or scene.GetUniqueName(src.name), src.parent)
+        dup.attrs = {key: list(value) if isinstance(value, list) else value for key, value in src.attrs.items()}
+        dup.userAttrs = dict(src.userAttrs)
+        for shape in scene.GetShapes(src):
+            dupShape = scene.CreateNode(shape.type, dup.name + "Shape", dup)
+            dupShape.attrs = dict(shape.attrs)
+            dupShape.userAttrs = dict(shape.userAttrs)
+            if shape.mesh is not None:
+                dupShape.mesh = shape.mesh.Copy()
+            if shape.cvs is not None:
+                dupShape.cvs = shape.cvs.copy()
+        for setNode in scene.nodes.values():
+            if setNode.setMembers is not None and src.name in setNode.setMembers:
+                setNode.setMembers.add(dup.name)
+        result.append(dup.name)
+    return result
+
+@Command
+def parent(*args, **kwargs):
+    names = Flatten(args)
+    relative = Flag(kwargs, "r", "relative", default=False)
+    if Flag(kwargs, "w", "world"):
+        children, newParent = names, None
+    else:
+        children, newParent = names[:-1], scene.GetNode(names[-1])
+    result = []
+    for name in children:
+        node = scene.GetNode(name)
+        scene.Reparent(node, newParent, keepWorld=not relative)
+        result.append(node.name)
+    return result
+
+@Command
+def group(*args, **kwargs):
+    names = Flatten(args)
+    groupParent = scene.GetNode(names[0]).parent if names else None
+    grp = scene.CreateNode("transform", Flag(kwargs, "n", "name") or "group1", groupParent)
+    for name in names:
+        scene.Reparent(scene.GetNode(name), grp, keepWorld=True)
+    return grp.name
+
+@Command
+def spaceLocator(*args, **kwargs):
+    loc = scene.CreateNode("transform", Flag(kwargs, "n", "name") or "locator1")
+    scene.CreateNode("locator", loc.name + "Shape", loc)
+    position = Flag(kwargs, "p", "position")
+    if position:
+        loc.attrs["translate"] = list(position)
+    return [loc.name]
+
+def CreateCurveNode(name, cvs, degree = 1, periodic = False):
+    transform = scene.CreateNode("transform", name or "curve1")
+    shape = scene.CreateNode("nurbsCurve", transform.name + "Shape", transform)
+    shape.cvs = np.asarray(cvs, dtype=np.float64).reshape(-1, 3)
+    shape.attrs["degree"] = degree
+    shape.attrs["form"] = 2 if periodic else 0
+    shape.attrs["spans"] = len(shape.cvs) - degree
+    return transform
+
+@Command
+def circle(*args, **kwargs):
+    radius = Flag(kwargs, "r", "radius", default=1.0)
+    normal = np.asarray(Flag(kwargs, "nr", "normal", default=(0, 0, 1)), dtype=np.float64)
+    angles = np.linspace(0, 2 * np.pi, 8, endpoint=False)
+    plane = np.stack([np.cos(angles), np.sin(angles), np.zeros(8)], axis=1) * radius
+    if abs(normal[0]) > 0.5:
+        plane = plane[:, [2, 0, 1]]
+    elif abs(normal[1]) > 0.5:
+        plane = plane[:, [1, 2, 0]]
+    transform = CreateCurveNode(Flag(kwargs, "n", "name") or "nurbsCircle1", plane, 3)
+    makeCircle = scene.CreateNode("makeNurbCircle", "makeNurbCircle1")
+    scene.Connect(makeCircle.name + ".outputCurve", transform.name + "Shape.create")
+    return [transform.name, makeCircle.name]
+
+@Command
+def curve(*args, **kwargs):
+    transform = CreateCurveNode(Flag(kwargs, "n", "name"), Flag(kwargs, "p", "point"), Flag(kwargs, "d", "degree", default=3), Flag(kwargs, "per", "periodic", default=False))
+    return transform.name
+
+@Command
+def makeIdentity(*args, **kwargs):
+    for name in Flatten(args):
+        node = scene.GetNode(name)
+        matrix = node.GetLocalMatrix()
+        for shape in scene.GetShapes(node):
+            if shape.cvs is not None:
+                cvs = np.hstack([shape.cvs, np.ones((len(shape.cvs), 1))])
+                shape.cvs = (cvs @ matrix)[:, :3]
+            if shape.mesh is not None:
+                points = np.hstack([shape.mesh.points, np.ones((len(shape.mesh.points), 1))])
+                shape.mesh.points = (points @ matrix)[:, :3]
+        node.attrs["translate"] = [0.0, 0.0, 0.0]
+        node.attrs["rotate"] = [0.0, 0.0, 0.0]
+        node.attrs["scale"] = [1.0, 1.0, 1.0]
+
+@Command
+def matchTransform(*args, **kwargs):
+    names = Flatten(args)
+    target = scene.GetNode(names[-1])
+    for name in names[:-1]:
+        scene.GetNode(name).SetWorldMatrix(target.GetWorldMatrix())
+
+@Command
+def xform(*args, **kwargs):
+    node = scene.GetNode(Flatten(args)[0])
+    worldSpace = Flag(kwargs, "ws", "worldSpace", default=False)
+    matrix = node.GetWorldMatrix() if worldSpace else node.GetLocalMatrix()
+    if Flag(kwargs, "q", "query"):
+        if Flag(kwargs, "m", "matrix"):
+            return list(matrix.ravel())
+        if Flag(kwargs, "t", "translation"):
+            return list(matrix[3, :3])
+        if Flag(kwargs, "ro", "rotation"):
+            return DecomposeMatrix(matrix)[1]
+        return None
+    newMatrix = Flag(kwargs, "m", "matrix")
+    if newMatrix is not None:
+        newMatrix = np.asarray(newMatrix, dtype=np.float64).reshape(4, 4)
+        if worldSpace:
+            node.SetWorldMatrix(newMatrix)
+        else:
+            node.attrs["translate"], node.attrs["rotate"], node.attrs["scale"] = DecomposeMatrix(newMatrix)
+    translate = Flag(kwargs, "t", "translation")
+    if translate is not None:
+        if worldSpace:
+            world = node.GetWorldMatrix()
+            world[3, :3] = translate
+            node.SetWorldMatrix(world)
+        else:
+            node.attrs["translate"] = list(translate)
+
+@Command
+def addAttr(*args, **kwargs):
+    longName = Flag(kwargs, "ln", "longName")
+    default = Flag(kwargs, "dv", "defaultValue", default=0.0)
+    dataType = Flag(kwargs, "dt", "dataType")
+    for name in Flatten(args) or scene.selection:
+        AddUserAttr(scene.GetNode(name), longName, Flag(kwargs, "sn", "shortName"), dataType or Flag(kwargs, "at", "attributeType", default="double"),
+                    Flag(kwargs, "k", "keyable", default=False), Flag(kwargs, "min", "minValue"), Flag(kwargs, "max", "maxValue"), None if dataType == "string" else default)
+
+@Command
+def attributeQuery(attr, n = None, node = None, ex = False, exists = False, **kwargs):
+    target = scene.GetNode(n or node)
+    attr = ATTR_ALIASES.get(attr, attr)
+    info = target.userAttrInfo.get(attr)
+    if info:
+        if Flag(kwargs, "sn", "shortName"):
+            return info["shortName"]
+        if Flag(kwargs, "mne", "minExists"):
+            return info["min"] is not None
+        if Flag(kwargs, "mxe", "maxExists"):
+            return info["max"] is not None
+        if Flag(kwargs, "min", "minimum"):
+            return [info["min"]]
+        if Flag(kwargs, "max", "maximum"):
+            return [info["max"]]
+    return attr in target.userAttrs or attr in target.attrs or GetCompoundChild(attr)[0] in target.attrs
+
+def GetPlugValue(plug):
+    node, attr = SplitPlug(plug)
+    if attr in node.userAttrs:
+        return node.userAttrs[attr]
+    if attr in node.attrs:
+        return node.attrs[attr]
+    compound, index = GetCompoundChild(attr)
+    if compound in node.attrs:
+        return node.attrs[compound][index]
+    if attr == "poleVector" and node.type == "ikHandle":
+        return node.attrs.get("poleVectorValue", [0.0, 0.0, 1.0])
+    return 0.0
+
+@Command
+def getAttr(plug, **kwargs):
+    if Flag(kwargs, "type") or Flag(kwargs, "k", "keyable"):
+        node, attr = SplitPlug(plug)
+        info = node.userAttrInfo.get(attr, {"type": "double", "keyable": True})
+        return info["type"] if Flag(kwargs, "type") else info["keyable"]
+    if plug.endswith(".cv[*]"):
+        return [tuple(cv) for cv in scene.GetNode(plug[:-6]).cvs.tolist()]
+    value = GetPlugValue(plug)
+    if isinstance(value, (list, tuple)):
+        return [tuple(value)]
+    return value
+
+@Command
+def setAttr(plug, *values, **kwargs):
+    node, attr = SplitPlug(plug)
+    value = list(values) if len(values) > 1 else values[0]
+    if attr in node.userAttrs:
+        node.userAttrs[attr] = value
+        return
+    compound, index = GetCompoundChild(attr)
+    if compound:
+        node.attrs[compound][index] = value
+        return
+    node.attrs[attr] = value
+
+@Command
+def connectAttr(src, dst, f = False, force = False, **kwargs):
+    if dst in scene.connections and not (f or force):
+        raise RuntimeError(f"{dst} already has an incoming connection")
+    scene.GetNode(src.split(".")[0])
+    scene.GetNode(dst.split(".")[0])
+    scene.Connect(src, dst)
+
+@Command
+def disconnectAttr(src, dst, **kwargs):
+    if scene.connections.get(dst) == src:
+        scene.Disconnect(dst)
+
+@Command
+def hide(*args, **kwargs):
+    for name in Flatten(args):
+        scene.GetNode(name).attrs["visibility"] = False
+
+@Command
+def joint(*args, **kwargs):
+    selected = [name for name in scene.selection if scene.GetNode(name).type == "joint"]
+    jntParent = scene.GetNode(selected[0]) if selected else None
+    jnt = scene.CreateNode("joint", Flag(kwargs, "n", "name") or "joint1", jntParent)
+    position = Flag(kwargs, "p", "position")
+    if position:
+        jnt.SetWorldMatrix(ComposeMatrix(position, [0, 0, 0], [1, 1, 1]))
+    scene.selection = [jnt.name]
+    return jnt.name
+
+def CreateConstraint(nodeType, args, kwargs):
+    names = Flatten(args)
+    targets, constrained = names[:-1], scene.GetNode(names[-1])
+    constraint = scene.CreateNode(nodeType, Flag(kwargs, "n", "name") or f"{constrained.name}_{nodeType}1", constrained)
+    for target in targets:
+        AddConstraintTarget(constraint, target)
+    for output, constrainedAttr in CONSTRAINT_OUTPUTS[nodeType]:
+        scene.Connect(f"{constraint.name}.{output}", f"{constrained.name}.{constrainedAttr}")
+    return constraint
+
+CONSTRAINT_OUTPUTS = {
+    "orientConstraint": [("constraintRotate", "rotate")],
+    "poleVectorConstraint": [("constraintTranslate", "poleVector")],
+    "parentConstraint": [("constraintTranslate", "translate"), ("constraintRotate", "rotate")],
+}
+CONSTRAINT_INPUTS = {"orientConstraint": ["rotate"], "poleVectorConstraint": ["translate"], "parentConstraint": ["translate", "rotate"]}
+
+def AddConstraintTarget(constraint, target):
+    index = len(constraint.userAttrInfo)
+    AddUserAttr(constraint, f"{target}W{index}", f"w{index}", "double", True, 0.0, None, 1.0)
+    scene.Connect(target + ".parentMatrix[0]", f"{constraint.name}.target[{index}].targetParentMatrix")
+    for attr in CONSTRAINT_INPUTS[constraint.type]:
+        scene.Connect(f"{target}.{attr}", f"{constraint.name}.target[{index}].target{attr[0].upper() + attr[1:]}")
+    scene.Connect(f"{constraint.name}.{target}W{index}", f"{constraint.name}.target[{index}].targetWeight")
+
+@Command
+def orientConstraint(*args, **kwargs):
+    names = Flatten(args)
+    constrained = scene.GetNode(names[-1])
+    for child in constrained.children:
+        if child.type == "orientConstraint":
+            AddConstraintTarget(child, names[0])
+            return [child.name]
+    return [CreateConstraint("orientConstraint", args, kwargs).name]
+
+@Command
+def poleVectorConstraint(*args, **kwargs):
+    return [CreateConstraint("poleVectorConstraint", args, kwargs).name]
+
+@Command
+def parentConstraint(*args, **kwargs):
+    return [CreateConstraint("parentConstraint", args, kwargs).name]
+
+@Command
+def ikHandle(*args, **kwargs):
+    startJnt = scene.GetNode(Flag(kwargs, "sj", "startJoint"))
+    endJnt = scene.GetNode(Flag(kwargs, "ee", "endEffector"))
+    middleJnt = endJnt.parent
+    handle = scene.CreateNode("ikHandle", Flag(kwargs, "n", "name") or "ikHandle1")
+    handle.SetWorldMatrix(endJnt.GetWorldMatrix())
+    effector = scene.CreateNode("ikEffector", "effector1", middleJnt)
+
+    startPos = startJnt.GetWorldMatrix()[3, :3]
+    middlePos = middleJnt.GetWorldMatrix()[3, :3]
+    endPos = endJnt.GetWorldMatrix()[3, :3]
+    chainVec = endPos - startPos
+    middleVec = middlePos - startPos
+    poleVec = middleVec - chainVec * (middleVec @ chainVec) / max(chainVec @ chainVec, 1e-12)
+    length = np.linalg.norm(poleVec)
+    handle.attrs["poleVectorValue"] = list(poleVec / length) if length > 1e-12 else [0.0, 0.0, 1.0]
+    handle.attrs["ikBlend"] = 1.0
+    scene.Connect(startJnt.name + ".message", handle.name + ".startJoint")
+    scene.Connect(effector.name + ".handlePath[0]", handle.name + ".endEffector")
+    solver = scene.GetNode("ikRPsolver") if scene.HasNode("ikRPsolver") else scene.CreateNode("ikRPsolver", "ikRPsolver")
+    scene.Connect(solver.name + ".message", handle.name + ".ikSolver")
+    scene.Connect(endJnt.name + ".translate", effector.name + ".translate")
+    return [handle.name, effector.name]
+
+@Command
+def skinCluster(*args, **kwargs):
+    names = Flatten(args)
+    if Flag(kwargs, "q", "query"):
+        node = scene.GetNode(names[0])
+        if node.type != "skinCluster":
+            node = scene.GetSkinForShape(scene.GetMeshShape(names[0]))
+        if Flag(kwargs, "inf", "influence", "wi", "weightedInfluence"):
+            return list(node.skin.influences)
+        if Flag(kwargs, "g", "geometry"):
+            return [node.skin.geometry]
+        return None
+    if Flag(kwargs, "e", "edit"):
+        return None
+    jnts = [name for name in names if scene.GetNode(name).type == "joint"]
+    geometry = [name for name in names if scene.GetNode(name).type != "joint"]
+    return [scene.CreateSkin(jnts, geometry[0], name=Flag(kwargs, "n", "name"))]
+
+@Command
+def copySkinWeights(*args, **kwargs):
+    srcSkin = scene.GetNode(Flag(kwargs, "ss", "sourceSkin")).skin
+    dstSkin = scene.GetNode(Flag(kwargs, "ds", "destinationSkin")).skin
+    srcPoints = scene.GetWorldPoints(scene.GetMeshShape(srcSkin.geometry))
+    dstPoints = scene.GetWorldPoints(scene.GetMeshShape(dstSkin.geometry))
+    closest = np.empty(len(dstPoints), dtype=np.int64)
+    for start in range(0, len(dstPoints), 256):
+        chunk = dstPoints[start:start + 256]
+        distances = ((chunk[:, None, :] - srcPoints[None, :, :]) ** 2).sum(axis=2)
+        closest[start:start + 256] = np.argmin(distances, axis=1)
+    weights = np.zeros((len(dstPoints), len(dstSkin.influences)))
+    for dstIndex, jnt in enumerate(dstSkin.influences):
+        if jnt in srcSkin.influences:
+            weights[:, dstIndex] = srcSkin.weights[closest, srcSkin.influences.index(jnt)]
+    dstSkin.weights = weights
+
+@Command
+def skinPercent(skin, *args, **kwargs):
+    skinNode = scene.GetNode(skin).skin
+    verts = np.concatenate([ParseComponent(name)[2] for name in Flatten(args)])
+    if Flag(kwargs, "q", "query"):
+        if Flag(kwargs, "v", "value"):
+            return list(skinNode.weights[verts].mean(axis=0))
+        if "t" in kwargs or "transform" in kwargs:
+            return list(skinNode.influences)
+    return None
+
+@Command
+def polyEvaluate(*args, **kwargs):
+    shape = scene.GetMeshShape(Flatten(args)[0])
+    if Flag(kwargs, "v", "vertex"):
+        return len(shape.mesh.points)
+    if Flag(kwargs, "f", "face"):
+        return len(shape.mesh.faceVertCounts)
+    if Flag(kwargs, "uv", "uvcoord"):
+        return shape.mesh.uvCount
+    return None
+
+@Command
+def polyListComponentConversion(*args, **kwargs):
+    result = []
+    for name in Flatten(args):
+        node, compType, indices = ParseComponent(name)
+        mesh = scene.GetMeshShape(node.name).mesh
+        if compType == "vtx" and Flag(kwargs, "tf", "toFace"):
+            faceIds = np.repeat(np.arange(len(mesh.faceVertCounts)), mesh.faceVertCounts)
+            faces = np.unique(faceIds[np.isin(mesh.faceVerts, indices)])
+            result.extend(f"{node.name}.f[{face}]" for face in faces)
+    return result
+
+@Command
+def sets(*args, **kwargs):
+    names = Flatten(args)
+    if Flag(kwargs, "e", "edit"):
+        target = Flag(kwargs, "fe", "forceElement") or Flag(kwargs, "add", "addElement")
+        setNode = scene.GetNode(target)
+        if Flag(kwargs, "fe", "forceElement"):
+            for other in scene.nodes.values():
+                if other.type == "shadingEngine" and other is not setNode:
+                    other.setMembers.difference_update(names)
+        setNode.setMembers.update(scene.GetNode(name).name for name in names)
+        return None
+    if Flag(kwargs, "q", "query"):
+        return sorted(scene.GetNode(names[0]).setMembers) or None
+    isShadingGroup = Flag(kwargs, "renderable", "r", default=False)
+    setNode = scene.CreateNode("shadingEngine" if isShadingGroup else "objectSet", Flag(kwargs, "n", "name") or "set1")
+    if not Flag(kwargs, "em", "empty"):
+        setNode.setMembers.update(names)
+    return setNode.name
+
+@Command
+def currentTime(*args, **kwargs):
+    if Flag(kwargs, "q", "query"):
+        return scene.currentTime
+    newTime = float(args[0])
+    changed = newTime != scene.currentTime
+    scene.currentTime = newTime
+    if changed:
+        scene.FireEvent("timeChanged")
+    return newTime
+
+@Command
+def playbackOptions(*args, **kwargs):
+    if Flag(kwargs, "q", "query"):
+        if Flag(kwargs, "min", "minTime", "ast", "animationStartTime"):
+            return scene.playbackMin
+        if Flag(kwargs, "max", "maxTime", "aet", "animationEndTime"):
+            return scene.playbackMax
+        return None
+    newMin = Flag(kwargs, "min", "minTime")
+    newMax = Flag(kwargs, "max", "maxTime")
+    if newMin is not None:
+        scene.playbackMin = float(newMin)
+    if newMax is not None:
+        scene.playbackMax = float(newMax)
+
+@Command
+def scriptJob(*args, **kwargs):
+    if "exists" in kwargs or "ex" in kwargs:
+        return Flag(kwargs, "exists", "ex") in scene.scriptJobs
+    if "kill" in kwargs or "k" in kwargs:
+        scene.scriptJobs.pop(Flag(kwargs, "kill", "k"), None)
+        return None
+    event = Flag(kwargs, "e", "event")
+    idleEvent = Flag(kwargs, "ie", "idleEvent")
+    if idleEvent is not None:
+        event = ["idle", idleEvent]
+    jobId = scene.nextJobId
+    scene.nextJobId += 1
+    scene.scriptJobs[jobId] = (event[0], event[1])
+    return jobId
+
+@Command
+def evalDeferred(*args, **kwargs):
+    scene.deferred.append(args[0])
+
+@Command
+def refresh(*args, **kwargs):
+    suspend = Flag(kwargs, "su", "suspend")
+    if suspend is not None:
+        scene.refreshSuspended = suspend
+
+@Command
+def undoInfo(*args, **kwargs):
+    if Flag(kwargs, "ock", "openChunk"):
+        scene.undoChunks += 1
+    if Flag(kwargs, "cck", "closeChunk"):
+        scene.undoChunks -= 1
+    if Flag(kwargs, "q", "query") and Flag(kwargs, "st", "state"):
+        return True
+
+@Command
+def undo(*args, **kwargs):
+    scene.undos += 1
+
+@Command
+def bakeResults(*args, **kwargs):
+    scene.bakes.append((Flatten(args), Flag(kwargs, "t", "time")))
+    return len(Flatten(args))
+
+@Command
+def file(*args, **kwargs):
+    names = Flatten(args)
+    if Flag(kwargs, "q", "query"):
+        return scene.exports[-1] if scene.exports else ""
+    if names:
+        with open(names[0], "w") as sceneFile:
+            sceneFile.write("//Maya ASCII fake scene\n")
+        scene.exports.append(names[0])
+        return names[0]
+    return None
+
+####################################
+#        Minimal binary fbx        #
+####################################
+def FbxString(value):
+    value = value.encode() if isinstance(value, str) else value
+    return b"S" + struct.pack("<I", len(value)) + value
+
+def FbxInt64(value):
+    return b"L" + struct.pack("<q", value)
+
+def FbxInt64Array(values, compress = True):
+    raw = struct.pack(f"<{len(values)}q", *values)
+    payload = zlib.compress(raw) if compress else raw
+    return b"l" + struct.pack("<III", len(values), 1 if compress else 0, len(payload)) + payload
+
+def FbxFloatArray(values):
+    raw = struct.pack(f"<{len(values)}f", *values)
+    return b"f" + struct.pack("<III", len(values), 0, len(raw)) + raw
+
+def EncodeFbxRecord(record, offset, wide):
+    name, properties, children = record
+    headerFormat = "<QQQ" if wide else "<III"
+    headerSize = struct.calcsize(headerFormat) + 1 + len(name)
+    propertyBytes = b"".join(properties)
+    body = b""
+    childOffset = offset + headerSize + len(propertyBytes)
+    for child in children:
+        encoded = EncodeFbxRecord(child, childOffset, wide)
+        body += encoded
+        childOffset += len(encoded)
+    if children:
+        body += b"\x00" * struct.calcsize(headerFormat) + b"\x00"
+    endOffset = offset + headerSize + len(propertyBytes) + len(body)
+    header = struct.pack(headerFormat, endOffset, len(properties), len(propertyBytes)) + bytes([len(name)]) + name.encode()
+    return header + propertyBytes + body
+
+def BuildFakeFbx(joints, meshes, animated, frames, version = 7400):
+    objects = []
+    nextId = 1000
+    for jnt in joints:
+        objects.append(("Model", [FbxInt64(nextId), FbxString(jnt + "\x00\x01Model"), FbxString("LimbNode")], [("Version", [b"I" + struct.pack("<i", 232)], [])]))
+        nextId += 1
+    for mesh in meshes:
+        points = [0.0] * 12
+        objects.append(("Geometry", [FbxInt64(nextId), FbxString(mesh + "\x00\x01Geometry"), FbxString("Mesh")], [("Vertices", [FbxFloatArray(points)], [])]))
+        objects.append(("Model", [FbxInt64(nextId + 1), FbxString(mesh + "\x00\x01Model"), FbxString("Mesh")], []))
+        nextId += 2
+    if animated:
+        objects.append(("AnimationStack", [FbxInt64(nextId), FbxString("Take 001\x00\x01AnimStack"), FbxString("")], []))
+        nextId += 1
+        for jnt in joints:
+            for channel in range(3):
+                keyTimes = [frame * 46186158000 for frame in frames]
+                objects.append(("AnimationCurve", [FbxInt64(nextId), FbxString("\x00\x01AnimCurve"), FbxString("")],
+                                [("Default", [b"D" + struct.pack("<d", 0.0)], []), ("KeyTime", [FbxInt64Array(keyTimes)], []),
+                                 ("KeyValueFloat", [FbxFloatArray([0.0] * len(frames))], [])]))
+                nextId += 1
+    records = [("FBXHeaderExtension", [], [("FBXVersion", [b"I" + struct.pack("<i", version)], [])]),
+               ("Definitions", [], [("Count", [b"I" + struct.pack("<i", len(objects))], [])]),
+               ("Objects", [], objects),
+               ("Connections", [], [])]
+    wide = version >= 7500
+    data = b"Kaydara FBX Binary  \x00\x1a\x00" + struct.pack("<I", version)
+    for record in records:
+        data += EncodeFbxRecord(record, len(data), wide)
+    data += b"\x00" * (struct.calcsize("<QQQ" if wide else "<III") + 1)
+    data += b"\xfa\xbc\xab\x09\xd0\xc8\xd4\x66\xb1\x76\xfb\x83\x1c\xf7\x26\x7e" + b"\x00" * 4
+    return data
+
+def WriteFakeFbx(path):
+    nodes = [scene.GetNode(name) for name in scene.selection if scene.HasNode(name)]
+    joints = [node.name for node in nodes if node.type == "joint"]
+    meshes = [node.name for node in nodes if node.type == "transform" and any(shape.type == "mesh" for shape in scene.GetShapes(node))]
+    animated = bool(scene.fbxSettings.get("FBXExportBakeComplexAnimation", ("-v", False))[1])
+    take = scene.fbxSettings.get("FBXExportSplitAnimationIntoTakes", ("-c",))
+    frames = []
+    if animated:
+        start = int(scene.fbxSettings["FBXExportBakeComplexStart"][1])
+        end = int(scene.fbxSettings["FBXExportBakeComplexEnd"][1])
+        frames = list(range(start, end + 1))
+    elif take[0] == "-v":
+        # the keys already on the joints, cut to the take's range
+        animated = True
+        frames = list(range(int(take[2]), int(take[3]) + 1))
+    with open(path, "wb") as fbxFile:
+        fbxFile.write(BuildFakeFbx(joints, meshes, animated, frames, scene.fbxVersion))
+
+@Command
+def keyframe(*args, **kwargs):
+    curves = [scene.GetNode(name) for name in Flatten(args)]
+    if Flag(kwargs, "tc", "timeChange"):
+        return [t for curve in curves for t in curve.attrs.get("keyTimes", [])]
+    if Flag(kwargs, "vc", "valueChange"):
+        return [v for curve in curves for v in curve.attrs.get("keyValues", [])]
+    return len(curves)
+
+def FbxCommand(name):
+    def Recorder(*args, **kwargs):
+        if name == "FBXResetExport":
+            scene.fbxSettings.clear()
+        scene.fbxSettings[name] = args
+        if name == "FBXExport":
+            scene.exports.append(args)
+            WriteFakeFbx(args[list(args).index('-f') + 1])
+        return None
+
+    Recorder.__name__ = name
+    return Command(Recorder)
+
+for fbxCommand in ["FBXResetExport", "FBXExportSmoothingGroups", "FBXExportInputConnections", "FBXExport",
+                   "FBXExportBakeComplexAnimation", "FBXExportBakeComplexStart", "FBXExportBakeComplexEnd",
+                   "FBXExportBakeComplexStep", "FBXExportSplitAnimationIntoTakes", "FBXExportDeleteOriginalTakeOnSplitAnimation", "FBXExportAnimationOnly",
+                   "FBXExportInAscii", "FBXExportSkins", "FBXExportShapes"]:
+    FbxCommand(fbxCommand)
+
+####################################
+#          OpenMaya subset         #
+####################################
+class MIntArray(list):
+    pass
+
+class MDoubleArray(list):
+    pass
+
+class MPointArray(list):
+    pass
+
+class MFloatPointArray(list):
+    pass
+
+class MPoint:
+    def __init__(self, *args):
+        values = list(args[0]) if len(args) == 1 else list(args)
+        values = (values + [0.0, 0.0, 0.0, 1.0])[:4]
+        self.x, self.y, self.z, self.w = [float(value) for value in values]
+
+    def __getitem__(self, index):
+        return [self.x, self.y, self.z, self.w][index]
+
+class MFloatPoint(MPoint):
+    pass
+
+class MSpace:
+    kObject = 2
+    kWorld = 4
+
+class MFn:
+    kMeshVertComponent = 550
+
+class MObject:
+    def __init__(self, node = None, data = None):
+        self.node = node
+        self.data = data
+
+class MDagPath:
+    def __init__(self, node):
+        self.node = node
+
+    def partialPathName(self):
+        return self.node.name
+
+    def fullPathName(self):
+        return self.node.GetFullPath()
+
+class MSelectionList:
+    def __init__(self):
+        self.nodes = []
+
+    def add(self, name):
+        self.nodes.append(scene.GetNode(name))
+        return self
+
+    def getDependNode(self, index):
+        return MObject(self.nodes[index])
+
+    def getDagPath(self, index):
+        return MDagPath(self.nodes[index])
+
+class MFnSingleIndexedComponent:
+    def __init__(self, component = None):
+        self.component = component
+
+    def create(self, componentType):
+        self.component = MObject(data = {"type": componentType, "indices": None})
+        return self.component
+
+    def setCompleteData(self, count):
+        self.component.data["indices"] = np.arange(count)
+        return self
+
+    def addElements(self, indices):
+        self.component.data["indices"] = np.asarray(list(indices))
+        return self
+
+class MFnDagNode:
+    def __init__(self, obj = None):
+        self.node = obj.node if isinstance(obj, MObject) else obj.node if obj else None
+
+    def partialPathName(self):
+        return self.node.name
+
+    def fullPathName(self):
+        return self.node.GetFullPath()
+
+class MFnMesh:
+    def __init__(self, obj = None):
+        self.node = None
+        if obj is not None:
+            node = obj.node
+            self.node = node if node.mesh is not None else scene.GetMeshShape(node.name)
+
+    @property
+    def numVertices(self):
+        return len(self.node.mesh.points)
+
+    @property
+    def numPolygons(self):
+        return len(self.node.mesh.faceVertCounts)
+
+    @property
+    def numFaceVertices(self):
+        return len(self.node.mesh.faceVerts)
+
+    def numUVs(self, uvSet = None):
+        return self.node.mesh.uvCount
+
+    def numColors(self, colorSet = None):
+        return 0
+
+    def getVertices(self):
+        return MIntArray(self.node.mesh.faceVertCounts.tolist()), MIntArray(self.node.mesh.faceVerts.tolist())
+
+    def getPoints(self, space = MSpace.kObject):
+        points = scene.GetWorldPoints(self.node) if space == MSpace.kWorld else self.node.mesh.points
+        return MPointArray(MPoint(point) for point in points.tolist())
+
+    def getFloatPoints(self, space = MSpace.kObject):
+        points = scene.GetWorldPoints(self.node) if space == MSpace.kWorld else self.node.mesh.points
+        return MFloatPointArray(MFloatPoint(point) for point in points.astype(np.float32).tolist())
+
+    def setPoints(self, points, space = MSpace.kObject):
+        self.node.mesh.points = np.array([[point.x, point.y, point.z] for point in points])
+
+    def create(self, vertices, polygonCounts, polygonConnects, uValues = None, vValues = None, parent = None):
+        scene.calls["MFnMesh.create"] += 1
+        points = [[point[0], point[1], point[2]] for point in vertices]
+        if parent is not None and parent.node is not None:
+            transform = parent.node
+        else:
+            transform = scene.CreateNode("transform", "polySurface1")
+        shape = scene.CreateNode("mesh", transform.name + "Shape", transform)
+        shape.mesh = FakeMesh(points, list(polygonCounts), list(polygonConnects))
+        self.node = shape
+        return MObject(transform if parent is None else shape)
+
+class MFnSkinCluster:
+    def __init__(self, obj):
+        self.node = obj.node
+
+    def influenceObjects(self):
+        return [MDagPath(scene.GetNode(jnt)) for jnt in self.node.skin.influences]
+
+    def getWeights(self, shape, components, influences = None):
+        scene.calls["MFnSkinCluster.getWeights"] += 1
+        weights = self.node.skin.weights[components.data["indices"]]
+        return MDoubleArray(weights.ravel().tolist()), weights.shape[1]
+
+    def setWeights(self, shape, components, influences, weights, normalize = True, returnOldWeights = False):
+        scene.calls["MFnSkinCluster.setWeights"] += 1
+        indices = components.data["indices"]
+        values = np.asarray(list(weights), dtype=np.float64).reshape(len(indices), len(influences))
+        skin = self.node.skin
+        skin.weights[np.ix_(indices, list(influences))] = values
+        return None
+
+class MMessage:
+    @staticmethod
+    def removeCallback(callbackId):
+        scene.connectionCallbacks.pop(callbackId, None)
+        scene.dagCallbacks.pop(callbackId, None)
+
+    @staticmethod
+    def removeCallbacks(callbackIds):
+        for callbackId in callbackIds:
+            scene.connectionCallbacks.pop(callbackId, None)
+            scene.dagCallbacks.pop(callbackId, None)
+
+class MDagMessage(MMessage):
+    @staticmethod
+    def addAllDagChangesCallback(callback, clientData = None):
+        callbackId = scene.nextCallbackId
+        scene.nextCallbackId += 1
+        scene.dagCallbacks[callbackId] = callback
+        return callbackId
+
+class MDGMessage(MMessage):
+    @staticmethod
+    def addConnectionCallback(callback, clientData = None):
+        callbackId = scene.nextCallbackId
+        scene.nextCallbackId += 1
+        scene.connectionCallbacks[callbackId] = callback
+        return callbackId
+
+####################################
+#             Install              #
+####################################
+def ResetScene():
+    global scene
+    scene = FakeScene()
+    return scene
+
+def GetScene():
+    return scene
+
+def ResetCallCounts():
+    scene.calls.clear()
+    scene.commandSeconds.clear()
+
+def GetCallCounts():
+    return dict(scene.calls)
+
+def GetCommandSeconds():
+    return dict(scene.commandSeconds)
+
+class MQtUtil():
+    # there is no ui in the fake scene, so no control is ever found
+    @staticmethod
+    def findControl(name):
+        return None
+
+    @staticmethod
+    def mainWindow():
+        return None
+
+def InstallFakeMaya():
+    cmdsModule = types.ModuleType("maya.cmds")
+    for name, func in commands.items():
+        setattr(cmdsModule, name, func)
+
+    openMaya = types.ModuleType("maya.api.OpenMaya")
+    for cls in [MIntArray, MDoubleArray, MPointArray, MFloatPointArray, MPoint, MFloatPoint, MSpace, MFn, MObject, MDagPath,
+                MSelectionList, MFnSingleIndexedComponent, MFnDagNode, MFnMesh, MMessage, MDGMessage, MDagMessage]:
+        setattr(openMaya, cls.__name__, cls)
+
+    openMayaAnim = types.ModuleType("maya.api.OpenMayaAnim")
+    openMayaAnim.MFnSkinCluster = MFnSkinCluster
+
+    melModule = types.ModuleType("maya.mel")
+    melModule.eval = lambda script: "timeControl1" if "gPlayBackSlider" in script else None
+
+    openMayaUI = types.ModuleType("maya.OpenMayaUI")
+    openMayaUI.MQtUtil = MQtUtil
+
+    # the vendored stubs are used for the package if they are on the path, otherwise empty packages stand in
+    for packageName in ["maya", "maya.api"]:
+        if packageName not in sys.modules:
+            try:
+                __import__(packageName)
+            except ImportError:
+                package = types.ModuleType(packageName)
+                package.__path__ = []
+                sys.modules[packageName] = package
+    maya = sys.modules["maya"]
+    maya.api = sys.modules["maya.api"]
+    maya.mel = melModule
+    maya.OpenMayaUI = openMayaUI
+    sys.modules["maya.mel"] = melModule
+    sys.modules["maya.OpenMayaUI"] = openMayaUI
+    maya.cmds = cmdsModule
+    maya.api.OpenMaya = openMaya
+    maya.api.OpenMayaAnim = openMayaAnim
+    sys.modules["maya.cmds"] = cmdsModule
+    sys.modules["maya.api.OpenMaya"] = openMaya
+    sys.modules["maya.api.OpenMayaAnim"] = openMayaAnim
+    return cmdsModule
+
+####################################
+#           Headless Qt            #
+####################################
+class HeadlessQtMeta(type):
+    # class level lookups like QAbstractItemView.ExtendedSelection
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return HeadlessQtObject()
+
+class HeadlessQtObject(metaclass=HeadlessQtMeta):
+    # takes any arguments, every attribute is another stand in and calling one does nothing
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return HeadlessQtObject()
+
+    def __call__(self, *args, **kwargs):
+        return HeadlessQtObject()
+
+    def __iter__(self):
+        return iter(())
+
+class HeadlessBoundSignal:
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def disconnect(self, slot = None):
+        self.slots = [] if slot is None else [connected for connected in self.slots if connected != slot]
+
+    def emit(self, *args):
+        for slot in list(self.slots):
+            slot(*args)
+
+class HeadlessSignal:
+    # each instance gets its own connections, like a pyside signal
+    def __init__(self, *types, **kwargs):
+        self.name = ""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return instance.__dict__.setdefault("_signal_" + self.name, HeadlessBoundSignal())
+
+def HeadlessSlot(*types, **kwargs):
+    return lambda func: func
+
+def CanConstructQt():
+    try:
+        from PySide2.QtCore import QObject
+        QObject()
+        return True
+    except Exception:
+        return False
+
+def InstallHeadlessQt():
+    # only when the real PySide2 can't make objects, the vendored stubs for example have __new__ = None
+    if CanConstructQt():
+        return False
+
+    headlessClasses = {"Signal": HeadlessSignal, "Slot": HeadlessSlot}
+    def GetHeadlessClass(name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        if name not in headlessClasses:
+            headlessClasses[name] = HeadlessQtMeta(name, (HeadlessQtObject,), {})
+        return headlessClasses[name]
+
+    package = types.ModuleType("PySide2")
+    package.__path__ = []
+    sys.modules["PySide2"] = package
+    for moduleName in ["QtCore", "QtGui", "QtWidgets"]:
+        module = types.ModuleType("PySide2." + moduleName)
+        module.__getattr__ = GetHeadlessClass
+        setattr(package, moduleName, module)
+        sys.modules["PySide2." + moduleName] = module
+
+    shiboken = types.ModuleType("shiboken2")
+    shiboken.wrapInstance = lambda pointer, cls: None
+    sys.modules["shiboken2"] = shiboken
+    return True
@@ -1,51 +1,345 @@
+import bisect
+import time
 import maya.cmds as mc
+import maya.mel as mel
+import maya.api.OpenMaya as om
+import maya.OpenMayaUI as omui
+import numpy as np
 
-from PySide2.QtCore import Signal, Qt
-from PySide2.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QAbstractItemView, QPushButton, QLabel, QListWidget, QColorDialog, QSlider
-from PySide2.QtGui import QColor, QPainter, QBrush
+from shiboken2 import wrapInstance
+from PySide2.QtCore import Signal, Qt, QObject, QEvent
+from PySide2.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QAbstractItemView, QPushButton, QLabel, QListWidget, QColorDialog, QSlider, QCheckBox, QLineEdit
+from PySide2.QtGui import QColor, QPainter, QBrush, QIntValidator
 
 def GetCurrentFrame():
     return int(mc.currentTime(q=True))
 
+def GetTimeSliderWidget():
+    timeSlider = mel.eval("$tmpVar = $gPlayBackSlider")
+    sliderPtr = omui.MQtUtil.findControl(timeSlider)
+    if not sliderPtr:
+        return None
+
+    return wrapInstance(int(sliderPtr), QWidget)
+
+def GetDagPath(obj):
+    selection = om.MSelectionList()
+    selection.add(obj)
+    return selection.getDagPath(0)
+
+def GetMeshShape(obj):
+    shapes = mc.listRelatives(obj, s=True, ni=True, type="mesh")
+    return shapes[0] if shapes else None
+
+def EstimateMeshBytes(meshShape):
+    # points and uvs as float32, face-vertex and uv ids as int32
+    meshFn = om.MFnMesh(GetDagPath(meshShape))
+    uvIdBytes = meshFn.numFaceVertices * 4 if meshFn.numUVs() else 0
+    return meshFn.numVertices * 12 + meshFn.numFaceVertices * 4 + meshFn.numUVs() * 8 + uvIdBytes + meshFn.numColors() * 16
+
 class Ghost():
     def __init__(self):
         self.srcMeshs = set()
+        self.ghostFrames = {}
+        self.appliedTransparencies = {}
+        self.frameGhostCounts = {}
+        self.sortedGhostFrames = []
+        self.ghostIndexDirty = True
+        self.ghostNames = []
+        self.ghostMats = []
+        self.ghostFrameArray = np.zeros(0)
+        self.appliedTransparencyArray = np.zeros(0)
+        self.ghostVertCounts = {}
+        self.ghostLastViewed = {}
+        self.ghostVertCountArray = np.zeros(0)
+        self.lastViewedArray = np.zeros(0)
+        self.viewClock = 0
+        self.maxGhostCount = 0
+        self.maxGhostVerts = 0
+        self.evictionPolicy = "distance"
+        self.lastEvictedGhosts = []
         self.InitGhostGrpIfNotExist()
         self.InitSrcMeshFromGhostGrp()
+        self.RebuildGhostIndex()
         self.ghostColor = [0,0,0]
         self.baseTransparency = 0
         self.transparencyRange = 60
+        self.poolLevels = 11
+        self.useSnapshotGhosts = False
+        self.suspendTimeUpdates = False
+        self.updatePending = False
+        self.updateRequestCount = 0
+        self.updateApplyCount = 0
+        self.updateOnScrubReleaseOnly = False
+        self.scrubbing = False
+        self.scrubFilter = None
+        self.srcTopologies = {}
+        self.usePooledMaterials = self.GetPooledModeFromGhostGrp()
         self.timeJob = mc.scriptJob(e=["timeChanged",self.CurrentTimeChanged])
+        self.sceneJob = mc.scriptJob(e=["SceneOpened",self.SceneOpened])
+        self.newSceneJob = mc.scriptJob(e=["NewSceneOpened",self.SceneOpened])
 
-    def CurrentTimeChanged(self):
+    def SceneOpened(self):
+        self.InitGhostGrpIfNotExist()
+        self.InitSrcMeshFromGhostGrp()
+        self.RebuildGhostIndex()
+        self.usePooledMaterials = self.GetPooledModeFromGhostGrp()
+
+    def RebuildGhostIndex(self):
+        # reads Ghost_grp once, after that AddGhost and DeleteGhost keep the index up to date
+        self.ghostFrames = {}
+        self.appliedTransparencies = {}
+        self.frameGhostCounts = {}
+        self.sortedGhostFrames = []
+        self.ghostVertCounts = {}
+        self.ghostLastViewed = {}
+        allGhosts = mc.listRelatives(self.GetGhostGrpName(), c=True)
+        if allGhosts:
+            for ghost in allGhosts:
+                self.RegisterGhost(ghost, mc.getAttr(ghost + "." + self.GetFrameAttr()), mc.polyEvaluate(ghost, v=True))
+
+        self.ghostIndexDirty = True
+
+    def RegisterGhost(self, ghost, frame, vertCount = 0):
+        self.UnregisterGhost(ghost)
+        self.ghostFrames[ghost] = frame
+        self.ghostVertCounts[ghost] = vertCount
+        self.ghostLastViewed[ghost] = self.viewClock
+        if frame not in self.frameGhostCounts:
+            self.frameGhostCounts[frame] = 0
+            bisect.insort(self.sortedGhostFrames, frame)
+
+        self.frameGhostCounts[frame] += 1
+        self.ghostIndexDirty = True
+
+    def UnregisterGhost(self, ghost):
+        self.appliedTransparencies.pop(ghost, None)
+        self.ghostVertCounts.pop(ghost, None)
+        self.ghostLastViewed.pop(ghost, None)
+        if ghost not in self.ghostFrames:
+            return
+
+        frame = self.ghostFrames.pop(ghost)
+        self.frameGhostCounts[frame] -= 1
+        if self.frameGhostCounts[frame] == 0:
+            del self.frameGhostCounts[frame]
+            del self.sortedGhostFrames[bisect.bisect_left(self.sortedGhostFrames, frame)]
+
+        self.ghostIndexDirty = True
+
+    def RefreshGhostIndex(self):
+        if not self.ghostIndexDirty:
+            return
+
+        # last viewed times are only kept in the array between rebuilds, write them back first
+        for ghost, lastViewed in zip(self.ghostNames, self.lastViewedArray):
+            if ghost in self.ghostLastViewed:
+                self.ghostLastViewed[ghost] = lastViewed
+
+        self.ghostNames = list(self.ghostFrames)
+        self.ghostMats = [self.GetShaderNameForGhost(ghost) for ghost in self.ghostNames]
+        self.ghostFrameArray = np.array([self.ghostFrames[ghost] for ghost in self.ghostNames], dtype=np.float64)
+        # nan never equals a computed value, so ghosts without an applied value always get set
+        self.appliedTransparencyArray = np.array([self.appliedTransparencies.get(ghost, np.nan) for ghost in self.ghostNames], dtype=np.float64)
+        self.ghostVertCountArray = np.array([self.ghostVertCounts[ghost] for ghost in self.ghostNames], dtype=np.int64)
+        self.lastViewedArray = np.array([self.ghostLastViewed[ghost] for ghost in self.ghostNames], dtype=np.int64)
+        self.ghostIndexDirty = False
+
+    def SetGhostBudget(self, maxGhostCount = None, maxGhostVerts = None, evictionPolicy = None):
+        # 0 means no limit, evictionPolicy is "distance" (furthest from the current frame) or "lru"
+        if maxGhostCount is not None:
+            self.maxGhostCount = max(int(maxGhostCount), 0)
+        if maxGhostVerts is not None:
+            self.maxGhostVerts = max(int(maxGhostVerts), 0)
+        if evictionPolicy is not None:
+            self.evictionPolicy = evictionPolicy
+
+        return self.EnforceGhostBudget()
+
+    def IsOverGhostBudget(self, ghostCount, vertCount):
+        return (self.maxGhostCount > 0 and ghostCount > self.maxGhostCount) or (self.maxGhostVerts > 0 and vertCount > self.maxGhostVerts)
+
+    def GetEvictionOrder(self):
+        if self.evictionPolicy == "lru":
+            return np.argsort(self.lastViewedArray, kind="stable")
+
+        distances = np.abs(GetCurrentFrame() - self.ghostFrameArray)
+        return np.argsort(-distances, kind="stable")
+
+    def EnforceGhostBudget(self, keepGhosts = ()):
+        # keepGhosts go last, so a batch that was just added only loses ghosts when it alone is over the budget
+        self.RefreshGhostIndex()
+        ghostCount = len(self.ghostNames)
+        vertCount = int(self.ghostVertCountArray.sum())
+        if not self.IsOverGhostBudget(ghostCount, vertCount):
+            return []
+
+        evictedGhosts = []
+        evictionOrder = self.GetEvictionOrder()
+        isKept = np.isin(np.array(self.ghostNames, dtype=object)[evictionOrder], list(keepGhosts))
+        for i in np.concatenate([evictionOrder[~isKept], evictionOrder[isKept]]):
+            if not self.IsOverGhostBudget(ghostCount, vertCount):
+                break
+
+            evictedGhosts.append(self.ghostNames[i])
+            ghostCount -= 1
+            vertCount -= int(self.ghostVertCountArray[i])
+
+        for ghost in evictedGhosts:
+            self.DeleteGhost(ghost)
+
+        return evictedGhosts
+
+    def GetGhostTransparencies(self, currentFrame):
+        distances = np.abs(currentFrame - self.ghostFrameArray)
+        if self.transparencyRange <= 0:
+            return np.where(distances > 0, 1.0, 0.0)
+
+        return np.where(distances > self.transparencyRange, 1.0, distances / self.transparencyRange)
+
+    def QuantizeTransparencies(self, transparencies):
+        return np.rint(transparencies * (self.poolLevels - 1)) / (self.poolLevels - 1)
+
+    def GetPoolLevel(self, transparency):
+        return int(round(transparency * (self.poolLevels - 1)))
+
+    def SetPooledMaterials(self, usePooledMaterials):
+        # pooled ghosts share poolLevels materials, one per quantized transparency, instead of one each
+        if usePooledMaterials == self.usePooledMaterials:
+            return
+
+        self.usePooledMaterials = usePooledMaterials
+        mc.setAttr(self.GetGhostGrpName() + "." + self.GetPooledModeAttr(), usePooledMaterials)
+        if usePooledMaterials:
+            self.CreatePooledMaterials()
+            for ghost in self.ghostFrames:
+                self.DeleteMaterialForGhost(ghost)
+        else:
+            for ghost in self.ghostFrames:
+                self.CreateMaterialForGhost(ghost)
+                self.SetGhostColor(ghost, self.ghostColor[0], self.ghostColor[1], self.ghostColor[2])
+            self.DeletePooledMaterials()
+
+        self.appliedTransparencies.clear()
+        self.ghostIndexDirty = True
         self.UpdateGhostTransparency()
 
+    def CreatePooledMaterials(self):
+        for level in range(self.poolLevels):
+            poolName = self.GetPooledMaterialName(level)
+            matName = self.GetShaderNameForGhost(poolName)
+            if not mc.objExists(matName):
+                mc.shadingNode("lambert", asShader = True, name = matName)
+
+            setName = self.GetShaderEngineForGhost(poolName)
+            if not mc.objExists(setName):
+                mc.sets(name = setName, renderable = True, empty = True)
+
+            mc.connectAttr(matName + ".outColor", setName + ".surfaceShader", force = True)
+            transparency = level / (self.poolLevels - 1)
+            mc.setAttr(matName + ".transparency", transparency, transparency, transparency, type = "double3")
+            mc.setAttr(matName + ".color", self.ghostColor[0], self.ghostColor[1], self.ghostColor[2], type = "double3")
+
+    def DeletePooledMaterials(self):
+        for level in range(self.poolLevels):
+            self.DeleteMaterialForGhost(self.GetPooledMaterialName(level))
+
+    def AssignPooledMaterials(self, ghosts, transparencies):
+        # one sets call per level that gained ghosts
+        for transparency in np.unique(transparencies):
+            levelGhosts = [ghost for ghost, ghostTransparency in zip(ghosts, transparencies) if ghostTransparency == transparency]
+            poolName = self.GetPooledMaterialName(self.GetPoolLevel(transparency))
+            mc.sets(levelGhosts, edit=True, forceElement = self.GetShaderEngineForGhost(poolName))
+
+    def CurrentTimeChanged(self):
+        if self.suspendTimeUpdates:
+            return
+
+        self.RequestGhostUpdate()
+
     def UpdateTransparencyRange(self, newRange):
         self.transparencyRange = newRange 
-        self.UpdateGhostTransparency()
+        self.RequestGhostUpdate()
 
     def UpdateBaseTranparency(self, newTransparency):      
         self.baseTransparency = newTransparency
+        self.RequestGhostUpdate()
+
+    def RequestGhostUpdate(self):
+        # a burst of requests queues one deferred update, it runs when maya is idle
+        self.updateRequestCount += 1
+        if self.updatePending:
+            return
+
+        self.updatePending = True
+        if self.IsHoldingUpdates():
+            return
+
+        mc.evalDeferred(self.ApplyGhostUpdate, lowestPriority = True)
+
+    def ApplyGhostUpdate(self):
+        if not self.updatePending or self.IsHoldingUpdates():
+            return
+
+        self.updatePending = False
+        self.updateApplyCount += 1
         self.UpdateGhostTransparency()
 
+    def IsHoldingUpdates(self):
+        return self.updateOnScrubReleaseOnly and self.scrubbing
+
+    def SetUpdateOnScrubReleaseOnly(self, updateOnScrubReleaseOnly):
+        self.updateOnScrubReleaseOnly = updateOnScrubReleaseOnly
+        timeSlider = GetTimeSliderWidget()
+        if updateOnScrubReleaseOnly and not self.scrubFilter and timeSlider:
+            self.scrubFilter = TimeSliderScrubFilter(self)
+            timeSlider.installEventFilter(self.scrubFilter)
+        elif not updateOnScrubReleaseOnly and self.scrubFilter:
+            if timeSlider:
+                timeSlider.removeEventFilter(self.scrubFilter)
+            self.scrubFilter = None
+            self.ScrubEnded()
+
+    def ScrubStarted(self):
+        self.scrubbing = True
+
+    def ScrubEnded(self):
+        self.scrubbing = False
+        if self.updatePending:
+            mc.evalDeferred(self.ApplyGhostUpdate, lowestPriority = True)
+
+    def GetUpdateCounts(self):
+        return {"requested": self.updateRequestCount, "applied": self.updateApplyCount}
+
+    def ResetUpdateCounts(self):
+        self.updateRequestCount = 0
+        self.updateApplyCount = 0
+
     def UpdateGhostTransparency(self):
-        allGhosts = mc.listRelatives(self.GetGhostGrpName(), c=True)
-        if not allGhosts:
+        self.RefreshGhostIndex()
+        if not self.ghostNames:
             return
 
-        for ghost in allGhosts:
-            ghostFrame = mc.getAttr(ghost + "."+self.GetFrameAttr())
-            currentFrame = GetCurrentFrame()
-            distance = abs(currentFrame - ghostFrame)
-            
-            ghostMat = self.GetShaderNameForGhost(ghost)
-        
-            if distance > self.transparencyRange:
-                mc.setAttr(ghostMat + ".transparency", 1,1,1, type = "double3")
-                continue
+        transparencies = self.GetGhostTransparencies(GetCurrentFrame())
+        self.viewClock += 1
+        self.lastViewedArray[transparencies < 1.0] = self.viewClock
+        if self.usePooledMaterials:
+            transparencies = self.QuantizeTransparencies(transparencies)
+
+        changed = np.flatnonzero(transparencies != self.appliedTransparencyArray)
+        if self.usePooledMaterials:
+            changedGhosts = [self.ghostNames[i] for i in changed]
+            self.AssignPooledMaterials(changedGhosts, transparencies[changed])
+            self.appliedTransparencies.update(zip(changedGhosts, transparencies[changed]))
+            self.appliedTransparencyArray[changed] = transparencies[changed]
+            return
 
-            normalizeDist = distance / self.transparencyRange
-            mc.setAttr(ghostMat + ".transparency", normalizeDist, normalizeDist, normalizeDist, type = "double3")
+        for i in changed:
+            transparency = transparencies[i]
+            mc.setAttr(self.ghostMats[i] + ".transparency", transparency, transparency, transparency, type = "double3")
+            self.appliedTransparencies[self.ghostNames[i]] = transparency
+
+        self.appliedTransparencyArray[changed] = transparencies[changed]
 
     def DeleteSelectedGhost(self):
         for srcMesh in self.srcMeshs:
@@ -56,11 +350,23 @@ class Ghost():
         self.ghostColor[0] = r
         self.ghostColor[1] = g
         self.ghostColor[2] = b
-        allGhosts = mc.listRelatives(self.GetGhostGrpName(), c=True)
-        for ghost in allGhosts:
+        if self.usePooledMaterials:
+            for level in range(self.poolLevels):
+                self.SetGhostColor(self.GetPooledMaterialName(level), r, g, b)
+            return
+
+        for ghost in self.ghostFrames:
             self.SetGhostColor(ghost, r, g, b)
 
     def DeleteGhost(self, ghostName):
+        self.DeleteMaterialForGhost(ghostName)
+
+        if mc.objExists(ghostName):
+            mc.delete(ghostName)
+
+        self.UnregisterGhost(ghostName)
+
+    def DeleteMaterialForGhost(self, ghostName):
         ghostSg = self.GetShaderEngineForGhost(ghostName)
         if mc.objExists(ghostSg):
             mc.delete(ghostSg)
@@ -69,9 +375,6 @@ class Ghost():
         if mc.objExists(ghostMat):
             mc.delete(ghostMat)
 
-        if mc.objExists(ghostName):
-            mc.delete(ghostName)
-
     def SetGhostColor(self, ghost, r, g, b):
         ghostMat = self.GetShaderNameForGhost(ghost)
         mc.setAttr(ghostMat + ".color", r, g, b, type = "double3")
@@ -86,7 +389,10 @@ class Ghost():
 
     def InitSrcMeshFromGhostGrp(self):
         srcMeshAttr = mc.getAttr(self.GetGhostGrpName() + "." + self.GetSrcMeshAttr())
+        # nothing of the previous scene is kept, an empty attr is a scene without source meshes yet
+        self.srcTopologies = {}
         if not srcMeshAttr:
+            self.srcMeshs = set()
             return
         
         meshes = srcMeshAttr.split(",")
@@ -97,6 +403,18 @@ class Ghost():
             mc.createNode("transform", n = self.GetGhostGrpName())
             mc.addAttr(self.GetGhostGrpName(), ln = self.GetSrcMeshAttr(), dt = "string")
 
+        if not mc.attributeQuery(self.GetPooledModeAttr(), n = self.GetGhostGrpName(), ex=True):
+            mc.addAttr(self.GetGhostGrpName(), ln = self.GetPooledModeAttr(), at = "bool", dv = 0)
+
+    def GetPooledModeFromGhostGrp(self):
+        return bool(mc.getAttr(self.GetGhostGrpName() + "." + self.GetPooledModeAttr()))
+
+    def GetPooledModeAttr(self):
+        return "pooledMaterials"
+
+    def GetPooledMaterialName(self, level):
+        return f"ghostPool_{level:02d}"
+
     def GetSrcMeshAttr(self):
         return "src"
 
@@ -104,54 +422,129 @@ class Ghost():
         return "Ghost_grp"
 
     def GoToNextGhost(self):
-        currentFrame = GetCurrentFrame()
-        frames = self.GetGhostFramesSorted()
-        nextFrame = frames[0]
-        for frame in frames:
-            if frame > currentFrame:
-                nextFrame = frame
-                break
-        
+        frames = self.sortedGhostFrames
+        if not frames:
+            return
+
+        nextIndex = bisect.bisect_right(frames, GetCurrentFrame())
+        nextFrame = frames[nextIndex] if nextIndex < len(frames) else frames[0]
         mc.currentTime(nextFrame, e=True)
 
     def GoToPrevGhost(self):
-        currentFrame = GetCurrentFrame()
-        frames = self.GetGhostFramesSorted()
-        nextFrame = frames[-1]
-        
-        frames.reverse()
-        for frame in frames:
-            if frame < currentFrame:
-                nextFrame = frame
-                break
+        frames = self.sortedGhostFrames
+        if not frames:
+            return
 
-        mc.currentTime(nextFrame, e=True)
+        prevIndex = bisect.bisect_left(frames, GetCurrentFrame())
+        prevFrame = frames[prevIndex - 1] if prevIndex > 0 else frames[-1]
+        mc.currentTime(prevFrame, e=True)
 
     def GetGhostFramesSorted(self):
-        ghosts = mc.listRelatives(self.GetGhostGrpName(), c=True)
-        frames = set() 
-        for ghost in ghosts:
-            frame = mc.getAttr(ghost + "." + self.GetFrameAttr())
-            frames.add(frame)
-
-        frames = list(frames)
-        frames.sort()
-        return frames
+        return list(self.sortedGhostFrames)
 
     def GetGhostSubfix(self):
         return "_ghost_"
 
     def AddGhost(self):
-        for srcMesh in self.srcMeshs:
-            ghostName = srcMesh + self.GetGhostSubfix() + str(GetCurrentFrame())
-            if mc.objExists(ghostName):
-                mc.delete(ghostName)
+        self.CreateGhostsForFrames([GetCurrentFrame()])
+
+    def AddGhostsInRange(self, startFrame, endFrame, step = 1):
+        frames = list(range(int(startFrame), int(endFrame) + 1, max(int(step), 1)))
+        timings = self.CreateGhostsForFrames(frames)
+        print(f"added {len(frames) * len(self.srcMeshs)} ghosts in {sum(timings.values()):.3f}s")
+        if self.lastEvictedGhosts:
+            print(f"    evicted {len(self.lastEvictedGhosts)} ghosts to stay in budget: {', '.join(self.lastEvictedGhosts)}")
+        for phase, seconds in timings.items():
+            print(f"    {phase}: {seconds:.3f}s")
+
+        return timings
+
+    def CreateGhostsForFrames(self, frames):
+        # walks the frames once with the viewport suspended, then does the per-ghost setup in batches
+        timings = {"evaluate": 0.0, "create": 0.0, "attributes": 0.0, "parent": 0.0, "materials": 0.0, "budget": 0.0, "transparency": 0.0}
+        originalFrame = GetCurrentFrame()
+        frameGhosts = {}
+        ghostVertCounts = {}
+        srcVertCounts = {srcMesh: mc.polyEvaluate(srcMesh, v=True) for srcMesh in self.srcMeshs}
+        self.suspendTimeUpdates = True
+        mc.refresh(suspend=True)
+        try:
+            for frame in frames:
+                phaseStart = time.perf_counter()
+                mc.currentTime(frame, e=True)
+                timings["evaluate"] += time.perf_counter() - phaseStart
+
+                phaseStart = time.perf_counter()
+                frameGhosts[frame] = []
+                for srcMesh in self.srcMeshs:
+                    ghostName = srcMesh + self.GetGhostSubfix() + str(frame)
+                    if mc.objExists(ghostName):
+                        mc.delete(ghostName)
+
+                    if self.useSnapshotGhosts:
+                        self.CreateSnapshotGhost(srcMesh, ghostName)
+                    else:
+                        mc.duplicate(srcMesh, n = ghostName)
+                    frameGhosts[frame].append(ghostName)
+                    ghostVertCounts[ghostName] = srcVertCounts[srcMesh]
+                timings["create"] += time.perf_counter() - phaseStart
+
+            newGhosts = [ghost for ghosts in frameGhosts.values() for ghost in ghosts]
+            if not newGhosts:
+                return timings
+
+            phaseStart = time.perf_counter()
+            for frame, ghosts in frameGhosts.items():
+                mc.addAttr(ghosts, ln = self.GetFrameAttr(), dv = frame)
+            timings["attributes"] += time.perf_counter() - phaseStart
+
+            phaseStart = time.perf_counter()
+            mc.parent(newGhosts, self.GetGhostGrpName())
+            for frame, ghosts in frameGhosts.items():
+                for ghost in ghosts:
+                    self.RegisterGhost(ghost, frame, ghostVertCounts[ghost])
+            timings["parent"] += time.perf_counter() - phaseStart
+
+            phaseStart = time.perf_counter()
+            if self.usePooledMaterials:
+                if not mc.objExists(self.GetShaderEngineForGhost(self.GetPooledMaterialName(0))):
+                    self.CreatePooledMaterials()
+            else:
+                for ghost in newGhosts:
+                    self.CreateMaterialForGhost(ghost)
+                    self.SetGhostColor(ghost, self.ghostColor[0], self.ghostColor[1], self.ghostColor[2])
+            timings["materials"] += time.perf_counter() - phaseStart
+        finally:
+            mc.currentTime(originalFrame, e=True)
+            self.suspendTimeUpdates = False
+            mc.refresh(suspend=False)
+
+        phaseStart = time.perf_counter()
+        self.lastEvictedGhosts = self.EnforceGhostBudget(newGhosts)
+        timings["budget"] += time.perf_counter() - phaseStart
+
+        phaseStart = time.perf_counter()
+        self.UpdateGhostTransparency()
+        timings["transparency"] += time.perf_counter() - phaseStart
+        return timings
+
+    def CreateSnapshotGhost(self, srcMesh, ghostName):
+        # only the evaluated points are read per ghost, the topology is read once per source mesh
+        meshFn = om.MFnMesh(GetDagPath(GetMeshShape(srcMesh)))
+        faceVertCounts, faceVerts = self.GetSrcTopology(srcMesh, meshFn)
+        points = meshFn.getFloatPoints(om.MSpace.kWorld)
 
-            mc.duplicate(srcMesh, n = ghostName)
-            mc.addAttr(ghostName, ln = self.GetFrameAttr(), dv = GetCurrentFrame())
-            mc.parent(ghostName, self.GetGhostGrpName())
-            self.CreateMaterialForGhost(ghostName)
-            self.SetGhostColor(ghostName, self.ghostColor[0], self.ghostColor[1], self.ghostColor[2])
+        ghostObj = om.MFnMesh().create(points, faceVertCounts, faceVerts)
+        mc.rename(om.MFnDagNode(ghostObj).partialPathName(), ghostName)
+
+    def GetSrcTopology(self, srcMesh, meshFn):
+        topology = self.srcTopologies.get(srcMesh)
+        if topology is None or topology[0] != (meshFn.numVertices, meshFn.numPolygons):
+            faceVertCounts, faceVerts = meshFn.getVertices()
+            topology = ((meshFn.numVertices, meshFn.numPolygons), faceVertCounts, faceVerts)
+            self.srcTopologies[srcMesh] = topology
+
+        return topology[1], topology[2]
 
     def GetFrameAttr(self):
         return "frame"
@@ -185,6 +578,59 @@ class Ghost():
     def GetShaderNameForGhost(self, ghost):
         return ghost + "_mat"
 
+def BenchmarkGhostModes(ghost):
+    # adds and removes one ghost per source mesh in each mode, on the first frame from the current one without ghosts
+    results = {}
+    frame = GetCurrentFrame()
+    while frame in ghost.frameGhostCounts:
+        frame += 1
+
+    # the budget is lifted while benchmarking so the existing ghosts are never evicted
+    useSnapshotGhosts = ghost.useSnapshotGhosts
+    maxGhostCount, maxGhostVerts = ghost.maxGhostCount, ghost.maxGhostVerts
+    ghost.maxGhostCount, ghost.maxGhostVerts = 0, 0
+    try:
+        for snapshot in [False, True]:
+            ghost.useSnapshotGhosts = snapshot
+            nodesBefore = set(mc.ls())
+
+            startTime = time.perf_counter()
+            ghost.CreateGhostsForFrames([frame])
+            seconds = time.perf_counter() - startTime
+
+            newNodes = list(set(mc.ls()) - nodesBefore)
+            newMeshes = mc.ls(newNodes, type="mesh") if newNodes else []
+            ghostCount = max(len(ghost.srcMeshs), 1)
+            modeName = "snapshot" if snapshot else "duplicate"
+            results[modeName] = {
+                "seconds": seconds,
+                "nodesPerGhost": len(newNodes) / ghostCount,
+                "bytesPerGhost": sum(EstimateMeshBytes(mesh) for mesh in newMeshes) / ghostCount
+            }
+            for srcMesh in ghost.srcMeshs:
+                ghost.DeleteGhost(srcMesh + ghost.GetGhostSubfix() + str(frame))
+    finally:
+        ghost.useSnapshotGhosts = useSnapshotGhosts
+        ghost.maxGhostCount, ghost.maxGhostVerts = maxGhostCount, maxGhostVerts
+
+    for modeName, result in results.items():
+        print(f"{modeName}: {result['seconds']:.4f}s, {result['nodesPerGhost']:.1f} nodes, {result['bytesPerGhost']:.0f} bytes per ghost")
+
+    return results
+
+class TimeSliderScrubFilter(QObject):
+    def __init__(self, ghost):
+        super().__init__()
+        self.ghost = ghost
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.MouseButtonPress:
+            self.ghost.ScrubStarted()
+        elif event.type() == QEvent.MouseButtonRelease:
+            self.ghost.ScrubEnded()
+
+        return False
+
 class ColorPicker(QWidget):
     colorChanged = Signal(QColor)
     def __init__(self, width = 80, height = 20):
@@ -213,6 +659,7 @@ class GhostWidget(QWidget):
         self.CreateMeshSelSection()
         self.CreateMatCtrlSection()
         self.CreateCtrlSection()
+        self.CreateRangeSection()
 
     def CreateMatCtrlSection(self):
         layout = QHBoxLayout()
@@ -229,6 +676,21 @@ class GhostWidget(QWidget):
         transSlider.valueChanged.connect(self.BaseTransparencyChanged)
         layout.addWidget(transSlider)
 
+        snapshotCheckbox = QCheckBox("Snapshot Ghosts")
+        snapshotCheckbox.setChecked(self.ghost.useSnapshotGhosts)
+        snapshotCheckbox.toggled.connect(self.SnapshotGhostsToggled)
+        layout.addWidget(snapshotCheckbox)
+
+        pooledMatCheckbox = QCheckBox("Shared Materials")
+        pooledMatCheckbox.setChecked(self.ghost.usePooledMaterials)
+        pooledMatCheckbox.toggled.connect(self.ghost.SetPooledMaterials)
+        layout.addWidget(pooledMatCheckbox)
+
+        scrubReleaseCheckbox = QCheckBox("Update on Scrub Release")
+        scrubReleaseCheckbox.setChecked(self.ghost.updateOnScrubReleaseOnly)
+        scrubReleaseCheckbox.toggled.connect(self.ghost.SetUpdateOnScrubReleaseOnly)
+        layout.addWidget(scrubReleaseCheckbox)
+
         visCtrlLayout = QHBoxLayout()
         self.masterLayout.addLayout(visCtrlLayout)
 
@@ -241,6 +703,9 @@ class GhostWidget(QWidget):
         rangeSlider.valueChanged.connect(self.TransparencyRangeChanged)
         visCtrlLayout.addWidget(rangeSlider)
 
+    def SnapshotGhostsToggled(self, checked):
+        self.ghost.useSnapshotGhosts = checked
+
     def BaseTransparencyChanged(self, value):
         self.ghost.UpdateBaseTranparency(value/100)        
 
@@ -274,6 +739,68 @@ class GhostWidget(QWidget):
         delAllBtn.clicked.connect(self.ghost.DeleteAllGhosts)
         layout.addWidget(delAllBtn)
 
+    def CreateRangeSection(self):
+        layout = QHBoxLayout()
+        self.masterLayout.addLayout(layout)
+
+        layout.addWidget(QLabel("Start: "))
+        self.rangeStartLineEdit = QLineEdit()
+        self.rangeStartLineEdit.setValidator(QIntValidator())
+        self.rangeStartLineEdit.setText(str(int(mc.playbackOptions(q=True, min=True))))
+        layout.addWidget(self.rangeStartLineEdit)
+
+        layout.addWidget(QLabel("End: "))
+        self.rangeEndLineEdit = QLineEdit()
+        self.rangeEndLineEdit.setValidator(QIntValidator())
+        self.rangeEndLineEdit.setText(str(int(mc.playbackOptions(q=True, max=True))))
+        layout.addWidget(self.rangeEndLineEdit)
+
+        layout.addWidget(QLabel("Every: "))
+        self.rangeStepLineEdit = QLineEdit()
+        self.rangeStepLineEdit.setValidator(QIntValidator(1, 1000))
+        self.rangeStepLineEdit.setText("2")
+        layout.addWidget(self.rangeStepLineEdit)
+
+        addRangeBtn = QPushButton("Add Range")
+        addRangeBtn.clicked.connect(self.AddRangeBtnClicked)
+        layout.addWidget(addRangeBtn)
+
+        budgetLayout = QHBoxLayout()
+        self.masterLayout.addLayout(budgetLayout)
+
+        budgetLayout.addWidget(QLabel("Max Ghosts (0 = no limit): "))
+        self.maxGhostCountLineEdit = QLineEdit()
+        self.maxGhostCountLineEdit.setValidator(QIntValidator(0, 100000))
+        self.maxGhostCountLineEdit.setText(str(self.ghost.maxGhostCount))
+        self.maxGhostCountLineEdit.editingFinished.connect(self.GhostBudgetChanged)
+        budgetLayout.addWidget(self.maxGhostCountLineEdit)
+
+        budgetLayout.addWidget(QLabel("Max Verts: "))
+        self.maxGhostVertsLineEdit = QLineEdit()
+        self.maxGhostVertsLineEdit.setValidator(QIntValidator(0, 2000000000))
+        self.maxGhostVertsLineEdit.setText(str(self.ghost.maxGhostVerts))
+        self.maxGhostVertsLineEdit.editingFinished.connect(self.GhostBudgetChanged)
+        budgetLayout.addWidget(self.maxGhostVertsLineEdit)
+
+        lruCheckbox = QCheckBox("Evict Least Recently Viewed")
+        lruCheckbox.setChecked(self.ghost.evictionPolicy == "lru")
+        lruCheckbox.toggled.connect(self.EvictionPolicyToggled)
+        budgetLayout.addWidget(lruCheckbox)
+
+    def GhostBudgetChanged(self):
+        maxGhostCount = int(self.maxGhostCountLineEdit.text() or 0)
+        maxGhostVerts = int(self.maxGhostVertsLineEdit.text() or 0)
+        self.ghost.SetGhostBudget(maxGhostCount, maxGhostVerts)
+
+    def EvictionPolicyToggled(self, lru):
+        self.ghost.SetGhostBudget(evictionPolicy = "lru" if lru else "distance")
+
+    def AddRangeBtnClicked(self):
+        startFrame = int(self.rangeStartLineEdit.text())
+        endFrame = int(self.rangeEndLineEdit.text())
+        step = int(self.rangeStepLineEdit.text())
+        self.ghost.AddGhostsInRange(startFrame, endFrame, step)
+
     def CreateMeshSelSection(self):
         self.SrcMeshList = QListWidget()
         self.SrcMeshList.setSelectionMode(QAbstractItemView.ExtendedSelection)
@@ -294,5 +821,6 @@ class GhostWidget(QWidget):
         for item in self.SrcMeshList.selectedItems():
             mc.select(item.text(), add=True)
 
-ghostWidget = GhostWidget()
-ghostWidget.show()
\ No newline at end of file
+if __name__ == "__main__":
+    ghostWidget = GhostWidget()
+    ghostWidget.show()
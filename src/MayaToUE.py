@@ -1,8 +1,20 @@
 import os
-from PySide2.QtCore import QRegExp, Signal
+import json
+import mmap
+import struct
+import time
+import hashlib
+import subprocess
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, wait
+from collections import Counter
+from PySide2.QtCore import QObject, QRegExp, QTimer, Signal
 from PySide2.QtGui import QIntValidator, QRegExpValidator
 import maya.cmds as mc
-from PySide2.QtWidgets import QCheckBox, QFileDialog, QLineEdit, QSizePolicy, QWidget, QPushButton, QListWidget, QAbstractItemView, QLabel, QHBoxLayout, QVBoxLayout, QMessageBox
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+import numpy as np
+from PySide2.QtWidgets import QCheckBox, QFileDialog, QLineEdit, QSizePolicy, QWidget, QPushButton, QListWidget, QLabel, QHBoxLayout, QVBoxLayout, QMessageBox, QProgressBar
 
 class AnimClip:
     def __init__(self):
@@ -11,6 +23,469 @@ class AnimClip:
         self.frameMax = mc.playbackOptions(q=True, max=True)
         self.shouldExport = True
 
+FBX_BINARY_MAGIC = b"Kaydara FBX Binary  \x00"
+FBX_SCALAR_FORMATS = {b"Y": "<h", b"C": "<?", b"I": "<i", b"F": "<f", b"D": "<d", b"L": "<q"}
+FBX_ARRAY_TYPES = b"fdlib"
+
+class FbxRecordReader:
+    # walks binary fbx node records in place, a record is only read as far as its header unless asked for properties
+    def __init__(self, data, version):
+        self.data = data
+        # from 7.5 the record offsets and counts are 64 bit
+        self.headerFormat = "<QQQ" if version >= 7500 else "<III"
+        self.headerSize = struct.calcsize(self.headerFormat)
+
+    def IterRecords(self, offset, end):
+        while offset < end:
+            endOffset, propertyCount, propertyListLen = struct.unpack_from(self.headerFormat, self.data, offset)
+            # an all zero record closes a nested list
+            if endOffset == 0:
+                return
+
+            nameStart = offset + self.headerSize + 1
+            nameEnd = nameStart + self.data[offset + self.headerSize]
+            yield self.data[nameStart:nameEnd], (nameEnd, propertyCount, nameEnd + propertyListLen, endOffset)
+            offset = endOffset
+
+    def IterChildren(self, record):
+        propertiesStart, propertyCount, childrenStart, endOffset = record
+        return self.IterRecords(childrenStart, endOffset)
+
+    def ReadProperties(self, record, count):
+        # arrays are not unpacked or decompressed, their element count is returned instead
+        offset, propertyCount, childrenStart, endOffset = record
+        properties = []
+        for i in range(min(count, propertyCount)):
+            typeCode = self.data[offset:offset + 1]
+            offset += 1
+            if typeCode in FBX_SCALAR_FORMATS:
+                scalarFormat = FBX_SCALAR_FORMATS[typeCode]
+                properties.append(struct.unpack_from(scalarFormat, self.data, offset)[0])
+                offset += struct.calcsize(scalarFormat)
+            elif typeCode in (b"S", b"R"):
+                length = struct.unpack_from("<I", self.data, offset)[0]
+                properties.append(self.data[offset + 4:offset + 4 + length])
+                offset += 4 + length
+            elif typeCode and typeCode in FBX_ARRAY_TYPES:
+                arrayLength, encoding, compressedLength = struct.unpack_from("<III", self.data, offset)
+                properties.append(arrayLength)
+                offset += 12 + compressedLength
+            else:
+                raise ValueError(f"unknown fbx property type {typeCode!r}")
+
+        return properties
+
+def GetFbxObjectName(nameProperty):
+    # object names are stored as name\x00\x01class
+    return nameProperty.split(b"\x00\x01")[0].decode("utf-8", "replace").split(":")[-1]
+
+def ReadFbxStats(path):
+    stats = {"size": os.path.getsize(path), "version": 0, "models": 0, "bones": [], "meshes": 0, "geometries": 0, "animStacks": 0, "animCurves": 0, "animKeys": 0}
+    with open(path, "rb") as fbxFile:
+        if stats["size"] < 27 or fbxFile.read(21) != FBX_BINARY_MAGIC:
+            raise ValueError(f"{path} is not a binary fbx")
+
+        with mmap.mmap(fbxFile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            stats["version"] = struct.unpack_from("<I", data, 23)[0]
+            reader = FbxRecordReader(data, stats["version"])
+            for name, record in reader.IterRecords(27, len(data)):
+                if name == b"Objects":
+                    ReadFbxObjects(reader, record, stats)
+
+    return stats
+
+def ReadFbxObjects(reader, objectsRecord, stats):
+    for name, record in reader.IterChildren(objectsRecord):
+        if name == b"Model":
+            modelId, modelName, modelClass = reader.ReadProperties(record, 3)
+            stats["models"] += 1
+            if modelClass == b"LimbNode":
+                stats["bones"].append(GetFbxObjectName(modelName))
+            elif modelClass == b"Mesh":
+                stats["meshes"] += 1
+        elif name == b"Geometry":
+            if reader.ReadProperties(record, 3)[2] == b"Mesh":
+                stats["geometries"] += 1
+        elif name == b"AnimationStack":
+            stats["animStacks"] += 1
+        elif name == b"AnimationCurve":
+            stats["animCurves"] += 1
+            for childName, child in reader.IterChildren(record):
+                if childName == b"KeyTime":
+                    stats["animKeys"] += reader.ReadProperties(child, 1)[0]
+
+def CompareFbxStats(stats, expected):
+    problems = []
+    bones = set(stats["bones"])
+    missingBones = [jnt for jnt in expected["bones"] if jnt not in bones]
+    if missingBones:
+        problems.append(f"{len(missingBones)} joints missing: {', '.join(missingBones[:10])}")
+
+    if stats["meshes"] < expected["meshes"]:
+        problems.append(f"expected {expected['meshes']} meshes, found {stats['meshes']}")
+
+    if expected["animated"]:
+        if not stats["animStacks"]:
+            problems.append("no animation stack")
+        elif not stats["animKeys"]:
+            problems.append("animation stack has no keys")
+
+    return problems
+
+class AnimClipExportScheduler:
+    # runs export jobs in up to maxWorkers processes, workerCommand gets the job file path appended
+    def __init__(self, workerCommand, maxWorkers = 2):
+        self.workerCommand = list(workerCommand)
+        self.maxWorkers = max(int(maxWorkers), 1)
+        self.pendingJobs = []
+        self.runningJobs = []
+        self.results = []
+        self.startTime = 0
+
+    def AddJob(self, job, jobPath):
+        job["result"] = os.path.splitext(jobPath)[0] + "_result.json"
+        job["log"] = os.path.splitext(jobPath)[0] + ".log"
+        if os.path.exists(job["result"]):
+            os.remove(job["result"])
+
+        with open(jobPath, "w") as jobFile:
+            json.dump(job, jobFile, indent=4)
+
+        self.pendingJobs.append((jobPath, job))
+
+    def Start(self):
+        self.startTime = time.perf_counter()
+        self.Poll()
+
+    def Poll(self):
+        for runningJob in list(self.runningJobs):
+            process, job, logFile, startTime = runningJob
+            if process.poll() is None:
+                continue
+
+            logFile.close()
+            self.runningJobs.remove(runningJob)
+            self.results.extend(self.CollectResults(job, process.returncode, time.perf_counter() - startTime))
+
+        while self.pendingJobs and len(self.runningJobs) < self.maxWorkers:
+            jobPath, job = self.pendingJobs.pop(0)
+            logFile = open(job["log"], "w")
+            process = subprocess.Popen(self.workerCommand + [jobPath], stdout=logFile, stderr=subprocess.STDOUT)
+            self.runningJobs.append((process, job, logFile, time.perf_counter()))
+
+        return self.IsFinished()
+
+    def CollectResults(self, job, returnCode, seconds):
+        try:
+            with open(job["result"]) as resultFile:
+                return json.load(resultFile)["clips"]
+        except (OSError, ValueError, KeyError):
+            error = f"worker exited with code {returnCode} after {seconds:.1f}s, see {job['log']}"
+            return [{"output": clip["output"], "seconds": 0.0, "error": error} for clip in job["clips"]]
+
+    def IsFinished(self):
+        return not self.pendingJobs and not self.runningJobs
+
+    def Wait(self, pollInterval = 0.1):
+        while not self.Poll():
+            time.sleep(pollInterval)
+
+        return self.results
+
+    def Cancel(self):
+        # running workers are killed, their clips and the ones not started yet are reported as cancelled
+        for process, job, logFile, startTime in self.runningJobs:
+            process.kill()
+            process.wait()
+            logFile.close()
+            self.results.extend({"output": clip["output"], "seconds": 0.0, "error": "cancelled"} for clip in job["clips"])
+
+        for jobPath, job in self.pendingJobs:
+            self.results.extend({"output": clip["output"], "seconds": 0.0, "error": "cancelled"} for clip in job["clips"])
+
+        self.runningJobs = []
+        self.pendingJobs = []
+
+    def GetFailedResults(self):
+        return [result for result in self.results if result["error"]]
+
+    def GetElapsedSeconds(self):
+        return time.perf_counter() - self.startTime
+
+class JointHierarchy:
+    # the joints under one root as parent-index arrays, rebuilt only after the root or the dag under it changes
+    # dag nodes maya puts under joints for ik, like the effector ikHandle creates, are part of a normal rig
+    RIG_INTERNAL_TYPES = ("ikEffector", "hikIKEffector")
+    def __init__(self):
+        self.rootJnt = ""
+        self.rootPath = ""
+        self.jntPaths = []
+        self.jntNames = []
+        self.parentIndices = []
+        self.nonJntChildren = []
+        self.isValid = False
+        self.sceneJobs = []
+        self.dagCallback = None
+
+    def WatchScene(self):
+        if self.sceneJobs:
+            return
+
+        for event in ["SceneOpened", "NewSceneOpened", "NameChanged", "Undo", "Redo"]:
+            self.sceneJobs.append(mc.scriptJob(e=[event, self.Invalidate]))
+
+        self.dagCallback = om.MDagMessage.addAllDagChangesCallback(self.DagChanged)
+
+    def StopWatchingScene(self):
+        for job in self.sceneJobs:
+            if mc.scriptJob(exists=job):
+                mc.scriptJob(kill=job, force=True)
+        self.sceneJobs = []
+
+        if self.dagCallback is not None:
+            om.MMessage.removeCallback(self.dagCallback)
+            self.dagCallback = None
+
+    def DagChanged(self, msgType, child, parent, clientData):
+        if not self.isValid:
+            return
+
+        if self.IsUnderRoot(child.fullPathName()) or self.IsUnderRoot(parent.fullPathName()):
+            self.Invalidate()
+
+    def IsUnderRoot(self, path):
+        return path == self.rootPath or path.startswith(self.rootPath + "|")
+
+    def Invalidate(self):
+        self.isValid = False
+
+    def SetRootJnt(self, rootJnt):
+        if rootJnt != self.rootJnt:
+            self.rootJnt = rootJnt
+            self.Invalidate()
+
+    def Build(self):
+        if self.isValid:
+            return
+
+        self.jntPaths = []
+        self.jntNames = []
+        self.parentIndices = []
+        self.nonJntChildren = []
+        if not self.rootJnt or not mc.objExists(self.rootJnt):
+            self.rootPath = ""
+            self.jntNames = [self.rootJnt] if self.rootJnt else []
+            return
+
+        # showType gives name, type pairs for the whole hierarchy in one call
+        self.rootPath = mc.ls(self.rootJnt, l=True)[0]
+        descendants = mc.listRelatives(self.rootJnt, ad=True, f=True) or []
+        namesAndTypes = mc.ls(descendants, showType=True, l=True) if descendants else []
+        jntPaths = [self.rootPath]
+        otherPaths = []
+        for i in range(0, len(namesAndTypes), 2):
+            if namesAndTypes[i + 1] == "joint":
+                jntPaths.append(namesAndTypes[i])
+            elif not namesAndTypes[i + 1].endswith("Constraint") and namesAndTypes[i + 1] not in self.RIG_INTERNAL_TYPES:
+                otherPaths.append(namesAndTypes[i])
+
+        # a path sorts before the paths under it, so every parent comes before its children
+        jntPaths.sort()
+        jntIndices = {path: i for i, path in enumerate(jntPaths)}
+        self.jntPaths = jntPaths
+        self.parentIndices = [self.GetParentIndex(path, jntIndices) for path in jntPaths]
+        self.nonJntChildren = [path for path in otherPaths if path.rsplit("|", 1)[0] in jntIndices]
+
+        shortNames = [path.rsplit("|", 1)[-1] for path in jntPaths]
+        nameCounts = Counter(shortNames)
+        self.jntNames = [shortName if nameCounts[shortName] == 1 else path for shortName, path in zip(shortNames, jntPaths)]
+        self.isValid = True
+
+    def GetParentIndex(self, path, jntIndices):
+        # joints under a group under a joint get the nearest joint above as their parent
+        parentPath = path.rsplit("|", 1)[0]
+        while parentPath:
+            if parentPath in jntIndices:
+                return jntIndices[parentPath]
+            parentPath = parentPath.rsplit("|", 1)[0]
+
+        return -1
+
+    def GetJointNames(self):
+        self.Build()
+        return list(self.jntNames)
+
+    def GetParentIndices(self):
+        self.Build()
+        return list(self.parentIndices)
+
+    def GetProblems(self):
+        self.Build()
+        problems = []
+        if not self.jntPaths:
+            return [f"Root joint {self.rootJnt} does not exist"] if self.rootJnt else ["No Root Joint Assigned"]
+
+        nameCounts = Counter(path.rsplit("|", 1)[-1] for path in self.jntPaths)
+        for name, count in nameCounts.items():
+            if count > 1:
+                problems.append(f"{count} joints are named {name}")
+
+        for path in self.nonJntChildren:
+            problems.append(f"{path} is not a joint")
+
+        # q means we are querying, t means transform, ws means world space
+        rootPos = mc.xform(self.rootPath, q=True, t=True, ws=True)
+        if any(abs(value) > 1e-5 for value in rootPos):
+            problems.append(f"Root joint {self.rootJnt} is not at the origin")
+
+        return problems
+
+class ExportJob(QObject):
+    # runs MayaToUE's export steps from a timer, one file per tick, so the ui keeps running between files.
+    # maya commands have to run on the main thread, the post processing of written files runs on a worker thread
+    fileFinished = Signal(str, str, float)
+    progressChanged = Signal(int, int)
+    finished = Signal(bool)
+    def __init__(self, mayaToUE):
+        super().__init__()
+        self.mayaToUE = mayaToUE
+        self.manifest = {}
+        self.steps = []
+        self.stepIndex = 0
+        self.stepsFinished = False
+        self.fileCount = 0
+        self.finishedFileCount = 0
+        self.cancelRequested = False
+        self.isRunning = False
+        self.scheduler = None
+        self.reportedResultCount = 0
+        self.postProcessor = None
+        self.postProcessFutures = []
+        self.timer = QTimer()
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.Step)
+
+    def Start(self):
+        self.manifest, self.steps = self.mayaToUE.PlanExport()
+        self.fileCount = len(self.manifest["lastRun"]["hits"]) + len(self.manifest["lastRun"]["misses"])
+        self.postProcessor = ThreadPoolExecutor(max_workers=1)
+        self.isRunning = True
+        for outputPath in self.manifest["lastRun"]["hits"]:
+            self.ReportFile(outputPath, "cached", 0.0)
+
+        self.timer.start()
+
+    def Cancel(self):
+        self.cancelRequested = True
+
+    def Step(self):
+        self.CollectPostProcessResults()
+        if self.cancelRequested:
+            if self.scheduler:
+                self.scheduler.Cancel()
+                self.CollectWorkerResults()
+            self.Finish()
+            return
+
+        if self.stepIndex < len(self.steps):
+            step = self.steps[self.stepIndex]
+            self.stepIndex += 1
+            self.RunStep(step)
+            return
+
+        # only waiting from here on, so the timer slows down instead of spinning until the workers are done
+        self.FinishSteps()
+        self.timer.setInterval(100)
+        if self.scheduler:
+            self.scheduler.Poll()
+            self.CollectWorkerResults()
+            if not self.scheduler.IsFinished():
+                return
+
+        if self.postProcessFutures:
+            return
+
+        self.Finish()
+
+    def RunStep(self, step):
+        startTime = time.perf_counter()
+        try:
+            self.mayaToUE.RunExportStep(self.manifest, step)
+        except Exception as e:
+            for outputPath, inputHash in step["outputs"]:
+                self.ReportFile(outputPath, f"failed: {e}", time.perf_counter() - startTime)
+            if not step["outputs"]:
+                print(f"export step failed: {e}")
+            return
+
+        # a step that writes several files, the baked clips, shares its time between them
+        seconds = (time.perf_counter() - startTime) / max(len(step["outputs"]), 1)
+        for outputPath, inputHash in step["outputs"]:
+            future = self.postProcessor.submit(self.mayaToUE.PostProcessExport, outputPath)
+            self.postProcessFutures.append((outputPath, seconds, future))
+
+        if self.mayaToUE.clipExportScheduler:
+            self.scheduler = self.mayaToUE.clipExportScheduler
+
+    def CollectPostProcessResults(self):
+        for outputPath, seconds, future in list(self.postProcessFutures):
+            if not future.done():
+                continue
+
+            self.postProcessFutures.remove((outputPath, seconds, future))
+            try:
+                postProcessResult = future.result()
+            except Exception as e:
+                self.ReportFile(outputPath, f"post process failed: {e}", seconds)
+                continue
+
+            self.mayaToUE.exportReport[outputPath] = postProcessResult
+            self.ReportFile(outputPath, self.GetFileStatus(postProcessResult), seconds)
+
+    def CollectWorkerResults(self):
+        # the scheduler itself is polled by MayaToUE's idle job, this only reports what it collected
+        for result in self.scheduler.results[self.reportedResultCount:]:
+            if result["error"]:
+                self.ReportFile(result["output"], f"failed: {result['error']}", result["seconds"])
+                continue
+
+            future = self.mayaToUE.PostProcessWorkerClip(result["output"])
+            self.postProcessFutures.append((result["output"], result["seconds"], future))
+        self.reportedResultCount = len(self.scheduler.results)
+
+    def GetFileStatus(self, postProcessResult):
+        status = f"{postProcessResult['size'] / 1024:.0f} KB, {postProcessResult.get('bones', 0)} bones, {postProcessResult.get('animKeys', 0)} keys"
+        if postProcessResult["problems"]:
+            status += f", problems: {'; '.join(postProcessResult['problems'])}"
+
+        return status
+
+    def ReportFile(self, outputPath, status, seconds):
+        self.finishedFileCount += 1
+        self.fileFinished.emit(outputPath, status, seconds)
+        self.progressChanged.emit(self.finishedFileCount, self.fileCount)
+
+    def FinishSteps(self):
+        # saved before the workers finish, MayaToUE adds the clips they wrote to the manifest afterwards
+        if self.stepsFinished:
+            return
+
+        self.stepsFinished = True
+        self.mayaToUE.SaveExportManifest(self.manifest)
+
+    def Finish(self):
+        self.timer.stop()
+        try:
+            self.FinishSteps()
+        finally:
+            self.postProcessor.shutdown(wait=True)
+            # the worker clips are parsed on MayaToUE's executor, not the one shut down above
+            wait([future for outputPath, seconds, future in self.postProcessFutures])
+            self.CollectPostProcessResults()
+            self.mayaToUE.SaveExportReport()
+            self.isRunning = False
+            self.finished.emit(self.cancelRequested)
+
 class MayaToUE:
     def __init__(self):
         self.rootJnt = ""
@@ -18,31 +493,427 @@ class MayaToUE:
         self.animations = []
         self.fileName = ""
         self.saveDir = ""
+        self.clipExportWorkers = 0
+        self.clipExportScheduler = None
+        self.clipExportPollJob = None
+        self.pendingInputHashes = {}
+        self.clipPostProcessor = None
+        self.clipPostProcessFutures = {}
+        self.forceExport = False
+        self.bakeSkeletonBeforeExport = False
+        self.exportExpectations = {}
+        self.exportReport = {}
+        self.jointHierarchy = JointHierarchy()
+        self.jointHierarchy.WatchScene()
 
     def GetAllJoints(self):
-        #ad means all decendence, c mean children
-        jnts = []
-        jnts.append(self.rootJnt) 
-        children = mc.listRelatives(self.rootJnt, c=True, ad=True, type="joint")
-        if children:
-            jnts.extend(children)
-        
-        return jnts
+        # the hierarchy is cached, it is only walked again after the root or the dag under it changed
+        self.jointHierarchy.SetRootJnt(self.rootJnt)
+        return self.jointHierarchy.GetJointNames()
+
+    def ValidateSkeleton(self):
+        self.jointHierarchy.SetRootJnt(self.rootJnt)
+        problems = self.jointHierarchy.GetProblems()
+        if problems:
+            return False, "\n".join(problems)
+
+        return True, ""
 
     def SaveFiles(self):
+        manifest, steps = self.PlanExport()
+        try:
+            for step in steps:
+                self.RunExportStep(manifest, step)
+                for outputPath, inputHash in step["outputs"]:
+                    self.exportReport[outputPath] = self.PostProcessExport(outputPath)
+        finally:
+            self.SaveExportManifest(manifest)
+            self.SaveExportReport()
+
+        print(f"export cache: {len(manifest['lastRun']['hits'])} hits, {len(manifest['lastRun']['misses'])} misses")
+
+    def PlanExport(self):
+        # returns the manifest and the export steps still to run, each step lists the (output, inputHash) it writes
         allJnt = self.GetAllJoints()
-        allMeshes = self.models
+        allObjToExport = allJnt + list(self.models)
+
+        # outputs whose inputs hash the same as in the manifest, and that are still on disk, are skipped
+        manifest = self.LoadExportManifest()
+        manifest["lastRun"] = {"hits": [], "misses": []}
+        animationHash = self.GetAnimationHash()
+        sceneData = self.GetSceneData(allJnt)
+        steps = []
+        self.exportReport = {}
+        self.exportExpectations = {self.GetSkeletalMeshSavePath(): self.GetExpectedContents(allJnt)}
+        for animClip in self.GetEnabledAnimClips():
+            self.exportExpectations[self.GetSavePathForAnimClip(animClip)] = self.GetExpectedContents(allJnt, animClip)
 
-        allObjToExport = allJnt + list(allMeshes)
-        mc.select(allObjToExport, r=True)
         skeletalMeshExportPath = self.GetSkeletalMeshSavePath()
+        skeletalMeshInputHash = self.GetInputHash(allJnt, sceneData)
+        if self.IsExportUpToDate(manifest, skeletalMeshExportPath, skeletalMeshInputHash):
+            manifest["lastRun"]["hits"].append(skeletalMeshExportPath)
+        else:
+            manifest["lastRun"]["misses"].append(skeletalMeshExportPath)
+            steps.append({"outputs": [(skeletalMeshExportPath, skeletalMeshInputHash)], "run": partial(self.ExportSkeletalMesh, allObjToExport)})
 
-        mc.FBXResetExport()
-        mc.FBXExportSmoothingGroups('-v', True)
-        mc.FBXExportInputConnections('-v', False)
+        staleAnimClips = []
+        staleInputHashes = {}
+        for animClip in self.GetEnabledAnimClips():
+            animClipExportPath = self.GetSavePathForAnimClip(animClip)
+            inputHash = self.GetInputHash(allJnt, sceneData, animClip, animationHash)
+            if self.IsExportUpToDate(manifest, animClipExportPath, inputHash):
+                manifest["lastRun"]["hits"].append(animClipExportPath)
+            else:
+                manifest["lastRun"]["misses"].append(animClipExportPath)
+                staleAnimClips.append(animClip)
+                staleInputHashes[animClipExportPath] = inputHash
+
+        if not staleAnimClips:
+            return manifest, steps
+
+        # 0 workers exports the clips in this session, otherwise they go to background mayapy processes
+        if self.clipExportWorkers > 0:
+            self.pendingInputHashes = staleInputHashes
+            steps.append({"outputs": [], "run": partial(self.StartAnimClipExportInWorkers, staleAnimClips)})
+            return manifest, steps
+
+        if self.bakeSkeletonBeforeExport and mc.undoInfo(q=True, state=True):
+            # one step for all the baked clips, the bake's undo chunk must not stay open while the ui runs between steps
+            def ExportBakedAnimClips():
+                for animClip in staleAnimClips:
+                    self.ExportAnimClip(animClip, allJnt)
+
+            steps.append({"outputs": list(staleInputHashes.items()), "run": partial(self.ExportFromBakedSkeleton, allJnt, staleAnimClips, ExportBakedAnimClips)})
+            return manifest, steps
+
+        for animClip in staleAnimClips:
+            animClipExportPath = self.GetSavePathForAnimClip(animClip)
+            steps.append({"outputs": [(animClipExportPath, staleInputHashes[animClipExportPath])], "run": partial(self.ExportAnimClip, animClip, allObjToExport)})
+
+        return manifest, steps
+
+    def RunExportStep(self, manifest, step):
+        startTime = time.perf_counter()
+        step["run"]()
+        for outputPath, inputHash in step["outputs"]:
+            self.RecordExport(manifest, outputPath, inputHash)
+
+        return time.perf_counter() - startTime
+
+    def PostProcessExport(self, outputPath):
+        # runs on a worker thread, so only file access here, no maya commands
+        result = {"output": outputPath, "size": 0, "problems": []}
+        try:
+            result["size"] = os.path.getsize(outputPath)
+            stats = ReadFbxStats(outputPath)
+        except FileNotFoundError:
+            result["problems"].append("file not written")
+            return result
+        except (OSError, ValueError, struct.error) as e:
+            result["problems"].append(str(e))
+            return result
+
+        expected = self.exportExpectations.get(outputPath)
+        if expected:
+            result["problems"] = CompareFbxStats(stats, expected)
+
+        stats["bones"] = len(stats["bones"])
+        result.update(stats)
+        return result
+
+    def PostProcessWorkerClip(self, outputPath):
+        # a clip a worker wrote is parsed once off the main thread, the export job and the manifest share the future
+        future = self.clipPostProcessFutures.get(outputPath)
+        if future is None:
+            if self.clipPostProcessor is None:
+                self.clipPostProcessor = ThreadPoolExecutor(max_workers=1)
+            future = self.clipPostProcessor.submit(self.PostProcessExport, outputPath)
+            self.clipPostProcessFutures[outputPath] = future
+
+        return future
+
+    def GetExpectedContents(self, allJnt, animClip: AnimClip = None):
+        meshCount = 0 if animClip and self.bakeSkeletonBeforeExport else len(self.models)
+        bones = [jnt.rsplit("|", 1)[-1].split(":")[-1] for jnt in allJnt]
+        return {"bones": bones, "meshes": meshCount, "animated": animClip is not None}
+
+    def SaveExportReport(self):
+        # entries of outputs that were not written this time are kept from earlier runs
+        report = {}
+        try:
+            with open(self.GetExportReportPath()) as reportFile:
+                report = json.load(reportFile)
+        except (OSError, ValueError):
+            pass
+
+        report.update(self.exportReport)
+        os.makedirs(self.saveDir, exist_ok=True)
+        with open(self.GetExportReportPath(), "w") as reportFile:
+            json.dump(report, reportFile, indent=4)
+
+        problemCount = sum(len(result["problems"]) for result in self.exportReport.values())
+        if problemCount:
+            print(f"{problemCount} export problems, see {self.GetExportReportPath()}")
+
+    def GetExportReportPath(self):
+        return os.path.join(self.saveDir, self.fileName + "_exportReport.json")
+
+    def ExportSkeletalMesh(self, allObjToExport):
+        mc.select(allObjToExport, r=True)
+        self.ApplyExportSettings(self.GetExportSettings())
 
         # -f means the file name, s means export selected, ea means export animation. 
-        mc.FBXExport('-f', skeletalMeshExportPath, '-s', True, '-ea', False)
+        mc.FBXExport('-f', self.GetSkeletalMeshSavePath(), '-s', True, '-ea', False)
+
+    def GetEnabledAnimClips(self):
+        return [animClip for animClip in self.animations if animClip.shouldExport]
+
+    def GetExportSettings(self, animClip: AnimClip = None):
+        skeletonOnly = animClip is not None and self.bakeSkeletonBeforeExport
+        settings = {"smoothingGroups": True, "inputConnections": False, "bakeComplexAnimation": animClip is not None and not skeletonOnly}
+        if animClip:
+            settings["skeletonOnly"] = skeletonOnly
+        if skeletonOnly:
+            # BakeSkeleton already keyed every frame, so the keys are written as they are over the clip's range, not resampled again
+            settings["take"] = [self.fileName + animClip.subfix, animClip.frameMin, animClip.frameMax]
+        elif animClip:
+            settings["bakeComplexStart"] = animClip.frameMin
+            settings["bakeComplexEnd"] = animClip.frameMax
+            settings["bakeComplexStep"] = 1
+
+        return settings
+
+    def ApplyExportSettings(self, settings):
+        mc.FBXResetExport()
+        mc.FBXExportSmoothingGroups('-v', settings["smoothingGroups"])
+        mc.FBXExportInputConnections('-v', settings["inputConnections"])
+        if settings["bakeComplexAnimation"]:
+            mc.FBXExportBakeComplexAnimation('-v', True)
+            mc.FBXExportBakeComplexStart('-v', settings["bakeComplexStart"])
+            mc.FBXExportBakeComplexEnd('-v', settings["bakeComplexEnd"])
+            mc.FBXExportBakeComplexStep('-v', settings["bakeComplexStep"])
+        elif "take" in settings:
+            mc.FBXExportBakeComplexAnimation('-v', False)
+            mc.FBXExportSplitAnimationIntoTakes('-c')
+            mc.FBXExportSplitAnimationIntoTakes('-v', *settings["take"])
+            mc.FBXExportDeleteOriginalTakeOnSplitAnimation('-v', True)
+
+    def ExportAnimClip(self, animClip: AnimClip, allObjToExport):
+        animClipExportPath = self.GetSavePathForAnimClip(animClip)
+        os.makedirs(os.path.dirname(animClipExportPath), exist_ok=True)
+        mc.select(allObjToExport, r=True)
+
+        self.ApplyExportSettings(self.GetExportSettings(animClip))
+        mc.FBXExport('-f', animClipExportPath, '-s', True, '-ea', True)
+
+    def GetBakeFrameRanges(self, animClips):
+        # overlapping and touching clip ranges are merged, so every frame is baked once and gaps are not baked
+        frameRanges = []
+        for frameMin, frameMax in sorted((animClip.frameMin, animClip.frameMax) for animClip in animClips):
+            if frameRanges and frameMin <= frameRanges[-1][1] + 1:
+                frameRanges[-1][1] = max(frameRanges[-1][1], frameMax)
+            else:
+                frameRanges.append([frameMin, frameMax])
+
+        return frameRanges
+
+    def BakeSkeleton(self, allJnt, animClips):
+        mc.refresh(suspend=True)
+        try:
+            for frameMin, frameMax in self.GetBakeFrameRanges(animClips):
+                mc.bakeResults(allJnt, t=(frameMin, frameMax), simulation=True, sampleBy=1, disableImplicitControl=True, preserveOutsideKeys=True)
+        finally:
+            mc.refresh(suspend=False)
+
+    def ExportFromBakedSkeleton(self, allJnt, animClips, Export):
+        # bakes, runs Export and undoes the bake in one call, so nothing the artist does can end up in the bake's undo chunk
+        startTime = time.perf_counter()
+        mc.undoInfo(openChunk=True)
+        try:
+            self.BakeSkeleton(allJnt, animClips)
+            bakeSeconds = time.perf_counter() - startTime
+            Export()
+        finally:
+            mc.undoInfo(closeChunk=True)
+            mc.undo()
+
+        print(f"baked {len(allJnt)} joints in {bakeSeconds:.2f}s, exported from the baked skeleton in {time.perf_counter() - startTime - bakeSeconds:.2f}s")
+
+    def StartAnimClipExportInWorkers(self, animClips = None, workerCommand = None):
+        if animClips is None:
+            animClips = self.GetEnabledAnimClips()
+
+        if not animClips:
+            return None
+
+        # the workers open a copy of the scene, so the open scene is left untouched
+        jobDir = self.GetExportJobDir()
+        os.makedirs(jobDir, exist_ok=True)
+        scenePath = os.path.join(jobDir, self.fileName + "_export.mb")
+        allObjToExport = self.GetAllJoints() + list(self.models)
+        if self.bakeSkeletonBeforeExport and mc.undoInfo(q=True, state=True):
+            # the scene copy gets the baked skeleton, the workers then only export joints
+            allObjToExport = self.GetAllJoints()
+            self.ExportFromBakedSkeleton(allObjToExport, animClips, partial(mc.file, scenePath, force=True, exportAll=True, type="mayaBinary"))
+        else:
+            mc.file(scenePath, force=True, exportAll=True, type="mayaBinary")
+
+        self.clipPostProcessFutures = {}
+        workerCount = min(self.clipExportWorkers, len(animClips))
+        scheduler = AnimClipExportScheduler(workerCommand or self.GetWorkerCommand(), workerCount)
+        for i in range(workerCount):
+            clips = [{"output": self.GetSavePathForAnimClip(animClip), "settings": self.GetExportSettings(animClip)} for animClip in animClips[i::workerCount]]
+            job = {"scene": scenePath, "nodes": allObjToExport, "clips": clips}
+            scheduler.AddJob(job, os.path.join(jobDir, f"job_{i}.json"))
+
+        scheduler.Start()
+        self.clipExportScheduler = scheduler
+        if self.clipExportPollJob is None:
+            self.clipExportPollJob = mc.scriptJob(ie=self.PollAnimClipExport)
+
+        return scheduler
+
+    def PollAnimClipExport(self):
+        if not self.clipExportScheduler:
+            return
+
+        # clips start parsing as soon as their worker is done, the manifest waits for all of them
+        scheduler = self.clipExportScheduler
+        finished = scheduler.Poll()
+        futures = [self.PostProcessWorkerClip(result["output"]) for result in scheduler.results if not result["error"]]
+        if not finished or not all(future.done() for future in futures):
+            return
+
+        self.clipExportScheduler = None
+        # a scriptJob can not kill itself from its own callback
+        pollJob = self.clipExportPollJob
+        self.clipExportPollJob = None
+        mc.evalDeferred(lambda: mc.scriptJob(kill=pollJob, force=True))
+
+        # only clips a worker actually wrote go into the manifest
+        manifest = self.LoadExportManifest()
+        for result in scheduler.results:
+            inputHash = self.pendingInputHashes.pop(result["output"], None)
+            if not result["error"] and inputHash:
+                self.RecordExport(manifest, result["output"], inputHash)
+            if not result["error"]:
+                try:
+                    self.exportReport[result["output"]] = self.clipPostProcessFutures[result["output"]].result()
+                except Exception as e:
+                    self.exportReport[result["output"]] = {"output": result["output"], "size": 0, "problems": [f"post process failed: {e}"]}
+        self.SaveExportManifest(manifest)
+        self.SaveExportReport()
+
+        print(f"exported {len(scheduler.results)} clips in {scheduler.GetElapsedSeconds():.1f}s")
+        for result in scheduler.GetFailedResults():
+            print(f"    failed {result['output']}: {result['error']}")
+
+    def GetAnimationHash(self):
+        # one query over every anim curve in the scene, so editing keys re-exports the clips
+        animCurves = mc.ls(type="animCurve")
+        if not animCurves:
+            return ""
+
+        keyTimes = mc.keyframe(animCurves, q=True, tc=True) or []
+        keyValues = mc.keyframe(animCurves, q=True, vc=True) or []
+        return hashlib.md5(json.dumps([animCurves, keyTimes, keyValues]).encode()).hexdigest()
+
+    def GetSceneData(self, allJnt):
+        # read once per export plan and shared by every output, the mesh and joint reads are the slow part of the hash
+        meshes = sorted(self.models)
+        jntMatrices = [mc.xform(jnt, q=True, ws=True, m=True) for jnt in allJnt]
+        return {
+            "meshes": meshes,
+            "meshCounts": [[mc.polyEvaluate(mesh, v=True), mc.polyEvaluate(mesh, f=True)] for mesh in meshes],
+            "meshData": [self.GetMeshDataHash(mesh) for mesh in meshes],
+            "jointMatrices": hashlib.md5(np.array(jntMatrices, dtype=np.float64).tobytes()).hexdigest()
+        }
+
+    def GetInputHash(self, allJnt, sceneData, animClip: AnimClip = None, animationHash = ""):
+        inputs = {
+            "joints": allJnt,
+            "meshes": sceneData["meshes"],
+            "meshCounts": sceneData["meshCounts"],
+            "meshData": sceneData["meshData"],
+            "settings": self.GetExportSettings(animClip)
+        }
+        if animClip:
+            inputs["subfix"] = animClip.subfix
+            inputs["animation"] = animationHash
+        else:
+            # the skeletal mesh is written in the current pose, so a moved joint re-exports it
+            inputs["jointMatrices"] = sceneData["jointMatrices"]
+
+        return hashlib.md5(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+    def GetMeshDataHash(self, mesh):
+        # one bulk read of the points and one of the skin weights, so moved verts or repainted weights re-export
+        selection = om.MSelectionList()
+        selection.add(mesh)
+        meshPath = selection.getDagPath(0)
+        meshFn = om.MFnMesh(meshPath)
+        meshHash = hashlib.md5(np.array([[point.x, point.y, point.z] for point in meshFn.getPoints()], dtype=np.float64).tobytes())
+
+        for skin in sorted(mc.ls(mc.listHistory(mesh), type="skinCluster") or []):
+            skinSelection = om.MSelectionList()
+            skinSelection.add(skin)
+            skinFn = oma.MFnSkinCluster(skinSelection.getDependNode(0))
+            vertCompFn = om.MFnSingleIndexedComponent()
+            vertComp = vertCompFn.create(om.MFn.kMeshVertComponent)
+            vertCompFn.setCompleteData(meshFn.numVertices)
+            weights = skinFn.getWeights(meshPath, vertComp)[0]
+            meshHash.update(json.dumps([jnt.partialPathName() for jnt in skinFn.influenceObjects()]).encode())
+            meshHash.update(np.fromiter(weights, dtype=np.float64, count=len(weights)).tobytes())
+
+        return meshHash.hexdigest()
+
+    def IsExportUpToDate(self, manifest, outputPath, inputHash):
+        if self.forceExport:
+            return False
+
+        entry = manifest["outputs"].get(outputPath)
+        return entry is not None and entry["inputHash"] == inputHash and os.path.exists(outputPath)
+
+    def RecordExport(self, manifest, outputPath, inputHash):
+        manifest["outputs"][outputPath] = {"inputHash": inputHash, "exportTime": time.time()}
+
+    def LoadExportManifest(self):
+        try:
+            with open(self.GetExportManifestPath()) as manifestFile:
+                manifest = json.load(manifestFile)
+        except (OSError, ValueError):
+            manifest = {}
+
+        manifest.setdefault("outputs", {})
+        manifest.setdefault("lastRun", {"hits": [], "misses": []})
+        return manifest
+
+    def SaveExportManifest(self, manifest):
+        os.makedirs(self.saveDir, exist_ok=True)
+        with open(self.GetExportManifestPath(), "w") as manifestFile:
+            json.dump(manifest, manifestFile, indent=4)
+
+    def GetExportManifestPath(self):
+        return os.path.join(self.saveDir, self.fileName + "_exportManifest.json")
+
+    def SetForceExport(self, forceExport):
+        self.forceExport = forceExport
+
+    def SetBakeSkeletonBeforeExport(self, bakeSkeletonBeforeExport):
+        self.bakeSkeletonBeforeExport = bakeSkeletonBeforeExport
+
+    def GetWorkerCommand(self):
+        mayapy = os.path.join(os.environ.get("MAYA_LOCATION", ""), "bin", "mayapy")
+        return [mayapy, self.GetWorkerScriptPath()]
+
+    def GetWorkerScriptPath(self):
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), "AnimClipExportWorker.py")
+
+    def GetExportJobDir(self):
+        return os.path.join(self.saveDir, "_exportJobs")
+
+    def SetClipExportWorkers(self, workerCount):
+        self.clipExportWorkers = max(int(workerCount), 0)
 
 
     def GetSavePathForAnimClip(self, animClip: AnimClip):
@@ -203,6 +1074,10 @@ class MayaToUEWidget(QWidget):
         addRootJntBtn.clicked.connect(self.AddRootJntBtnClicked)
         self.masterLayout.addWidget(addRootJntBtn)
 
+        validateSkeletonBtn = QPushButton("Validate Skeleton")
+        validateSkeletonBtn.clicked.connect(self.ValidateSkeletonBtnClicked)
+        self.masterLayout.addWidget(validateSkeletonBtn)
+
         self.meshList = QListWidget()
         self.masterLayout.addWidget(self.meshList)
         self.meshList.setFixedHeight(80)
@@ -244,9 +1119,83 @@ class MayaToUEWidget(QWidget):
         self.savePreviewLabel = QLabel("")
         self.masterLayout.addWidget(self.savePreviewLabel)
 
-        saveFilesBtn = QPushButton("Save")
-        saveFilesBtn.clicked.connect(self.mayaToUE.SaveFiles)
-        self.masterLayout.addWidget(saveFilesBtn)
+        workerLayout = QHBoxLayout()
+        self.masterLayout.addLayout(workerLayout)
+        workerLayout.addWidget(QLabel("Export Workers (0 = this session): "))
+        workerLineEdit = QLineEdit()
+        workerLineEdit.setValidator(QIntValidator(0, 64))
+        workerLineEdit.setText(str(self.mayaToUE.clipExportWorkers))
+        workerLineEdit.textChanged.connect(self.WorkerCountChanged)
+        workerLayout.addWidget(workerLineEdit)
+
+        forceExportCheckbox = QCheckBox("Force Re-export")
+        forceExportCheckbox.setChecked(self.mayaToUE.forceExport)
+        forceExportCheckbox.toggled.connect(self.mayaToUE.SetForceExport)
+        workerLayout.addWidget(forceExportCheckbox)
+
+        bakeSkeletonCheckbox = QCheckBox("Bake Skeleton Only")
+        bakeSkeletonCheckbox.setChecked(self.mayaToUE.bakeSkeletonBeforeExport)
+        bakeSkeletonCheckbox.toggled.connect(self.mayaToUE.SetBakeSkeletonBeforeExport)
+        workerLayout.addWidget(bakeSkeletonCheckbox)
+
+        self.exportProgressBar = QProgressBar()
+        self.exportProgressBar.setValue(0)
+        self.masterLayout.addWidget(self.exportProgressBar)
+
+        saveBtnLayout = QHBoxLayout()
+        self.masterLayout.addLayout(saveBtnLayout)
+        self.saveFilesBtn = QPushButton("Save")
+        self.saveFilesBtn.clicked.connect(self.SaveFilesBtnClicked)
+        saveBtnLayout.addWidget(self.saveFilesBtn)
+
+        self.cancelExportBtn = QPushButton("Cancel")
+        self.cancelExportBtn.setEnabled(False)
+        self.cancelExportBtn.clicked.connect(self.CancelExportBtnClicked)
+        saveBtnLayout.addWidget(self.cancelExportBtn)
+
+        self.exportJob = None
+        self.outputStatus = {}
+
+    def SaveFilesBtnClicked(self):
+        if self.exportJob and self.exportJob.isRunning:
+            return
+
+        self.outputStatus = {}
+        self.exportProgressBar.setValue(0)
+        self.exportJob = ExportJob(self.mayaToUE)
+        self.exportJob.fileFinished.connect(self.ExportFileFinished)
+        self.exportJob.progressChanged.connect(self.ExportProgressChanged)
+        self.exportJob.finished.connect(self.ExportFinished)
+        self.saveFilesBtn.setEnabled(False)
+        self.cancelExportBtn.setEnabled(True)
+        try:
+            self.exportJob.Start()
+        except Exception as e:
+            # the job never started, so finished will not come to turn save back on
+            self.saveFilesBtn.setEnabled(True)
+            self.cancelExportBtn.setEnabled(False)
+            QMessageBox.warning(self, "Warning", f"Export failed to start: {e}")
+
+    def CancelExportBtnClicked(self):
+        if self.exportJob:
+            self.exportJob.Cancel()
+
+    def ExportFileFinished(self, outputPath, status, seconds):
+        self.outputStatus[os.path.normpath(outputPath)] = f"{status}, {seconds:.2f}s"
+        self.UpdateSavePrieviewLabel()
+
+    def ExportProgressChanged(self, finishedFileCount, fileCount):
+        self.exportProgressBar.setMaximum(max(fileCount, 1))
+        self.exportProgressBar.setValue(finishedFileCount)
+
+    def ExportFinished(self, cancelled):
+        self.saveFilesBtn.setEnabled(True)
+        self.cancelExportBtn.setEnabled(False)
+        if cancelled:
+            QMessageBox.warning(self, "Warning", "Export Cancelled")
+
+    def WorkerCountChanged(self, newVal):
+        self.mayaToUE.SetClipExportWorkers(int(newVal) if newVal else 0)
 
     def PickFileDir(self):
         path = QFileDialog().getExistingDirectory()
@@ -255,14 +1204,18 @@ class MayaToUEWidget(QWidget):
         self.UpdateSavePrieviewLabel()
 
     def UpdateSavePrieviewLabel(self):
-        preivewText = self.mayaToUE.GetSkeletalMeshSavePath()
+        preivewText = self.GetPreviewLine(self.mayaToUE.GetSkeletalMeshSavePath())
         if self.mayaToUE.animations:
             for anim in self.mayaToUE.animations:
                 animSavePath = self.mayaToUE.GetSavePathForAnimClip(anim)
-                preivewText += "\n" + animSavePath
+                preivewText += "\n" + self.GetPreviewLine(animSavePath)
 
         self.savePreviewLabel.setText(preivewText)
 
+    def GetPreviewLine(self, savePath):
+        status = self.outputStatus.get(savePath)
+        return f"{savePath} ({status})" if status else savePath
+
     def FileNameLineEditChanged(self, newVal):
         self.mayaToUE.SetFileName(newVal)
         self.UpdateSavePrieviewLabel()
@@ -293,6 +1246,13 @@ class MayaToUEWidget(QWidget):
         else:
             self.rootJntText.setText(self.mayaToUE.rootJnt)
 
+    def ValidateSkeletonBtnClicked(self):
+        success, msg = self.mayaToUE.ValidateSkeleton()
+        if not success:
+            QMessageBox.warning(self, "Warning", msg)
+        else:
+            QMessageBox.information(self, "Skeleton", "No problems found")
+
     def SetSelectionAsRootJntBtnClicked(self):
         success, msg = self.mayaToUE.GetSelectionAsRootJnt()
         if not success:
@@ -300,5 +1260,6 @@ class MayaToUEWidget(QWidget):
         else:
             self.rootJntText.setText(self.mayaToUE.rootJnt)
 
-mayaToUEWidget = MayaToUEWidget()
-mayaToUEWidget.show()
\ No newline at end of file
+if __name__ == "__main__":
+    mayaToUEWidget = MayaToUEWidget()
+    mayaToUEWidget.show()
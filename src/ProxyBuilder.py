@@ -1,5 +1,11 @@
+import time
+import json
+import hashlib
 import maya.cmds as mc
-from PySide2.QtWidgets import QWidget, QVBoxLayout, QPushButton
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+import numpy as np
+from PySide2.QtWidgets import QWidget, QVBoxLayout, QPushButton, QCheckBox
 
 def IsMesh(obj):
     shapes = mc.listRelatives(obj, s=True)
@@ -23,46 +29,176 @@ def GetUpperStream(obj):
 def GetLowerStream(obj):
     return mc.listConnections(obj, s=False, d=True, sh=True)
 
-def GetAllConnectionIn(obj, NextFunc, Filter = None):
-    AllFound = set()
-    nexts = NextFunc(obj)
-    while nexts:
-        for next in nexts:
-            AllFound.add(next)
-
-        nexts = NextFunc(nexts)
-        if nexts:
-            nexts = [x for x in nexts if x not in AllFound]        
-
-    if not Filter:
-        return list(AllFound)
-    
-    filted = []
-    for found in AllFound:
-        if Filter(found):
-            filted.append(found)
-
-    return filted
-
-def GetJntWithMostInfluence(vert, skin):
-    weights = mc.skinPercent(skin, vert, q=True, v=True)
-    jnts = mc.skinPercent(skin, vert, q=True, t=None)
-    
-    maxWeightIndex = 0
-    maxWeight = weights[0]
-
-    for i in range(1, len(weights)):
-        if weights[i] > maxWeight:
-            maxWeight = weights[i]
-            maxWeightIndex = i
-    
-    return jnts[maxWeightIndex]
+class UpstreamGraph:
+    def __init__(self):
+        self.nodeTypes = {}
+        self.upstreamNodes = {}
+        self.sceneJobs = []
+        self.connectionCallback = None
+
+    def WatchScene(self):
+        if self.sceneJobs:
+            return
+
+        for event in ["SceneOpened", "NewSceneOpened", "NameChanged", "Undo", "Redo"]:
+            self.sceneJobs.append(mc.scriptJob(e=[event, self.Invalidate]))
+
+        self.connectionCallback = om.MDGMessage.addConnectionCallback(self.ConnectionChanged)
+
+    def StopWatchingScene(self):
+        for job in self.sceneJobs:
+            if mc.scriptJob(exists=job):
+                mc.scriptJob(kill=job, force=True)
+        self.sceneJobs = []
+
+        if self.connectionCallback is not None:
+            om.MMessage.removeCallback(self.connectionCallback)
+            self.connectionCallback = None
+
+    def ConnectionChanged(self, srcPlug, destPlug, made, clientData):
+        self.Invalidate()
+
+    def Invalidate(self):
+        if self.upstreamNodes:
+            self.upstreamNodes.clear()
+            self.nodeTypes.clear()
+
+    def GetUpstreamNodes(self, obj):
+        if obj in self.upstreamNodes:
+            return self.upstreamNodes[obj]
+
+        # breadth first, one listConnections call per level of the graph
+        found = []
+        visited = {obj}
+        frontier = [obj]
+        while frontier:
+            nexts = GetUpperStream(frontier) or []
+            frontier = []
+            for next in nexts:
+                if next not in visited:
+                    visited.add(next)
+                    frontier.append(next)
+            found.extend(frontier)
+
+        self.CacheNodeTypes(found)
+        self.upstreamNodes[obj] = found
+        return found
+
+    def CacheNodeTypes(self, nodes):
+        unknownNodes = [node for node in nodes if node not in self.nodeTypes]
+        if not unknownNodes:
+            return
+
+        # showType gives name, type pairs for the whole list in one call
+        namesAndTypes = mc.ls(unknownNodes, showType=True)
+        for i in range(0, len(namesAndTypes), 2):
+            self.nodeTypes[namesAndTypes[i]] = namesAndTypes[i + 1]
+
+    def GetUpstreamOfType(self, obj, nodeType):
+        return [node for node in self.GetUpstreamNodes(obj) if self.nodeTypes.get(node) == nodeType]
+
+    def GetUpstreamSkins(self, obj):
+        return self.GetUpstreamOfType(obj, "skinCluster")
+
+    def GetUpstreamJnts(self, obj):
+        return self.GetUpstreamOfType(obj, "joint")
+
+def GetDependNode(obj):
+    selection = om.MSelectionList()
+    selection.add(obj)
+    return selection.getDependNode(0)
+
+def GetDagPath(obj):
+    selection = om.MSelectionList()
+    selection.add(obj)
+    return selection.getDagPath(0)
+
+def GetSkinWeightMatrix(skin, meshShape):
+    # one bulk read of the whole skin, returns the influences and a (vertex x influence) array
+    skinFn = oma.MFnSkinCluster(GetDependNode(skin))
+    meshPath = GetDagPath(meshShape)
+
+    vertCompFn = om.MFnSingleIndexedComponent()
+    vertComp = vertCompFn.create(om.MFn.kMeshVertComponent)
+    vertCompFn.setCompleteData(om.MFnMesh(meshPath).numVertices)
+
+    weights, influenceCount = skinFn.getWeights(meshPath, vertComp)
+    jnts = [jnt.partialPathName() for jnt in skinFn.influenceObjects()]
+    weights = np.fromiter(weights, dtype=np.float64, count=len(weights))
+    return jnts, weights.reshape(-1, influenceCount)
+
+def SetSkinWeightMatrix(skin, meshShape, jnts, weights):
+    # one bulk write of a (vertex x jnts) array, columns follow the order of jnts
+    skinFn = oma.MFnSkinCluster(GetDependNode(skin))
+    meshPath = GetDagPath(meshShape)
+
+    vertCompFn = om.MFnSingleIndexedComponent()
+    vertComp = vertCompFn.create(om.MFn.kMeshVertComponent)
+    vertCompFn.setCompleteData(om.MFnMesh(meshPath).numVertices)
+
+    influenceIds = {jnt.partialPathName(): i for i, jnt in enumerate(skinFn.influenceObjects())}
+    influenceIndices = om.MIntArray([influenceIds[jnt] for jnt in jnts])
+    skinFn.setWeights(meshPath, vertComp, influenceIndices, om.MDoubleArray(weights.ravel().tolist()), False)
+
+def GetVertOwners(weights):
+    # argmax picks the first of equal weights, same as taking the max of a per-vert skinPercent query
+    return np.argmax(weights, axis=1)
+
+def GetJntVertsMap(jnts, weights):
+    owningJnts = GetVertOwners(weights)
+    order = np.argsort(owningJnts, kind="stable")
+    bounds = np.searchsorted(owningJnts[order], np.arange(len(jnts) + 1))
+    return {jnt: order[bounds[i]:bounds[i + 1]] for i, jnt in enumerate(jnts)}
+
+def GetMeshFaceVerts(meshShape):
+    faceVertCounts, faceVerts = om.MFnMesh(GetDagPath(meshShape)).getVertices()
+    faceVertCounts = np.fromiter(faceVertCounts, dtype=np.int64, count=len(faceVertCounts))
+    faceVerts = np.fromiter(faceVerts, dtype=np.int64, count=len(faceVerts))
+    return faceVertCounts, faceVerts
+
+def PartitionFacesByJnt(faceVertCounts, faceVerts, vertOwners, jntCount):
+    # a face goes to every joint owning one of its verts, like polyListComponentConversion(fromVertex, toFace)
+    faceCount = len(faceVertCounts)
+    faceIds = np.repeat(np.arange(faceCount), faceVertCounts)
+    jntFaceKeys = np.unique(vertOwners[faceVerts] * faceCount + faceIds)
+    owners, faces = np.divmod(jntFaceKeys, faceCount)
+    bounds = np.searchsorted(owners, np.arange(jntCount + 1))
+    return [faces[bounds[i]:bounds[i + 1]] for i in range(jntCount)]
+
+def GetIndexRanges(indices):
+    # sorted unique indices to inclusive (start, end) runs
+    if len(indices) == 0:
+        return []
+
+    breaks = np.flatnonzero(np.diff(indices) != 1)
+    starts = np.concatenate(([indices[0]], indices[breaks + 1]))
+    ends = np.concatenate((indices[breaks], [indices[-1]]))
+    return list(zip(starts.tolist(), ends.tolist()))
+
+def GetFaceRangeComponents(obj, faces):
+    components = []
+    for start, end in GetIndexRanges(faces):
+        if start == end:
+            components.append(f"{obj}.f[{start}]")
+        else:
+            components.append(f"{obj}.f[{start}:{end}]")
+
+    return components
 
 class BuildProxy:
     def __init__(self):
         self.skin = ""
         self.model = ""
         self.jnts = []
+        self.influences = []
+        self.weights = None
+        self.faceCount = 0
+        self.faceVertCounts = None
+        self.faceVerts = None
+        self.points = None
+        self.splitMode = False
+        self.graph = UpstreamGraph()
+        self.graph.WatchScene()
 
     def BuildProxyForSelectedmesh(self):
         model = mc.ls(sl=True)[0]
@@ -72,41 +208,36 @@ class BuildProxy:
         self.model = model
         modelShape = mc.listRelatives(self.model, s=True)[0]
 
-        skin = GetAllConnectionIn(modelShape, GetUpperStream, IsSkin)
+        skin = self.graph.GetUpstreamSkins(modelShape)
         if skin:
             self.skin = skin[0]
 
-        jnts = GetAllConnectionIn(modelShape, GetUpperStream, IsJoint)
+        jnts = self.graph.GetUpstreamJnts(modelShape)
         if jnts:
             self.jnts = jnts
 
-        jntVertsMap = self.GenerateJntVertsDict()
+        jntFacesMap = self.GenerateJntFacesDict()
+        if self.splitMode:
+            self.LoadMeshPoints()
+
+        proxyTopGrp = self.GetProxyTopGrpName()
+        if mc.objExists(proxyTopGrp) and mc.attributeQuery(self.GetFingerprintAttr(), n = proxyTopGrp, ex=True):
+            self.RebuildChangedSegments(jntFacesMap)
+            return
         
         segments = []
         ctrls = []
-        for jnt, verts in jntVertsMap.items():
-            newSeg = self.CreateProxyModelForJntAndVerts(jnt, verts)
+        for jnt, faces in jntFacesMap.items():
+            newSeg = self.CreateSegmentForJnt(jnt, faces)
             if newSeg is None:
                 continue
 
-            newSkinCluster = mc.skinCluster(self.jnts, newSeg)[0]
-            print(newSkinCluster)
-            mc.copySkinWeights(ss=self.skin, ds=newSkinCluster, nm=True, sa="closestPoint", ia="closestJoint")
             segments.append(newSeg)
-            ctrlLoc = "ac_" + jnt + "_proxy"
-            mc.spaceLocator(n = ctrlLoc)
-            ctrlLocGrp = ctrlLoc + "_grp"
-            mc.group(ctrlLoc, n = ctrlLocGrp)             
-            mc.matchTransform(ctrlLocGrp, jnt)
+            ctrls.append(self.CreateCtrlForSegment(jnt, newSeg))
 
-            mc.addAttr(ctrlLoc, ln = "vis", min = 0, max = 1, dv = 1, k=True)
-            mc.connectAttr(ctrlLoc + ".vis", newSeg + ".v")
-            ctrls.append(ctrlLocGrp)
-
-        proxyTopGrp = self.model + "_proxy_grp"
         mc.group(segments, n = proxyTopGrp)
 
-        ctrlTopGrp ="ac_" + self.model + "_proxy_grp"
+        ctrlTopGrp = self.GetCtrlTopGrpName()
         mc.group(ctrls, n = ctrlTopGrp)
 
         globalProxyCtrl = "ac_" + self.model + "_proxy_global"
@@ -118,44 +249,195 @@ class BuildProxy:
         mc.addAttr(globalProxyCtrl, ln = "vis", min = 0, max = 1, k=True, dv = 1)
         mc.connectAttr(globalProxyCtrl + ".vis", proxyTopGrp + ".v")
 
+        mc.addAttr(proxyTopGrp, ln = self.GetFingerprintAttr(), dt = "string")
+        self.SaveFingerprints(self.GenerateFingerprints(jntFacesMap))
 
-    def CreateProxyModelForJntAndVerts(self, jnt, verts):
-        if not verts:
-            return None
+    def RebuildChangedSegments(self, jntFacesMap):
+        proxyTopGrp = self.GetProxyTopGrpName()
+        oldFingerprints = json.loads(mc.getAttr(proxyTopGrp + "." + self.GetFingerprintAttr()) or "{}")
+        newFingerprints = self.GenerateFingerprints(jntFacesMap)
+
+        for jnt in set(oldFingerprints) - set(newFingerprints):
+            self.DeleteSegmentForJnt(jnt)
+
+        for jnt, fingerprint in newFingerprints.items():
+            oldFingerprint = oldFingerprints.get(jnt)
+            if fingerprint == oldFingerprint:
+                continue
+
+            seg = self.GetSegmentName(jnt)
+            if oldFingerprint and oldFingerprint["verts"] == fingerprint["verts"] and mc.objExists(seg):
+                # same verts, only the weights moved: rebind in place and keep the segment
+                mc.delete(mc.ls(mc.listHistory(seg), type = "skinCluster"))
+                self.TransferWeightsToSegment(seg, jntFacesMap[jnt])
+                continue
+
+            if mc.objExists(seg):
+                mc.delete(seg)
+
+            newSeg = self.CreateSegmentForJnt(jnt, jntFacesMap[jnt])
+            mc.parent(newSeg, proxyTopGrp)
+
+            ctrlLoc = self.GetCtrlName(jnt)
+            if mc.objExists(ctrlLoc):
+                mc.connectAttr(ctrlLoc + ".vis", newSeg + ".v")
+            else:
+                mc.parent(self.CreateCtrlForSegment(jnt, newSeg), self.GetCtrlTopGrpName())
+
+        self.SaveFingerprints(newFingerprints)
+
+    def GenerateFingerprints(self, jntFacesMap):
+        # per joint hash of the dominant verts it owns and of the weights its segment will copy
+        fingerprints = {}
+        jntVertsMap = GetJntVertsMap(self.influences, self.weights)
+        for jnt, faces in jntFacesMap.items():
+            if len(faces) == 0:
+                continue
+
+            segVerts = self.GetSegmentVerts(faces)[0]
+            fingerprints[jnt] = {
+                "verts": hashlib.md5(jntVertsMap[jnt].astype(np.int64).tobytes()).hexdigest(),
+                "weights": hashlib.md5(self.weights[segVerts].tobytes()).hexdigest()
+            }
+
+        return fingerprints
+
+    def SaveFingerprints(self, fingerprints):
+        mc.setAttr(self.GetProxyTopGrpName() + "." + self.GetFingerprintAttr(), json.dumps(fingerprints), type = "string")
+
+    def CreateSegmentForJnt(self, jnt, faces):
+        if self.splitMode:
+            newSeg = self.ExtractProxyModelForJntAndFaces(jnt, faces)
+        else:
+            newSeg = self.CreateProxyModelForJntAndFaces(jnt, faces)
+
+        if newSeg is not None:
+            self.TransferWeightsToSegment(newSeg, faces)
+
+        return newSeg
+
+    def CreateCtrlForSegment(self, jnt, seg):
+        ctrlLoc = self.GetCtrlName(jnt)
+        mc.spaceLocator(n = ctrlLoc)
+        ctrlLocGrp = ctrlLoc + "_grp"
+        mc.group(ctrlLoc, n = ctrlLocGrp)             
+        mc.matchTransform(ctrlLocGrp, jnt)
+
+        mc.addAttr(ctrlLoc, ln = "vis", min = 0, max = 1, dv = 1, k=True)
+        mc.connectAttr(ctrlLoc + ".vis", seg + ".v")
+        return ctrlLocGrp
 
-        faces = mc.polyListComponentConversion(verts, fromVertex = True, toFace = True)
-        faces = mc.ls(faces, flatten = True)
+    def DeleteSegmentForJnt(self, jnt):
+        for obj in [self.GetSegmentName(jnt), self.GetCtrlName(jnt) + "_grp"]:
+            if mc.objExists(obj):
+                mc.delete(obj)
 
-        Labels = set()
-        for face in faces:
-            Labels.add(face.replace(self.model, ""))
+    def GetSegmentName(self, jnt):
+        return self.model + "_" + jnt + "_proxy"
+
+    def GetCtrlName(self, jnt):
+        return "ac_" + jnt + "_proxy"
+
+    def GetProxyTopGrpName(self):
+        return self.model + "_proxy_grp"
+
+    def GetCtrlTopGrpName(self):
+        return "ac_" + self.model + "_proxy_grp"
+
+    def GetFingerprintAttr(self):
+        return "proxyFingerprints"
+
+    def CreateProxyModelForJntAndFaces(self, jnt, faces):
+        if len(faces) == 0:
+            return None
 
         dup = mc.duplicate(self.model)[0]
 
-        allDupFaces = mc.ls(f"{dup}.f[*]", flatten = True)
-        facesToDel = []
-        for dupFace in allDupFaces:
-            label = dupFace.replace(dup, "")
-            if label not in Labels:
-                facesToDel.append(dupFace)
+        facesToDel = np.setdiff1d(np.arange(self.faceCount), faces, assume_unique=True)
+        if len(facesToDel) > 0:
+            mc.delete(GetFaceRangeComponents(dup, facesToDel))
 
-        mc.delete(facesToDel)
-        dupName = self.model + "_" + jnt + "_proxy"
+        dupName = self.GetSegmentName(jnt)
         mc.rename(dup, dupName)
         return dupName
-    
-    def GenerateJntVertsDict(self):
-        dict = {}
-        for jnt in self.jnts:
-            dict[jnt] = []
 
-        verts = mc.ls(f"{self.model}.vtx[*]", flatten = True)
-        for vert in verts:
-            owningJnt = GetJntWithMostInfluence(vert, self.skin)
-            dict[owningJnt].append(vert)
+    def ExtractProxyModelForJntAndFaces(self, jnt, faces):
+        # split mode: builds the segment straight from the source points and topology read once per build
+        if len(faces) == 0:
+            return None
+
+        segVerts, segConnects = self.GetSegmentVerts(faces)
+        segPoints = [om.MPoint(point) for point in self.points[segVerts].tolist()]
+        segObj = om.MFnMesh().create(segPoints, self.faceVertCounts[faces].tolist(), segConnects.tolist())
+        seg = om.MFnDagNode(segObj).partialPathName()
+        mc.sets(seg, e=True, forceElement = "initialShadingGroup")
+
+        segName = self.GetSegmentName(jnt)
+        mc.rename(seg, segName)
+        return segName
+
+    def GetSegmentVerts(self, faces):
+        # segment vertex i is source vertex segVerts[i], both build modes keep the source vertex order
+        faceMask = np.zeros(self.faceCount, dtype=bool)
+        faceMask[faces] = True
+        segFaceVerts = self.faceVerts[np.repeat(faceMask, self.faceVertCounts)]
+        segVerts, segConnects = np.unique(segFaceVerts, return_inverse=True)
+        return segVerts, segConnects
+
+    def TransferWeightsToSegment(self, seg, faces):
+        segVerts = self.GetSegmentVerts(faces)[0]
+        segWeights = self.weights[segVerts]
+        usedInfluences = np.flatnonzero(segWeights.any(axis=0))
+        jnts = [self.influences[i] for i in usedInfluences]
+
+        newSkinCluster = mc.skinCluster(jnts, seg, tsb=True)[0]
+        segShape = mc.listRelatives(seg, s=True)[0]
+        if mc.polyEvaluate(segShape, v=True) != len(segVerts):
+            # the segment does not line up with the source verts, fall back to sampling
+            mc.copySkinWeights(ss=self.skin, ds=newSkinCluster, nm=True, sa="closestPoint", ia="closestJoint")
+            return newSkinCluster
+
+        SetSkinWeightMatrix(newSkinCluster, segShape, jnts, segWeights[:, usedInfluences])
+        return newSkinCluster
+
+    def LoadMeshPoints(self):
+        modelShape = mc.listRelatives(self.model, s=True)[0]
+        points = om.MFnMesh(GetDagPath(modelShape)).getPoints(om.MSpace.kWorld)
+        self.points = np.array([(point.x, point.y, point.z) for point in points])
+
+    def LoadSkinWeights(self):
+        modelShape = mc.listRelatives(self.model, s=True)[0]
+        self.influences, self.weights = GetSkinWeightMatrix(self.skin, modelShape)
+
+    def GenerateJntFacesDict(self):
+        self.LoadSkinWeights()
+        modelShape = mc.listRelatives(self.model, s=True)[0]
+        self.faceVertCounts, self.faceVerts = GetMeshFaceVerts(modelShape)
+        self.faceCount = len(self.faceVertCounts)
+
+        faceSets = PartitionFacesByJnt(self.faceVertCounts, self.faceVerts, GetVertOwners(self.weights), len(self.influences))
+        return dict(zip(self.influences, faceSets))
+
+def BenchmarkBuildModes(model):
+    timings = {}
+    for splitMode in [False, True]:
+        builder = BuildProxy()
+        builder.splitMode = splitMode
+        mc.select(model, r=True)
+
+        startTime = time.perf_counter()
+        builder.BuildProxyForSelectedmesh()
+        modeName = "split" if splitMode else "duplicate"
+        timings[modeName] = time.perf_counter() - startTime
+
+        builder.graph.StopWatchingScene()
+        mc.delete("ac_" + model + "_proxy_global")
+
+    for modeName, seconds in timings.items():
+        print(f"{modeName}: {seconds:.3f}s")
+
+    return timings
 
-        return dict
-    
 
 class BuildProxyWidget(QWidget):
     def __init__(self):
@@ -164,6 +446,9 @@ class BuildProxyWidget(QWidget):
         self.setLayout(self.masterLayout)
         self.setWindowTitle("Build Rig Proxy") 
         self.setGeometry(0,0,100,100)
+        splitModeCheckbox = QCheckBox("Split Mode (Single Source Read)")
+        splitModeCheckbox.toggled.connect(self.SplitModeToggled)
+        self.masterLayout.addWidget(splitModeCheckbox)
         buildBtn = QPushButton("Build Proxy")
         buildBtn.clicked.connect(self.BuildProxyBtnClicked)
         self.masterLayout.addWidget(buildBtn)
@@ -171,8 +456,12 @@ class BuildProxyWidget(QWidget):
         
         self.builder = BuildProxy()
 
+    def SplitModeToggled(self, checked):
+        self.builder.splitMode = checked
+
     def BuildProxyBtnClicked(self):
         self.builder.BuildProxyForSelectedmesh()
 
-buildProxyWidget = BuildProxyWidget()
-buildProxyWidget.show()
\ No newline at end of file
+if __name__ == "__main__":
+    buildProxyWidget = BuildProxyWidget()
+    buildProxyWidget.show()
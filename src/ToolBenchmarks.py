@@ -0,0 +1,222 @@
+# headless benchmarks for the four tools on synthetic rigs, always on the fake scene, not meant to run inside maya:
+#     python ToolBenchmarks.py               every size, compared against the baseline
+#     python ToolBenchmarks.py --quick       the smallest size of each benchmark
+#     python ToolBenchmarks.py --update      saves this run as the new baseline
+# a case regresses when its seconds or its maya command count grow past the threshold over the baseline
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+import FakeMayaScene
+FakeMayaScene.InstallFakeMaya()
+FakeMayaScene.InstallHeadlessQt()
+
+import maya.cmds as mc
+import ProxyBuilder
+import GhostPoser
+import MayaToUE
+import CreateController
+
+PROXY_VERT_COUNTS = [1000, 10000, 50000, 200000]
+PROXY_JNT_COUNTS = [10, 50, 200]
+GHOST_COUNTS = [10, 100, 1000, 5000]
+SKELETON_SIZES = [100, 1000, 10000]
+CHAIN_COUNTS = [1, 10, 50]
+
+def GetDefaultBaselinePath():
+    return os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks", "baseline.json"))
+
+####################################
+#          Synthetic Rigs          #
+####################################
+def BuildJntLine(scene, prefix, count, start = -10.0, end = 10.0):
+    jnts = []
+    for i in range(count):
+        x = start + (end - start) * i / max(count - 1, 1)
+        jnts.append(scene.CreateJoint(f"{prefix}{i}", [x, 0, 0], jnts[-1] if jnts else None))
+
+    return jnts
+
+def BuildSkinnedGrid(vertCount, jntCount):
+    # a square grid skinned to a line of joints along x, every vert fully weighted to the joint nearest in x
+    scene = FakeMayaScene.ResetScene()
+    columns = max(int(round(vertCount ** 0.5)) - 1, 1)
+    mesh = scene.CreateGrid("body", columns, columns)
+    jnts = BuildJntLine(scene, "jnt", jntCount)
+
+    xs = scene.GetMeshShape(mesh).mesh.points[:, 0]
+    owners = np.clip(np.rint((xs + 10.0) / 20.0 * (jntCount - 1)), 0, jntCount - 1).astype(int)
+    weights = np.zeros((len(xs), jntCount))
+    weights[np.arange(len(xs)), owners] = 1.0
+    scene.CreateSkin(jnts, mesh, weights)
+    return mesh
+
+def BuildGhostScene(ghostCount):
+    # one small source mesh with a ghost on each of ghostCount frames
+    scene = FakeMayaScene.ResetScene()
+    mesh = scene.CreateGrid("hero", 2, 2)
+    ghost = GhostPoser.Ghost()
+    mc.select(mesh)
+    ghost.InitSrcMeshesWithSel()
+    ghost.CreateGhostsForFrames(list(range(1, ghostCount + 1)))
+    return ghost
+
+def BuildSkeleton(jntCount, branchLength = 50):
+    # a spine with a branch of branchLength joints every branchLength joints
+    scene = FakeMayaScene.ResetScene()
+    root = scene.CreateJoint("root", [0, 0, 0])
+    spine = scene.CreateJoint("spine", [0, 1, 0], root)
+    prev = spine
+    for i in range(jntCount - 2):
+        prev = scene.CreateJoint(f"jnt{i}", [0, 2 + i, 0], prev if i % branchLength else spine)
+
+    return root
+
+def BuildThreeJntChains(chainCount):
+    scene = FakeMayaScene.ResetScene()
+    chains = []
+    for i in range(chainCount):
+        side = 1 if i % 2 == 0 else -1
+        root = scene.CreateJoint(f"limb{i}_root", [side * 2, 10, i])
+        middle = scene.CreateJoint(f"limb{i}_middle", [side * 6, 10, i - 1], root)
+        end = scene.CreateJoint(f"limb{i}_end", [side * 10, 10, i], middle)
+        chains.append((root, middle, end))
+
+    return chains
+
+####################################
+#            Benchmarks            #
+####################################
+def Measure(Run):
+    FakeMayaScene.ResetCallCounts()
+    startTime = time.perf_counter()
+    Run()
+    seconds = time.perf_counter() - startTime
+    return {"seconds": seconds, "commands": sum(FakeMayaScene.GetCallCounts().values())}
+
+def BenchmarkBuildProxy(vertCount, jntCount):
+    mesh = BuildSkinnedGrid(vertCount, jntCount)
+    builder = ProxyBuilder.BuildProxy()
+    mc.select(mesh)
+    return Measure(builder.BuildProxyForSelectedmesh)
+
+def BenchmarkGhostTransparency(ghostCount, frames = 20):
+    # scrubs frames frames across the ghosts, one transparency update per frame
+    ghost = BuildGhostScene(ghostCount)
+    scene = FakeMayaScene.GetScene()
+    def Scrub():
+        for frame in np.linspace(1, ghostCount, frames).astype(int).tolist():
+            scene.currentTime = float(frame)
+            ghost.UpdateGhostTransparency()
+
+    return Measure(Scrub)
+
+def BenchmarkGetAllJoints(jntCount, calls = 20):
+    # the first call builds the hierarchy, the rest come from the cache
+    root = BuildSkeleton(jntCount)
+    mayaToUE = MayaToUE.MayaToUE()
+    mayaToUE.rootJnt = root
+    def GetAllJoints():
+        for i in range(calls):
+            mayaToUE.GetAllJoints()
+
+    return Measure(GetAllJoints)
+
+def BenchmarkRigThreeJntChain(chainCount):
+    chains = BuildThreeJntChains(chainCount)
+    def RigChains():
+        for root, middle, end in chains:
+            threeJntChain = CreateController.ThreeJntChain()
+            threeJntChain.SetJnts(root, middle, end)
+            threeJntChain.RigThreeJntChain()
+
+    return Measure(RigChains)
+
+def GetBenchmarkCases(quick = False):
+    # name -> the call that runs it, the quick run keeps the smallest size of each
+    proxyVertCounts = PROXY_VERT_COUNTS[:1] if quick else PROXY_VERT_COUNTS
+    proxyJntCounts = PROXY_JNT_COUNTS[:1] if quick else PROXY_JNT_COUNTS
+    cases = {}
+    for vertCount in proxyVertCounts:
+        cases[f"BuildProxy/verts={vertCount}/jnts={proxyJntCounts[0]}"] = lambda vertCount = vertCount: BenchmarkBuildProxy(vertCount, proxyJntCounts[0])
+    for jntCount in proxyJntCounts[1:]:
+        cases[f"BuildProxy/verts={proxyVertCounts[1]}/jnts={jntCount}"] = lambda jntCount = jntCount: BenchmarkBuildProxy(proxyVertCounts[1], jntCount)
+    for ghostCount in GHOST_COUNTS[:1] if quick else GHOST_COUNTS:
+        cases[f"UpdateGhostTransparency/ghosts={ghostCount}"] = lambda ghostCount = ghostCount: BenchmarkGhostTransparency(ghostCount)
+    for jntCount in SKELETON_SIZES[:1] if quick else SKELETON_SIZES:
+        cases[f"GetAllJoints/jnts={jntCount}"] = lambda jntCount = jntCount: BenchmarkGetAllJoints(jntCount)
+    for chainCount in CHAIN_COUNTS[:1] if quick else CHAIN_COUNTS:
+        cases[f"RigThreeJntChain/chains={chainCount}"] = lambda chainCount = chainCount: BenchmarkRigThreeJntChain(chainCount)
+
+    return cases
+
+def RunBenchmarks(quick = False, repeats = 3):
+    # each case keeps its fastest run, the command count is the same every run
+    results = {}
+    for name, Run in GetBenchmarkCases(quick).items():
+        runs = [Run() for i in range(repeats)]
+        results[name] = min(runs, key=lambda run: run["seconds"])
+        print(f"{name}: {results[name]['seconds']:.4f}s, {results[name]['commands']} commands")
+
+    return results
+
+####################################
+#             Baseline             #
+####################################
+def LoadBaseline(path):
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as baselineFile:
+        return json.load(baselineFile)["cases"]
+
+def SaveBaseline(path, results):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    baseline = LoadBaseline(path)
+    baseline.update(results)
+    with open(path, "w") as baselineFile:
+        json.dump({"cases": baseline}, baselineFile, indent=4, sort_keys=True)
+
+def FindRegressions(results, baseline, threshold = 0.25, noiseSeconds = 0.002):
+    # cases missing from the baseline are skipped, tiny timings need to grow past noiseSeconds as well
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        baselineSeconds = baseline[name]["seconds"]
+        if result["seconds"] > baselineSeconds * (1 + threshold) and result["seconds"] - baselineSeconds > noiseSeconds:
+            regressions.append(f"{name}: {baselineSeconds:.4f}s -> {result['seconds']:.4f}s")
+
+        baselineCommands = baseline[name]["commands"]
+        if result["commands"] > baselineCommands * (1 + threshold):
+            regressions.append(f"{name}: {baselineCommands} -> {result['commands']} commands")
+
+    return regressions
+
+def Main(args):
+    parser = argparse.ArgumentParser(description="benchmarks the maya tools on the fake scene")
+    parser.add_argument("--quick", action="store_true", help="only the smallest size of each benchmark")
+    parser.add_argument("--update", action="store_true", help="save the results as the baseline")
+    parser.add_argument("--baseline", default=GetDefaultBaselinePath())
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed growth over the baseline, 0.25 is 25%%")
+    parser.add_argument("--repeats", type=int, default=3)
+    options = parser.parse_args(args)
+
+    results = RunBenchmarks(options.quick, options.repeats)
+    if options.update:
+        SaveBaseline(options.baseline, results)
+        print(f"baseline saved to {options.baseline}")
+        return 0
+
+    regressions = FindRegressions(results, LoadBaseline(options.baseline), options.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(Main(sys.argv[1:]))
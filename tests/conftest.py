@@ -0,0 +1,9 @@
+# the tests run the tools on the fake scene, never inside maya
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import FakeMayaScene
+FakeMayaScene.InstallFakeMaya()
+FakeMayaScene.InstallHeadlessQt()
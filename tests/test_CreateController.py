@@ -0,0 +1,59 @@
+import numpy as np
+import maya.cmds as mc
+
+import FakeMayaScene
+import CreateController
+
+def BuildArm(scene, prefix, side):
+    shoulder = scene.CreateJoint(prefix + "shoulder", [side * 2, 10, 0])
+    elbow = scene.CreateJoint(prefix + "elbow", [side * 6, 10, -1], shoulder)
+    hand = scene.CreateJoint(prefix + "hand", [side * 10, 10, 0], elbow)
+    return shoulder, elbow, hand
+
+def RecordArm():
+    scene = FakeMayaScene.ResetScene()
+    threeJntChain = CreateController.ThreeJntChain()
+    threeJntChain.SetJnts(*BuildArm(scene, "", 1))
+    template = CreateController.ThreeJntChainTemplate("arm")
+    template.Record(threeJntChain)
+    return scene, template
+
+def test_RecordOnlyTokenizesWholeJntNames():
+    scene, template = RecordArm()
+    # the effector's handlePath attr starts with the end joint's name, only the joint itself is a token
+    assert ("effector1.handlePath[0]", "ikHanle_{end}.endEffector") in template.connections
+    assert ("{end}.translate", "effector1.translate") in template.connections
+    assert "ac_ik_{end}_grp" in [nodeRecord["name"] for nodeRecord in template.nodes]
+
+def test_RecordKeepsCurvesInTheTemplate():
+    shapeNames = CreateController.controllerShapes.GetShapeNames()
+    scene, template = RecordArm()
+    assert CreateController.controllerShapes.GetShapeNames() == shapeNames
+    assert "ac_{root}" in template.curveShapes.GetShapeNames()
+
+    CreateController.ReplicateThreeJntChains(template, [BuildArm(scene, "r_", -1)])
+    assert mc.listRelatives("ac_r_shoulder", s=True, type="nurbsCurve")
+    inputs = mc.listConnections("ikHanle_r_hand", s=True, d=False, c=True, p=True)
+    assert any(dst == "ikHanle_r_hand.endEffector" and src.endswith(".handlePath[0]") for dst, src in zip(inputs[::2], inputs[1::2]))
+
+def GetRigMatrices(jnts):
+    rigNodes = [node for node in mc.ls(type=["transform", "ikHandle"]) if any(jnt in node for jnt in jnts) and mc.nodeType(node) != "joint"]
+    return {node: np.array(mc.xform(node, q=True, ws=True, m=True)).reshape(4, 4) for node in rigNodes}
+
+def test_MirroredTemplateMatchesADirectBuild():
+    scene = FakeMayaScene.ResetScene()
+    BuildArm(scene, "", 1)
+    rightArm = BuildArm(scene, "r_", -1)
+    threeJntChain = CreateController.ThreeJntChain()
+    threeJntChain.SetJnts(*rightArm)
+    threeJntChain.RigThreeJntChain()
+    expected = GetRigMatrices(rightArm)
+
+    scene, template = RecordArm()
+    rightArm = BuildArm(scene, "r_", -1)
+    CreateController.ReplicateThreeJntChains(template, [rightArm])
+    matrices = GetRigMatrices(rightArm)
+
+    assert sorted(matrices) == sorted(expected)
+    for node, matrix in expected.items():
+        assert np.allclose(matrices[node], matrix, atol=1e-6), node
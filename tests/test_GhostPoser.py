@@ -0,0 +1,62 @@
+import maya.cmds as mc
+
+import FakeMayaScene
+import GhostPoser
+
+def CreateGhost():
+    scene = FakeMayaScene.ResetScene()
+    mesh = scene.CreateGrid("hero", 3, 3)
+    ghost = GhostPoser.Ghost()
+    mc.select(mesh)
+    ghost.InitSrcMeshesWithSel()
+    return ghost
+
+def test_BudgetKeepsTheNewBatchOverOlderGhosts():
+    ghost = CreateGhost()
+    ghost.SetGhostBudget(maxGhostCount=2)
+    mc.currentTime(5, e=True)
+    ghost.AddGhostsInRange(20, 22)
+    # the batch alone is over the budget, so only its furthest ghost goes
+    assert sorted(ghost.ghostFrames) == ["hero_ghost_20", "hero_ghost_21"]
+    assert ghost.lastEvictedGhosts == ["hero_ghost_22"]
+
+    ghost.AddGhostsInRange(1, 2)
+    assert sorted(ghost.ghostFrames) == ["hero_ghost_1", "hero_ghost_2"]
+    assert sorted(ghost.lastEvictedGhosts) == ["hero_ghost_20", "hero_ghost_21"]
+
+def test_BenchmarkGhostModesLeavesExistingGhosts():
+    ghost = CreateGhost()
+    ghost.CreateGhostsForFrames([1, 2, 3])
+    ghost.SetGhostBudget(maxGhostCount=3)
+    mc.currentTime(2, e=True)
+    GhostPoser.BenchmarkGhostModes(ghost)
+
+    assert sorted(ghost.ghostFrames) == ["hero_ghost_1", "hero_ghost_2", "hero_ghost_3"]
+    assert all(mc.objExists(ghostName) for ghostName in ghost.ghostFrames)
+    assert not mc.objExists("hero_ghost_4")
+    assert ghost.maxGhostCount == 3
+
+def test_NewSceneRebuildsTheGhostIndex():
+    ghost = CreateGhost()
+    ghost.CreateGhostsForFrames([1, 2])
+    # file -new clears the scene without going through DeleteGhost
+    mc.delete(ghost.GetGhostGrpName(), "hero")
+    FakeMayaScene.GetScene().FireEvent("NewSceneOpened")
+
+    assert ghost.ghostFrames == {}
+    assert ghost.srcMeshs == set()
+    assert mc.objExists(ghost.GetGhostGrpName())
+    ghost.AddGhost()
+    assert ghost.ghostFrames == {}
+
+def test_OpeningASceneWithoutGhostGrpClearsTheSrcMeshes():
+    ghost = CreateGhost()
+    ghost.CreateGhostsForFrames([1])
+    # the opened scene has other meshes and no Ghost_grp
+    mc.delete(ghost.GetGhostGrpName(), "hero")
+    FakeMayaScene.GetScene().CreateGrid("villain", 3, 3)
+    FakeMayaScene.GetScene().FireEvent("SceneOpened")
+
+    assert ghost.srcMeshs == set()
+    ghost.AddGhost()
+    assert ghost.ghostFrames == {}
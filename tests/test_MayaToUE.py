@@ -0,0 +1,226 @@
+import os
+import sys
+import json
+import time
+
+import pytest
+import maya.cmds as mc
+
+import AnimClipExportWorker
+import FakeMayaScene
+import MayaToUE
+import ToolBenchmarks
+
+FAKE_WORKER = """
+import os
+import sys
+import json
+import time
+import time
+
+job = json.load(open(sys.argv[1]))
+results = []
+for clip in job["clips"]:
+    if clip["output"].endswith("crash.fbx"):
+        sys.exit(3)
+    if clip["output"].endswith("slow.fbx"):
+        time.sleep(60)
+    open(clip["output"], "w").write(json.dumps(clip))
+    results.append({"output": clip["output"], "seconds": 0.0, "error": ""})
+
+json.dump({"clips": results}, open(job["result"], "w"))
+"""
+
+def CreateScheduler(tmp_path, jobsClips, maxWorkers = 2):
+    workerPath = tmp_path / "fake_worker.py"
+    workerPath.write_text(FAKE_WORKER)
+    scheduler = MayaToUE.AnimClipExportScheduler([sys.executable, str(workerPath)], maxWorkers)
+    for i, clips in enumerate(jobsClips):
+        job = {"scene": "", "nodes": [], "clips": [{"output": str(tmp_path / clip), "settings": {}} for clip in clips]}
+        scheduler.AddJob(job, str(tmp_path / f"job_{i}.json"))
+
+    return scheduler
+
+def test_SchedulerCollectsEveryClip(tmp_path):
+    scheduler = CreateScheduler(tmp_path, [["a.fbx", "b.fbx"], ["c.fbx"], ["d.fbx"]])
+    scheduler.Start()
+    results = scheduler.Wait(0.01)
+
+    assert sorted(os.path.basename(result["output"]) for result in results) == ["a.fbx", "b.fbx", "c.fbx", "d.fbx"]
+    assert not scheduler.GetFailedResults()
+    assert json.loads((tmp_path / "c.fbx").read_text())["output"] == str(tmp_path / "c.fbx")
+
+def test_SchedulerReportsCrashedWorker(tmp_path):
+    # the worker dies before writing its result file, so every clip of its job fails
+    scheduler = CreateScheduler(tmp_path, [["a.fbx", "crash.fbx"], ["b.fbx"]])
+    scheduler.Start()
+    scheduler.Wait(0.01)
+
+    failed = {os.path.basename(result["output"]): result["error"] for result in scheduler.GetFailedResults()}
+    assert sorted(failed) == ["a.fbx", "crash.fbx"]
+    assert "exited with code 3" in failed["crash.fbx"]
+    assert (tmp_path / "b.fbx").exists()
+
+def test_SchedulerCancelKillsRunningAndPendingJobs(tmp_path):
+    scheduler = CreateScheduler(tmp_path, [["slow.fbx"], ["pending.fbx"]], maxWorkers=1)
+    scheduler.Start()
+    process = scheduler.runningJobs[0][0]
+    scheduler.Cancel()
+
+    assert scheduler.IsFinished()
+    assert process.poll() is not None
+    assert {os.path.basename(result["output"]): result["error"] for result in scheduler.results} == {"slow.fbx": "cancelled", "pending.fbx": "cancelled"}
+    assert not (tmp_path / "pending.fbx").exists()
+
+def CreateMayaToUE(tmp_path, clipCount):
+    mesh = ToolBenchmarks.BuildSkinnedGrid(1000, 5)
+    mayaToUE = MayaToUE.MayaToUE()
+    mayaToUE.rootJnt = "jnt0"
+    mayaToUE.models = {mesh}
+    mayaToUE.saveDir = str(tmp_path)
+    mayaToUE.fileName = "hero"
+    for i in range(clipCount):
+        animClip = mayaToUE.AddNewAnimEntry()
+        animClip.subfix = f"_clip{i}"
+
+    return mayaToUE
+
+def test_PlanExportReadsTheMeshOnce(tmp_path):
+    mayaToUE = CreateMayaToUE(tmp_path, 3)
+    FakeMayaScene.ResetCallCounts()
+    manifest, steps = mayaToUE.PlanExport()
+
+    assert len(manifest["lastRun"]["misses"]) == 4
+    assert FakeMayaScene.GetCallCounts()["MFnSkinCluster.getWeights"] == 1
+
+def test_MovedJntReExportsTheSkeletalMesh(tmp_path):
+    mayaToUE = CreateMayaToUE(tmp_path, 1)
+    mayaToUE.SaveFiles()
+    assert mayaToUE.PlanExport()[0]["lastRun"]["misses"] == []
+
+    mc.xform("jnt2", ws=True, t=(0, 3, 0))
+    assert mayaToUE.PlanExport()[0]["lastRun"]["misses"] == [mayaToUE.GetSkeletalMeshSavePath()]
+
+class RecordingTimer:
+    def __init__(self):
+        self.intervals = []
+
+    def setInterval(self, interval):
+        self.intervals.append(interval)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+def test_ExportJobPollsTheWorkersAndSlowsDown(tmp_path):
+    mayaToUE = CreateMayaToUE(tmp_path, 3)
+    workerPath = tmp_path / "fake_worker.py"
+    workerPath.write_text(FAKE_WORKER)
+    mayaToUE.GetWorkerCommand = lambda: [sys.executable, str(workerPath)]
+    mayaToUE.SetClipExportWorkers(2)
+
+    # nothing runs MayaToUE's idle job here, so the job has to poll the workers itself
+    exportJob = MayaToUE.ExportJob(mayaToUE)
+    exportJob.timer = RecordingTimer()
+    exportJob.Start()
+    for i in range(1000):
+        if not exportJob.isRunning:
+            break
+        exportJob.Step()
+        time.sleep(0.01)
+
+    assert not exportJob.isRunning
+    assert exportJob.finishedFileCount == 4
+    assert exportJob.timer.intervals and set(exportJob.timer.intervals) == {100}
+
+def WriteFakeFbx(path, version = 7400, animated = True):
+    path.write_bytes(FakeMayaScene.BuildFakeFbx(["hip", "spine", "rig:head"], ["body"], animated, list(range(1, 11)), version))
+    return str(path)
+
+@pytest.mark.parametrize("version", [7400, 7500])
+def test_ReadFbxStatsCountsTheObjects(tmp_path, version):
+    # the key times are zlib compressed arrays, only their element count is read
+    stats = MayaToUE.ReadFbxStats(WriteFakeFbx(tmp_path / "hero.fbx", version))
+
+    assert stats["version"] == version
+    assert stats["bones"] == ["hip", "spine", "head"]
+    assert stats["models"] == 4
+    assert stats["meshes"] == 1
+    assert stats["geometries"] == 1
+    assert stats["animStacks"] == 1
+    assert stats["animCurves"] == 9
+    assert stats["animKeys"] == 90
+
+def test_ReadFbxStatsWithoutAnimation(tmp_path):
+    stats = MayaToUE.ReadFbxStats(WriteFakeFbx(tmp_path / "hero.fbx", 7500, animated=False))
+    assert (stats["animStacks"], stats["animCurves"], stats["animKeys"]) == (0, 0, 0)
+
+def test_PostProcessExportReportsUnreadableFiles(tmp_path):
+    mayaToUE = MayaToUE.MayaToUE()
+    asciiPath = tmp_path / "ascii.fbx"
+    asciiPath.write_text("; FBX 7.4.0 project file\nFBXHeaderExtension:  {\n}\n")
+    assert "is not a binary fbx" in mayaToUE.PostProcessExport(str(asciiPath))["problems"][0]
+
+    fbxData = FakeMayaScene.BuildFakeFbx(["hip"], ["body"], True, list(range(1, 11)))
+    truncatedPath = tmp_path / "truncated.fbx"
+    truncatedPath.write_bytes(fbxData[:len(fbxData) // 2])
+    assert mayaToUE.PostProcessExport(str(truncatedPath))["problems"]
+
+    missing = mayaToUE.PostProcessExport(str(tmp_path / "missing.fbx"))
+    assert missing["problems"] == ["file not written"]
+    assert missing["size"] == 0
+
+def test_CompareFbxStatsFindsMismatches(tmp_path):
+    stats = MayaToUE.ReadFbxStats(WriteFakeFbx(tmp_path / "hero.fbx", animated=False))
+    assert MayaToUE.CompareFbxStats(stats, {"bones": ["hip", "spine", "head"], "meshes": 1, "animated": False}) == []
+
+    problems = MayaToUE.CompareFbxStats(stats, {"bones": ["hip", "arm", "leg"], "meshes": 2, "animated": True})
+    assert problems == ["2 joints missing: arm, leg", "expected 2 meshes, found 1", "no animation stack"]
+
+    stats["animStacks"] = 1
+    assert MayaToUE.CompareFbxStats(stats, {"bones": [], "meshes": 0, "animated": True}) == ["animation stack has no keys"]
+
+def test_PostProcessExportComparesWithTheExpectedContents(tmp_path):
+    mayaToUE = MayaToUE.MayaToUE()
+    outputPath = WriteFakeFbx(tmp_path / "hero.fbx")
+    mayaToUE.exportExpectations[outputPath] = {"bones": ["hip", "spine", "head", "tail"], "meshes": 1, "animated": True}
+    result = mayaToUE.PostProcessExport(outputPath)
+
+    assert result["problems"] == ["1 joints missing: tail"]
+    assert result["bones"] == 3
+    assert result["animKeys"] == 90
+
+def test_BakedClipsAreNotBakedAgainOnExport(tmp_path):
+    mayaToUE = CreateMayaToUE(tmp_path, 1)
+    mayaToUE.animations[0].frameMin, mayaToUE.animations[0].frameMax = 5, 14
+    mayaToUE.SetBakeSkeletonBeforeExport(True)
+    mayaToUE.SaveFiles()
+
+    fbxSettings = FakeMayaScene.GetScene().fbxSettings
+    assert fbxSettings["FBXExportBakeComplexAnimation"] == ("-v", False)
+    assert fbxSettings["FBXExportSplitAnimationIntoTakes"] == ("-v", "hero_clip0", 5, 14)
+    clipReport = mayaToUE.exportReport[mayaToUE.GetSavePathForAnimClip(mayaToUE.animations[0])]
+    assert clipReport["problems"] == []
+    assert clipReport["animKeys"] == 10 * 3 * 5
+
+    # the workers export the same way from their baked scene copy
+    clip = {"output": str(tmp_path / "worker.fbx"), "settings": mayaToUE.GetExportSettings(mayaToUE.animations[0])}
+    AnimClipExportWorker.ExportClip(mc, ["jnt0"], clip)
+    assert fbxSettings["FBXExportBakeComplexAnimation"] == ("-v", False)
+    assert fbxSettings["FBXExportSplitAnimationIntoTakes"] == ("-v", "hero_clip0", 5, 14)
+
+def test_ValidateSkeletonAcceptsIkEffectors():
+    scene = FakeMayaScene.ResetScene()
+    root = scene.CreateJoint("root", [0, 0, 0])
+    middle = scene.CreateJoint("middle", [0, 5, 1], root)
+    end = scene.CreateJoint("end", [0, 10, 0], middle)
+    mc.ikHandle(n="legIk", sj=root, ee=end, sol="ikRPsolver")
+    scene.CreateNode("transform", "prop", scene.GetNode(end))
+    mayaToUE = MayaToUE.MayaToUE()
+    mayaToUE.rootJnt = root
+
+    problems = [problem for problem in mayaToUE.ValidateSkeleton()[1].split("\n") if "is not a joint" in problem]
+    assert mc.ls(type="ikEffector")
+    assert len(problems) == 1 and "prop" in problems[0]
@@ -0,0 +1,45 @@
+import numpy as np
+import maya.cmds as mc
+
+import FakeMayaScene
+import ProxyBuilder
+import ToolBenchmarks
+
+def BuildRandomSkin(vertCount, jntCount, seed = 0):
+    # random weights on the benchmark grid, every tenth vert ties its two biggest joints
+    mesh = ToolBenchmarks.BuildSkinnedGrid(vertCount, jntCount)
+    skin = mc.ls(mc.listHistory(mesh), type="skinCluster")[0]
+    skinNode = FakeMayaScene.GetScene().GetNode(skin).skin
+
+    rng = np.random.default_rng(seed)
+    weights = rng.random(skinNode.weights.shape)
+    tiedVerts = np.arange(0, len(weights), 10)
+    weights[tiedVerts, rng.integers(0, jntCount, len(tiedVerts))] = weights[tiedVerts].max(axis=1)
+    skinNode.weights = weights / weights.sum(axis=1, keepdims=True)
+    return mesh, skin
+
+def GetOwnersPerVert(mesh, skin):
+    # the old way, one skinPercent query per vert, the first of equal weights wins
+    jnts = mc.skinPercent(skin, f"{mesh}.vtx[0]", q=True, t=None)
+    owners = []
+    for i in range(mc.polyEvaluate(mesh, v=True)):
+        vertWeights = mc.skinPercent(skin, f"{mesh}.vtx[{i}]", q=True, v=True)
+        owners.append(jnts[vertWeights.index(max(vertWeights))])
+
+    return owners
+
+def test_JntVertsMapMatchesPerVertOwners():
+    mesh, skin = BuildRandomSkin(100000, 12)
+    meshShape = mc.listRelatives(mesh, s=True)[0]
+    jnts, weights = ProxyBuilder.GetSkinWeightMatrix(skin, meshShape)
+    assert weights.shape == (mc.polyEvaluate(mesh, v=True), 12)
+
+    expectedOwners = GetOwnersPerVert(mesh, skin)
+    jntVertsMap = ProxyBuilder.GetJntVertsMap(jnts, weights)
+    owners = [None] * len(expectedOwners)
+    for jnt, verts in jntVertsMap.items():
+        for vert in verts:
+            assert owners[vert] is None
+            owners[vert] = jnt
+
+    assert owners == expectedOwners